@@ -0,0 +1,60 @@
+"""Add transactional outbox table.
+
+Revision ID: 20261019_0001
+Revises: 20260213_0002
+Create Date: 2026-10-19 09:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0001"
+down_revision = "20260213_0002"
+branch_labels = None
+depends_on = None
+
+
+outbox_event_kind_enum = postgresql.ENUM(
+    "sheets_sync",
+    "referrer_notification",
+    name="outbox_event_kind",
+    create_type=False,
+)
+outbox_status_enum = postgresql.ENUM("pending", "done", "failed", name="outbox_status", create_type=False)
+
+
+def upgrade() -> None:
+    outbox_event_kind_enum.create(op.get_bind(), checkfirst=True)
+    outbox_status_enum.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("kind", outbox_event_kind_enum, nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("status", outbox_status_enum, nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_index(
+        "ix_outbox_events_pending_available_at",
+        "outbox_events",
+        ["available_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_pending_available_at", table_name="outbox_events")
+    op.drop_table("outbox_events")
+
+    outbox_status_enum.drop(op.get_bind(), checkfirst=True)
+    outbox_event_kind_enum.drop(op.get_bind(), checkfirst=True)
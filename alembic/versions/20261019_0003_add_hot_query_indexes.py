@@ -0,0 +1,81 @@
+"""Add partial and covering indexes for hot queries.
+
+Revision ID: 20261019_0003
+Revises: 20261019_0002
+Create Date: 2026-10-19 12:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0003"
+down_revision = "20261019_0002"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, include, where)
+INDEXES = (
+    # /stats counters: index-only scans over the matching rows instead of a full table scan.
+    ("ix_users_subscribed_id", "users", ["id"], None, "is_subscribed"),
+    ("ix_users_participant_id", "users", ["id"], None, "is_participant"),
+    # /export and broadcast recipients: ordered by id, every selected column in the index.
+    (
+        "ix_users_export_id",
+        "users",
+        ["id"],
+        ["tg_user_id", "username", "referrals_confirmed", "is_participant", "created_at"],
+        None,
+    ),
+    # Sheets sync streams only users that left contact info.
+    (
+        "ix_users_with_contact_id",
+        "users",
+        ["id"],
+        None,
+        "contact_name IS NOT NULL AND contact_phone IS NOT NULL",
+    ),
+    ("ix_referrals_confirmed_id", "referrals", ["id"], None, "status = 'confirmed'"),
+    # Outbox claim (ORDER BY id, available_at filtered from the index) and pending counts by kind.
+    ("ix_outbox_events_pending_id", "outbox_events", ["id"], ["available_at", "kind"], "status = 'pending'"),
+)
+
+# Pending indexes superseded by the ones above: (name, table, columns, where)
+REPLACED_INDEXES = (
+    ("ix_outbox_events_pending_available_at", "outbox_events", ["available_at"], "status = 'pending'"),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns, include, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_include=include or [],
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+            )
+        for name, table, *_ in REPLACED_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in REPLACED_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_where=sa.text(where),
+                postgresql_concurrently=True,
+            )
+        for name, table, *_ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
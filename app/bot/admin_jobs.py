@@ -0,0 +1,126 @@
+"""Long admin jobs run detached from the update that started them.
+
+Under ``UPDATE_PROCESSING_MODE=queue`` a handler runs on its user's partition
+worker, so a broadcast or profile awaited in the handler would stall every
+user in that partition. Handlers instead start the job here, reply at once
+and let the job report back to the admin when it finishes.
+
+With ``WEB_WORKERS > 1`` the same command can land on another worker process,
+so a job started with an engine also holds a Postgres advisory lock named
+after it for its whole run: a second start anywhere gets ``False``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import zlib
+from contextlib import suppress
+from typing import Any, Coroutine
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from structlog.stdlib import BoundLogger
+
+
+def advisory_lock_key(name: str) -> int:
+    """Stable across processes, unlike ``hash()``."""
+
+    return zlib.crc32(f"admin_job:{name}".encode())
+
+
+class AdminJobs:
+    """Keeps references to running jobs, logs their failures and cancels them on shutdown."""
+
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._starting: set[str] = set()
+        self._releases: set[asyncio.Task[None]] = set()
+
+    def running(self, name: str) -> bool:
+        if name in self._starting:
+            return True
+        return any(task.get_name() == name for task in (*self._tasks, *self._releases))
+
+    async def start(
+        self,
+        name: str,
+        job: Coroutine[Any, Any, Any],
+        logger: BoundLogger,
+        *,
+        engine: AsyncEngine | None = None,
+    ) -> bool:
+        """Run ``job`` in the background unless a job with this name is already running."""
+
+        if self.running(name):
+            job.close()
+            return False
+
+        self._starting.add(name)
+        try:
+            connection = await self._lock(engine, name) if engine is not None else None
+        finally:
+            self._starting.discard(name)
+        if engine is not None and connection is None:
+            job.close()
+            logger.info("admin_job_locked_elsewhere", job=name)
+            return False
+
+        task = asyncio.create_task(job, name=name)
+        self._tasks.add(task)
+
+        def finished(done: asyncio.Task[Any]) -> None:
+            self._tasks.discard(done)
+            if not done.cancelled() and done.exception() is not None:
+                logger.error("admin_job_failed", job=name, error=repr(done.exception()))
+            if connection is not None:
+                # Released here rather than in the job: a task cancelled before its first
+                # step never runs the job's ``finally``.
+                release = asyncio.create_task(self._unlock(connection, name), name=name)
+                self._releases.add(release)
+                release.add_done_callback(self._releases.discard)
+
+        task.add_done_callback(finished)
+        return True
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+        # Let the done callbacks schedule the unlocks, then wait for them.
+        await asyncio.sleep(0)
+        await asyncio.gather(*self._releases, return_exceptions=True)
+
+    @staticmethod
+    async def _lock(engine: AsyncEngine, name: str) -> AsyncConnection | None:
+        # Session-level lock: it lives as long as this connection, which is kept until the job ends.
+        connection = await engine.connect()
+        try:
+            locked = await connection.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": advisory_lock_key(name)}
+            )
+            await connection.commit()
+        except BaseException:
+            await connection.close()
+            raise
+        if not locked:
+            await connection.close()
+            return None
+        return connection
+
+    @staticmethod
+    async def _unlock(connection: AsyncConnection, name: str) -> None:
+        try:
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": advisory_lock_key(name)})
+            await connection.commit()
+        except Exception:
+            # Never return a connection still holding the lock to the pool.
+            with suppress(Exception):
+                await connection.invalidate()
+        with suppress(Exception):
+            await connection.close()
+
+
+ADMIN_JOBS = AdminJobs()
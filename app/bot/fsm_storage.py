@@ -0,0 +1,200 @@
+"""Postgres-backed FSM storage with an in-process cache."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog.stdlib import BoundLogger
+
+from app.repositories.fsm_states import FsmStatesRepository
+
+
+@dataclass(slots=True)
+class _CacheEntry:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+
+class PostgresStorage(BaseStorage):
+    """FSM storage shared by all bot processes through the ``fsm_states`` table.
+
+    Reads are served from an in-process LRU cache for ``cache_ttl_seconds`` after
+    the entry was loaded or written. Another process may have moved the state on
+    since, so multi-process deployments run with ``cache_ttl_seconds=0``.
+    Writes update the cache immediately and are coalesced: a background task
+    flushes every dirty key in one upsert every ``flush_interval_seconds``, so
+    other processes see a write only after that delay.
+    States untouched for ``state_ttl_seconds`` count as abandoned; they read as
+    empty and are deleted by a periodic cleanup.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        logger: BoundLogger,
+        *,
+        key_builder: KeyBuilder | None = None,
+        cache_ttl_seconds: float = 2.0,
+        state_ttl_seconds: float = 86400.0,
+        flush_interval_seconds: float = 0.05,
+        cleanup_interval_seconds: float = 600.0,
+        max_cache_entries: int = 50_000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.logger = logger
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.state_ttl_seconds = state_ttl_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+        self.max_cache_entries = max_cache_entries
+
+        self._cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._dirty: set[str] = set()
+        # Keys whose upsert is in flight: still newer than the database, so pinned like dirty ones.
+        self._flushing: set[str] = set()
+        self._flush_requested = asyncio.Event()
+        self._flusher: asyncio.Task[None] | None = None
+        self._last_cleanup = time.monotonic()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._load(key)
+        entry.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(self.key_builder.build(key))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._load(key)).state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        entry = await self._load(key)
+        entry.data = data.copy()
+        self._mark_dirty(self.key_builder.build(key))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._load(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+        await self.flush()
+
+    async def _load(self, key: StorageKey) -> _CacheEntry:
+        storage_key = self.key_builder.build(key)
+        now = time.monotonic()
+
+        entry = self._cache.get(storage_key)
+        if entry is not None and (self._is_pinned(storage_key) or now - entry.loaded_at < self.cache_ttl_seconds):
+            self._cache.move_to_end(storage_key)
+            return entry
+
+        async with self.session_factory() as session:
+            row = await FsmStatesRepository.get(
+                session,
+                storage_key,
+                newer_than=datetime.now(timezone.utc) - timedelta(seconds=self.state_ttl_seconds),
+            )
+
+        # A write may have landed in the cache while the read was in flight.
+        entry = self._cache.get(storage_key)
+        if entry is not None and self._is_pinned(storage_key):
+            return entry
+
+        state, data = row if row is not None else (None, {})
+        entry = _CacheEntry(state=state, data=data, loaded_at=now)
+        self._cache[storage_key] = entry
+        self._evict()
+        return entry
+
+    def _mark_dirty(self, storage_key: str) -> None:
+        entry = self._cache[storage_key]
+        entry.loaded_at = time.monotonic()
+        self._cache.move_to_end(storage_key)
+        self._dirty.add(storage_key)
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run_flusher(), name="fsm_storage_flusher")
+        self._flush_requested.set()
+
+    def _is_pinned(self, storage_key: str) -> bool:
+        return storage_key in self._dirty or storage_key in self._flushing
+
+    def _evict(self) -> None:
+        while len(self._cache) > self.max_cache_entries:
+            for storage_key in self._cache:
+                if not self._is_pinned(storage_key):
+                    del self._cache[storage_key]
+                    break
+            else:
+                return
+
+    async def _run_flusher(self) -> None:
+        while True:
+            await self._flush_requested.wait()
+            # Let the rest of the update's writes land so they share one upsert.
+            await asyncio.sleep(self.flush_interval_seconds)
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_cleanup >= self.cleanup_interval_seconds:
+                    await self.delete_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.exception("fsm_storage_flush_error")
+                self._flush_requested.set()
+                await asyncio.sleep(1.0)
+
+    async def flush(self) -> None:
+        """Write every dirty key to the database in one transaction."""
+
+        if not self._dirty:
+            return
+
+        keys = list(self._dirty)
+        self._dirty.clear()
+        self._flushing.update(keys)
+        upserts: list[dict[str, Any]] = []
+        deletes: list[str] = []
+        for storage_key in keys:
+            entry = self._cache[storage_key]
+            if entry.state is None and not entry.data:
+                deletes.append(storage_key)
+            else:
+                upserts.append({"key": storage_key, "state": entry.state, "data": dict(entry.data)})
+
+        try:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    await FsmStatesRepository.upsert_many(session, upserts)
+                    await FsmStatesRepository.delete_many(session, deletes)
+        except BaseException:
+            self._dirty.update(keys)
+            raise
+        finally:
+            self._flushing.difference_update(keys)
+            self._evict()
+
+    async def delete_expired(self) -> int:
+        self._last_cleanup = time.monotonic()
+        async with self.session_factory() as session:
+            async with session.begin():
+                deleted = await FsmStatesRepository.delete_expired(
+                    session,
+                    older_than=datetime.now(timezone.utc) - timedelta(seconds=self.state_ttl_seconds),
+                )
+        if deleted:
+            self.logger.info("fsm_states_expired", deleted=deleted)
+        return deleted
@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from typing import Any
 
 from aiogram import Bot, Router
 from aiogram.filters import Command
+from aiogram.methods import SendMessage, TelegramMethod
 from aiogram.types import BufferedInputFile, Message
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from structlog.stdlib import BoundLogger
 
+from app.bot.admin_jobs import ADMIN_JOBS
 from app.config import Settings
+from app.profiling import PROFILER, ProfileFormat, ProfileKind, ProfilerBusyError
 from app.services.admin_service import (
     broadcast_to_all_users,
     collect_admin_stats,
@@ -25,45 +29,45 @@ def is_admin_user(user_id: int | None, admin_ids: tuple[int, ...]) -> bool:
     return user_id is not None and user_id in admin_ids
 
 
-async def reject_if_not_admin(message: Message, settings: Settings) -> bool:
+def reject_if_not_admin(message: Message, settings: Settings) -> SendMessage | None:
+    """Return the rejection reply for non-admins, to be answered in the webhook response."""
     user_id = message.from_user.id if message.from_user else None
     if is_admin_user(user_id, settings.admin_ids):
-        return False
+        return None
 
-    await message.answer("This command is available only to admins.")
-    return True
+    return message.answer("This command is available only to admins.")
 
 
 @router.message(Command("stats"))
 async def handle_stats(
     message: Message,
     settings: Settings,
-    session_factory: async_sessionmaker[AsyncSession],
+    read_session_factory: async_sessionmaker[AsyncSession],
     app_logger: BoundLogger,
-) -> None:
-    if await reject_if_not_admin(message, settings):
-        return
+) -> TelegramMethod[Any] | None:
+    if (rejection := reject_if_not_admin(message, settings)) is not None:
+        return rejection
 
-    stats = await collect_admin_stats(session_factory)
+    stats = await collect_admin_stats(read_session_factory)
     app_logger.info("admin_command_used", command="stats", admin_id=message.from_user.id)
-    await message.answer(format_stats_message(stats))
+    return message.answer(format_stats_message(stats))
 
 
 @router.message(Command("export"))
 async def handle_export(
     message: Message,
     settings: Settings,
-    session_factory: async_sessionmaker[AsyncSession],
+    read_session_factory: async_sessionmaker[AsyncSession],
     app_logger: BoundLogger,
-) -> None:
-    if await reject_if_not_admin(message, settings):
-        return
+) -> TelegramMethod[Any] | None:
+    if (rejection := reject_if_not_admin(message, settings)) is not None:
+        return rejection
 
-    csv_bytes = await export_users_csv(session_factory)
+    csv_bytes = await export_users_csv(read_session_factory)
     filename = f"giveaway_export_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv"
     file = BufferedInputFile(csv_bytes, filename=filename)
     app_logger.info("admin_command_used", command="export", admin_id=message.from_user.id)
-    await message.answer_document(document=file)
+    return message.answer_document(document=file)
 
 
 @router.message(Command("broadcast"))
@@ -71,32 +75,102 @@ async def handle_broadcast(
     message: Message,
     bot: Bot,
     settings: Settings,
-    session_factory: async_sessionmaker[AsyncSession],
+    read_session_factory: async_sessionmaker[AsyncSession],
     app_logger: BoundLogger,
-) -> None:
-    if await reject_if_not_admin(message, settings):
-        return
+    engine: AsyncEngine | None = None,
+) -> TelegramMethod[Any] | None:
+    if (rejection := reject_if_not_admin(message, settings)) is not None:
+        return rejection
 
     text = (message.text or "").strip()
     _, _, payload = text.partition(" ")
     payload = payload.strip()
 
     if not payload:
-        await message.answer("Usage: /broadcast <message>")
-        return
+        return message.answer("Usage: /broadcast <message>")
+
+    # A broadcast paced at the global rate can take many minutes: run it detached so the
+    # admin's queue partition is released right away. The engine's advisory lock keeps
+    # a repeated /broadcast that lands on another worker process from starting a second one.
+    started = await ADMIN_JOBS.start(
+        "broadcast",
+        run_broadcast(bot, message.chat.id, read_session_factory, payload, app_logger),
+        app_logger,
+        engine=engine,
+    )
+    if not started:
+        return message.answer("A broadcast is already running, wait for its report.")
 
     app_logger.info("admin_command_used", command="broadcast", admin_id=message.from_user.id)
-    await message.answer("Broadcast started.")
+    return message.answer("Broadcast started. The report will follow here.")
+
 
+async def run_broadcast(
+    bot: Bot,
+    chat_id: int,
+    read_session_factory: async_sessionmaker[AsyncSession],
+    payload: str,
+    app_logger: BoundLogger,
+) -> None:
     result = await broadcast_to_all_users(
         bot=bot,
-        session_factory=session_factory,
+        session_factory=read_session_factory,
         message_text=payload,
         logger=app_logger,
     )
-
-    await message.answer(
+    await bot.send_message(
+        chat_id,
         "Broadcast complete.\n"
         f"Delivered: {result.delivered}\n"
-        f"Failed: {result.failed}"
+        f"Failed: {result.failed}",
     )
+
+
+@router.message(Command("profile"))
+async def handle_profile(
+    message: Message,
+    bot: Bot,
+    settings: Settings,
+    app_logger: BoundLogger,
+    engine: AsyncEngine | None = None,
+) -> TelegramMethod[Any] | None:
+    if (rejection := reject_if_not_admin(message, settings)) is not None:
+        return rejection
+
+    # /profile [cpu|mem] [seconds] [collapsed]
+    args = (message.text or "").split()[1:]
+    if args and args[0] not in ("cpu", "mem", "memory"):
+        return message.answer("Usage: /profile [cpu|mem] [seconds] [collapsed]")
+    kind = "memory" if args and args[0] != "cpu" else "cpu"
+    try:
+        seconds = float(args[1]) if len(args) > 1 else 10.0
+    except ValueError:
+        return message.answer("Usage: /profile [cpu|mem] [seconds] [collapsed]")
+    output = "collapsed" if kind == "cpu" and "collapsed" in args[2:] else "top"
+
+    if PROFILER.running:
+        return message.answer("Another profile is already running, try again later.")
+
+    # Detached and locked like /broadcast: the profile lasts up to two minutes.
+    started = await ADMIN_JOBS.start(
+        "profile",
+        run_profile(bot, message.chat.id, kind, seconds, output),
+        app_logger,
+        engine=engine,
+    )
+    if not started:
+        return message.answer("Another profile is already running, try again later.")
+
+    app_logger.info("admin_command_used", command="profile", admin_id=message.from_user.id, kind=kind)
+    return message.answer(f"Profiling {kind} for {seconds:.0f}s...")
+
+
+async def run_profile(bot: Bot, chat_id: int, kind: ProfileKind, seconds: float, output: ProfileFormat) -> None:
+    try:
+        report = await PROFILER.profile(kind, seconds, output=output)
+    except ProfilerBusyError:
+        await bot.send_message(chat_id, "Another profile is already running, try again later.")
+        return
+
+    file = BufferedInputFile(report.text.encode("utf-8"), filename=report.filename)
+    await bot.send_document(chat_id, document=file)
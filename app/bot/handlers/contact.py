@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import re
+from typing import Any
 
 from aiogram import Bot, F, Router
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.methods import TelegramMethod
 from aiogram.types import CallbackQuery, Contact, Message
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from structlog.stdlib import BoundLogger
@@ -19,41 +21,10 @@ from app.bot.keyboards import (
     build_remove_keyboard,
     build_simple_contact_keyboard,
 )
+from app.db.enums import OutboxEventKind
+from app.repositories.outbox import OutboxRepository
 from app.repositories.users import UsersRepository
-from app.services.google_sheets_service import GoogleSheetsService
-
-
-async def _sync_to_sheets_async(
-    google_sheets_service: GoogleSheetsService,
-    tg_user_id: int,
-    username: str | None,
-    telegram_first_name: str | None,
-    telegram_last_name: str | None,
-    contact_name: str | None,
-    contact_phone: str | None,
-    is_subscribed: bool,
-    is_participant: bool,
-    referrals_confirmed: int,
-    logger: BoundLogger,
-) -> None:
-    """Асинхронная обертка для синхронизации в Google Sheets."""
-    import asyncio
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        None,
-        lambda: google_sheets_service.add_contact(
-            tg_user_id=tg_user_id,
-            username=username,
-            telegram_first_name=telegram_first_name,
-            telegram_last_name=telegram_last_name,
-            contact_name=contact_name,
-            contact_phone=contact_phone,
-            is_subscribed=is_subscribed,
-            is_participant=is_participant,
-            referrals_confirmed=referrals_confirmed,
-        ),
-    )
-    logger.info("contact_synced_to_sheets", tg_user_id=tg_user_id)
+from app.services.outbox_dispatcher import OutboxDispatcher
 
 
 class ContactStates(StatesGroup):
@@ -133,39 +104,36 @@ async def request_simple_contact(
 async def handle_contact_command(
     message: Message,
     state: FSMContext,
-    session_factory: async_sessionmaker[AsyncSession],
+    read_session_factory: async_sessionmaker[AsyncSession],
     app_logger: BoundLogger,
-) -> None:
+) -> TelegramMethod[Any] | None:
     """Обработчик команды /contact для запроса контактной информации."""
     if message.from_user is None:
         return
 
-    # Проверяем, является ли пользователь участником
-    async with session_factory() as session:
-        user = await UsersRepository.get_by_tg_user_id(session, message.from_user.id)
+    # Проверяем, является ли пользователь участником (только чтение, допускается реплика)
+    async with read_session_factory() as session:
+        user = await UsersRepository.get_snapshot_by_tg_user_id(session, message.from_user.id)
         if user is None:
-            await message.answer(
+            return message.answer(
                 "Сначала выполните условия участия в розыгрыше.\n"
                 "Используйте команду /start для начала."
             )
-            return
 
         if not user.is_participant:
-            await message.answer(
+            return message.answer(
                 "Вы еще не являетесь участником розыгрыша.\n"
                 "Выполните все условия участия, чтобы получить возможность предоставить контактную информацию."
             )
-            return
 
         # Если контактная информация уже предоставлена
         if user.contact_name and user.contact_phone:
-            await message.answer(
+            return message.answer(
                 f"✅ Ваша контактная информация уже сохранена:\n\n"
                 f"Имя: {user.contact_name}\n"
                 f"Телефон: {user.contact_phone}\n\n"
                 "Если хотите изменить данные, начните заново."
             )
-            return
 
     # Запрашиваем контактную информацию
     await request_contact_info(message.bot, message.from_user.id, state, app_logger)
@@ -176,25 +144,23 @@ async def handle_contact_name(
     message: Message,
     state: FSMContext,
     app_logger: BoundLogger,
-) -> None:
+) -> TelegramMethod[Any] | None:
     """Обработка ввода имени."""
     if message.text is None:
         return
 
     if message.text.strip().lower() in ["отменить", "❌ отменить", "cancel"]:
         await state.clear()
-        await message.answer("Ввод контактной информации отменен.", reply_markup=build_remove_keyboard())
-        return
+        return message.answer("Ввод контактной информации отменен.", reply_markup=build_remove_keyboard())
 
     name = message.text.strip()
     if len(name) < 2:
-        await message.answer("Имя слишком короткое. Пожалуйста, введите полное имя (минимум 2 символа).")
-        return
+        return message.answer("Имя слишком короткое. Пожалуйста, введите полное имя (минимум 2 символа).")
 
     await state.update_data(contact_name=name)
     await state.set_state(ContactStates.waiting_for_phone)
 
-    await message.answer(
+    return message.answer(
         f"✅ Имя сохранено: {name}\n\n"
         "2️⃣ Теперь введите ваш номер телефона\n"
         "Формат: +7XXXXXXXXXX или 8XXXXXXXXXX",
@@ -210,8 +176,8 @@ async def handle_contact_from_button(
     bot: Bot,
     bot_username: str,
     app_logger: BoundLogger,
-    google_sheets_service: GoogleSheetsService,
-) -> None:
+    outbox_dispatcher: OutboxDispatcher,
+) -> TelegramMethod[Any] | None:
     """Обработка контакта из кнопки Telegram.
     
     Это событие срабатывает ТОЛЬКО после того, как пользователь нажал "OK" 
@@ -241,8 +207,7 @@ async def handle_contact_from_button(
     # Валидация: проверяем, что есть телефон
     if not phone:
         app_logger.warning("contact_received_without_phone", tg_user_id=message.from_user.id)
-        await message.answer("Не удалось получить номер телефона. Попробуйте еще раз.")
-        return
+        return message.answer("Не удалось получить номер телефона. Попробуйте еще раз.")
 
     # Нормализуем телефон
     cleaned_phone = re.sub(r"[^\d+]", "", phone)
@@ -274,30 +239,22 @@ async def handle_contact_from_button(
                         has_name=bool(name),
                         has_phone=bool(cleaned_phone),
                     )
-            
-            # Сохраняем в Google Sheets ТОЛЬКО после успешного сохранения в БД
-            # и ТОЛЬКО если есть имя и телефон
-            if user is not None and name and cleaned_phone:
-                app_logger.info(
-                    "syncing_contact_to_sheets",
-                    tg_user_id=user.tg_user_id,
-                )
-                import asyncio
-                asyncio.create_task(
-                    _sync_to_sheets_async(
-                        google_sheets_service,
-                        user.tg_user_id,
-                        user.username,
-                        user.first_name,
-                        user.last_name,
-                        name,
-                        cleaned_phone,
-                        user.is_subscribed,
-                        user.is_participant,
-                        user.referrals_confirmed,
-                        app_logger,
-                    )
-                )
+
+                    # Синхронизация с Google Sheets фиксируется в той же транзакции,
+                    # что и контакт, и ТОЛЬКО если есть имя и телефон
+                    if name and cleaned_phone:
+                        app_logger.info(
+                            "syncing_contact_to_sheets",
+                            tg_user_id=user.tg_user_id,
+                        )
+                        await OutboxRepository.enqueue(
+                            session,
+                            OutboxEventKind.SHEETS_SYNC,
+                            {"tg_user_id": user.tg_user_id},
+                        )
+
+        if user is not None:
+            outbox_dispatcher.wake()
 
         await state.clear()
         referral_link = f"https://t.me/{bot_username}?start={message.from_user.id}" if bot_username else ""
@@ -310,8 +267,7 @@ async def handle_contact_from_button(
         if referral_link:
             response += f"\n\nВаша ссылка:\n{referral_link}"
 
-        await message.answer(response, reply_markup=build_remove_keyboard())
-        return
+        return message.answer(response, reply_markup=build_remove_keyboard())
 
     # Если это полный процесс ввода контактной информации (не используется, но оставляем для совместимости)
     if current_state in [ContactStates.waiting_for_name, ContactStates.waiting_for_phone]:
@@ -322,26 +278,16 @@ async def handle_contact_from_button(
                 if user is not None:
                     user.contact_name = name
                     user.contact_phone = cleaned_phone
-            
-            # Сохраняем в Google Sheets
-            if user is not None:
-                    import asyncio
-                    asyncio.create_task(
-                        _sync_to_sheets_async(
-                            google_sheets_service,
-                            user.tg_user_id,
-                            user.username,
-                            user.first_name,
-                            user.last_name,
-                            name,
-                            cleaned_phone,
-                            user.is_subscribed,
-                            user.is_participant,
-                            user.referrals_confirmed,
-                            app_logger,
-                        )
+                    # Сохраняем в Google Sheets
+                    await OutboxRepository.enqueue(
+                        session,
+                        OutboxEventKind.SHEETS_SYNC,
+                        {"tg_user_id": user.tg_user_id},
                     )
-        
+
+        if user is not None:
+            outbox_dispatcher.wake()
+
         await state.clear()
         referral_link = f"https://t.me/{bot_username}?start={message.from_user.id}" if bot_username else ""
         
@@ -353,7 +299,7 @@ async def handle_contact_from_button(
         if referral_link:
             response += f"\n\nВаша ссылка:\n{referral_link}"
         
-        await message.answer(response, reply_markup=build_remove_keyboard())
+        return message.answer(response, reply_markup=build_remove_keyboard())
 
 
 @router.message(StateFilter(ContactStates.waiting_for_phone), F.text)
@@ -364,24 +310,22 @@ async def handle_contact_phone(
     bot: Bot,
     bot_username: str,
     app_logger: BoundLogger,
-    google_sheets_service: GoogleSheetsService,
-) -> None:
+    outbox_dispatcher: OutboxDispatcher,
+) -> TelegramMethod[Any] | None:
     """Обработка ввода телефона."""
     if message.text is None or message.from_user is None:
         return
 
     if message.text.strip().lower() in ["отменить", "❌ отменить", "cancel"]:
         await state.clear()
-        await message.answer("Ввод контактной информации отменен.", reply_markup=build_remove_keyboard())
-        return
+        return message.answer("Ввод контактной информации отменен.", reply_markup=build_remove_keyboard())
 
     phone = message.text.strip()
     if not validate_phone(phone):
-        await message.answer(
+        return message.answer(
             "Неверный формат телефона. Пожалуйста, введите номер в формате:\n"
             "+7XXXXXXXXXX или 8XXXXXXXXXX"
         )
-        return
 
     # Нормализуем телефон
     cleaned_phone = re.sub(r"[^\d+]", "", phone)
@@ -406,25 +350,15 @@ async def handle_contact_phone(
                     has_name=bool(contact_name),
                     has_phone=bool(cleaned_phone),
                 )
-        
-        # Сохраняем в Google Sheets после коммита транзакции (асинхронно в фоне)
-        if user is not None:
-            import asyncio
-            asyncio.create_task(
-                _sync_to_sheets_async(
-                    google_sheets_service,
-                    user.tg_user_id,
-                    user.username,
-                    user.first_name,
-                    user.last_name,
-                    contact_name,
-                    cleaned_phone,
-                    user.is_subscribed,
-                    user.is_participant,
-                    user.referrals_confirmed,
-                    app_logger,
+                # Синхронизация с Google Sheets доставляется outbox-диспетчером после коммита
+                await OutboxRepository.enqueue(
+                    session,
+                    OutboxEventKind.SHEETS_SYNC,
+                    {"tg_user_id": user.tg_user_id},
                 )
-            )
+
+    if user is not None:
+        outbox_dispatcher.wake()
 
     await state.clear()
     referral_link = f"https://t.me/{bot_username}?start={message.from_user.id}" if bot_username else ""
@@ -439,6 +373,6 @@ async def handle_contact_phone(
     if referral_link:
         response += f"\n\nВаша ссылка:\n{referral_link}"
 
-    await message.answer(response, reply_markup=build_remove_keyboard())
+    return message.answer(response, reply_markup=build_remove_keyboard())
 
 
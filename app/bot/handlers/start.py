@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Any
 
 from aiogram import Router
 from aiogram.filters import CommandObject, CommandStart
+from aiogram.methods import TelegramMethod
 from aiogram.types import FSInputFile, Message
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from structlog.stdlib import BoundLogger
@@ -15,7 +17,8 @@ from app.services.referral_service import process_start_command
 
 router = Router(name=__name__)
 WELCOME_IMAGE_PATH = Path(__file__).resolve().parents[2] / "assets" / "welcome.png"
-
+# Checked once at import: a stat() per /start would block the event loop on slow disks.
+WELCOME_IMAGE_EXISTS = WELCOME_IMAGE_PATH.exists()
 
 
 @router.message(CommandStart())
@@ -26,7 +29,7 @@ async def handle_start(
     app_logger: BoundLogger,
     bot_username: str,
     channel_url: str,
-) -> None:
+) -> TelegramMethod[Any] | None:
     if message.from_user is None:
         return
 
@@ -59,13 +62,12 @@ async def handle_start(
     response_text = "\n".join(parts)
     keyboard = build_subscription_keyboard(channel_url)
 
-    if WELCOME_IMAGE_PATH.exists():
-        await message.answer_photo(
+    if WELCOME_IMAGE_EXISTS:
+        return message.answer_photo(
             photo=FSInputFile(str(WELCOME_IMAGE_PATH)),
             caption=response_text,
             reply_markup=keyboard,
         )
-        return
 
     app_logger.warning("welcome_image_not_found", path=str(WELCOME_IMAGE_PATH))
-    await message.answer(response_text, reply_markup=keyboard)
+    return message.answer(response_text, reply_markup=keyboard)
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 from aiogram import Bot, F, Router
-from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.methods import TelegramMethod
 from aiogram.types import CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from structlog.stdlib import BoundLogger
@@ -15,8 +18,7 @@ from app.bot.handlers.contact import request_contact_info, request_simple_contac
 from app.bot.keyboards import build_subscription_keyboard
 from app.constants import INVALID_SUBSCRIPTION_STATUSES, VALID_SUBSCRIPTION_STATUSES
 from app.config import Settings
-from app.repositories.users import UsersRepository
-from app.services.google_sheets_service import GoogleSheetsService
+from app.services.outbox_dispatcher import OutboxDispatcher
 from app.services.subscription_service import (
     SubscriptionConfirmationResult,
     confirm_subscription_and_referral,
@@ -38,11 +40,10 @@ async def handle_check_subscription(
     bot_username: str,
     channel_url: str,
     state: FSMContext,
-    google_sheets_service: GoogleSheetsService,
-) -> None:
+    outbox_dispatcher: OutboxDispatcher,
+) -> TelegramMethod[Any] | None:
     if callback.from_user is None:
-        await callback.answer()
-        return
+        return callback.answer()
 
     retry_after = await register_subscription_check_attempt(
         session_factory=session_factory,
@@ -51,11 +52,10 @@ async def handle_check_subscription(
     )
 
     if retry_after > 0:
-        await callback.answer(
+        return callback.answer(
             f"Подождите {retry_after} сек. перед следующей проверкой.",
             show_alert=True,
         )
-        return
 
     try:
         chat_member = await run_with_retry(
@@ -66,8 +66,7 @@ async def handle_check_subscription(
         )
     except TelegramAPIError:
         app_logger.exception("subscription_check_telegram_error", tg_user_id=callback.from_user.id)
-        await callback.answer("Сейчас не удалось проверить подписку. Попробуйте чуть позже.", show_alert=True)
-        return
+        return callback.answer("Сейчас не удалось проверить подписку. Попробуйте чуть позже.", show_alert=True)
 
     status = normalize_member_status(chat_member.status)
     is_subscribed = status in VALID_SUBSCRIPTION_STATUSES
@@ -87,11 +86,10 @@ async def handle_check_subscription(
                 status=status,
             )
 
-        await callback.answer(
+        return callback.answer(
             "Подписка не подтверждена. Подпишитесь на канал и нажмите кнопку еще раз.",
             show_alert=True,
         )
-        return
 
     confirmation_result: SubscriptionConfirmationResult = await confirm_subscription_and_referral(
         session_factory=session_factory,
@@ -100,70 +98,19 @@ async def handle_check_subscription(
     )
 
     if confirmation_result.referrer_to_notify is not None:
-        # Обновляем Google Sheets для реферера (асинхронно в фоне) только если у него есть контакт
-        async def _update_referrer_sheets():
-            async with session_factory() as session:
-                referrer = await UsersRepository.get_by_tg_user_id(session, confirmation_result.referrer_to_notify)
-                # Обновляем Google Sheets только если у реферера есть контактная информация
-                if referrer and referrer.contact_name and referrer.contact_phone:
-                    import asyncio
-                    loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(
-                        None,
-                        lambda: google_sheets_service.add_contact(
-                            tg_user_id=referrer.tg_user_id,
-                            username=referrer.username,
-                            telegram_first_name=referrer.first_name,
-                            telegram_last_name=referrer.last_name,
-                            contact_name=referrer.contact_name,
-                            contact_phone=referrer.contact_phone,
-                            is_subscribed=referrer.is_subscribed,
-                            is_participant=referrer.is_participant,
-                            referrals_confirmed=referrer.referrals_confirmed,
-                        ),
-                    )
-        import asyncio
-        asyncio.create_task(_update_referrer_sheets())
-        if confirmation_result.referrer_is_participant:
-            referrer_text = (
-                "Ваш друг подписался по вашей ссылке.\n"
-                "Поздравляем, вы участвуете в розыгрыше!"
-            )
-        else:
-            referrer_text = (
-                "Ваш друг подписался по вашей ссылке.\n"
-                "Чтобы участвовать в розыгрыше, подтвердите и свою подписку на канал."
-            )
-        try:
-            await run_with_retry(
-                bot.send_message,
-                chat_id=confirmation_result.referrer_to_notify,
-                text=referrer_text,
-                logger=app_logger,
-            )
-        except (TelegramForbiddenError, TelegramBadRequest):
-            app_logger.warning(
-                "referrer_notification_failed",
-                referrer_id=confirmation_result.referrer_to_notify,
-            )
-        except Exception:
-            app_logger.exception(
-                "referrer_notification_unexpected_error",
-                referrer_id=confirmation_result.referrer_to_notify,
-            )
+        # Уведомление и синхронизация с Google Sheets уже записаны в outbox вместе с подтверждением
+        outbox_dispatcher.wake()
 
     # If nothing changed, do not send duplicate messages; just show current progress.
     if not confirmation_result.user_subscription_changed and not confirmation_result.user_participant_changed:
         if confirmation_result.user_is_participant:
-            await callback.answer("Вы уже участвуете в розыгрыше.")
-            return
+            return callback.answer("Вы уже участвуете в розыгрыше.")
 
         referrals_needed = max(0, 1 - confirmation_result.referrals_confirmed)
-        await callback.answer(
+        return callback.answer(
             f"Подписка уже подтверждена. Ждем подписку друга по вашей ссылке. Осталось друзей: {referrals_needed}.",
             show_alert=True,
         )
-        return
 
     # Если подписка только что подтверждена - запрашиваем контакт
     if confirmation_result.user_subscription_changed and not confirmation_result.user_has_contact:
@@ -208,4 +155,4 @@ async def handle_check_subscription(
                 reply_markup=build_subscription_keyboard(channel_url),
             )
 
-    await callback.answer("Статус обновлен.")
+    return callback.answer("Статус обновлен.")
@@ -0,0 +1,127 @@
+"""Bot username and channel link shown to users, resolved at startup.
+
+Both come from the Bot API (``getMe`` and ``getChat``) unless configured. The
+two calls run concurrently, and with ``BOT_IDENTITY_CACHE_FILE`` the last
+resolved values are served from disk on the next start while a background
+task refreshes them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from structlog.stdlib import BoundLogger
+
+if TYPE_CHECKING:
+    from app.config import Settings
+
+
+@dataclass(slots=True, frozen=True)
+class BotIdentity:
+    bot_username: str
+    channel_url: str
+
+
+def derive_channel_url(channel_id: int) -> str:
+    channel = str(channel_id)
+    normalized = channel[4:] if channel.startswith("-100") else channel.lstrip("-")
+    return f"https://t.me/c/{normalized}"
+
+
+async def resolve_channel_url(bot: Bot, settings: Settings, logger: BoundLogger) -> str:
+    if settings.channel_url:
+        return settings.channel_url
+
+    try:
+        chat = await bot.get_chat(settings.channel_id)
+        if getattr(chat, "username", None):
+            return f"https://t.me/{chat.username}"
+        if getattr(chat, "invite_link", None):
+            return str(chat.invite_link)
+    except TelegramAPIError:
+        logger.warning("channel_url_auto_discovery_failed")
+    except Exception:
+        logger.warning("channel_url_auto_discovery_unexpected_error")
+
+    return derive_channel_url(settings.channel_id)
+
+
+async def _fetch_bot_username(bot: Bot) -> str:
+    me = await bot.get_me()
+    return me.username or ""
+
+
+async def fetch_bot_identity(bot: Bot, settings: Settings, logger: BoundLogger) -> BotIdentity:
+    """Ask the Bot API for whatever is not configured, with both calls in flight at once."""
+
+    if settings.skip_webhook_setup:
+        # Local long-polling mode: BOT_USERNAME saves getMe, and the channel link is never looked up.
+        channel_url = settings.channel_url or derive_channel_url(settings.channel_id)
+        if settings.bot_username:
+            return BotIdentity(settings.bot_username, channel_url)
+        return BotIdentity(await _fetch_bot_username(bot), channel_url)
+
+    bot_username, channel_url = await asyncio.gather(
+        _fetch_bot_username(bot),
+        resolve_channel_url(bot, settings, logger),
+    )
+    return BotIdentity(bot_username, channel_url)
+
+
+def _cache_key(settings: Settings) -> str:
+    # The numeric bot id, not the token: the cache file must not hold a secret.
+    bot_id = settings.bot_token.split(":", 1)[0]
+    return f"{bot_id}:{settings.channel_id}:{settings.channel_url or ''}"
+
+
+def load_cached_identity(path: str | os.PathLike[str], settings: Settings) -> BotIdentity | None:
+    """The identity saved for this bot and channel, or ``None`` if missing, stale or unreadable."""
+
+    try:
+        data: dict[str, Any] = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("key") != _cache_key(settings):
+            return None
+        return BotIdentity(bot_username=str(data["bot_username"]), channel_url=str(data["channel_url"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_cached_identity(path: str | os.PathLike[str], settings: Settings, identity: BotIdentity) -> None:
+    target = Path(path)
+    # Written aside and renamed, so a concurrently starting web worker never reads half a file.
+    temporary = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    temporary.write_text(json.dumps({"key": _cache_key(settings), **asdict(identity)}), encoding="utf-8")
+    temporary.replace(target)
+
+
+async def refresh_cached_identity(
+    bot: Bot,
+    settings: Settings,
+    logger: BoundLogger,
+    path: str | os.PathLike[str],
+    cached: BotIdentity,
+    workflow_data: dict[str, Any],
+) -> None:
+    """Re-resolve an identity served from the cache and apply and persist it if it changed."""
+
+    try:
+        identity = await fetch_bot_identity(bot, settings, logger)
+    except Exception as exc:
+        logger.warning("bot_identity_refresh_failed", error=str(exc))
+        return
+
+    if identity == cached:
+        return
+    workflow_data.update(bot_username=identity.bot_username, channel_url=identity.channel_url)
+    logger.info("bot_identity_changed", bot_username=identity.bot_username, channel_url=identity.channel_url)
+    try:
+        await asyncio.to_thread(save_cached_identity, path, settings, identity)
+    except OSError as exc:
+        logger.warning("bot_identity_cache_write_failed", path=str(path), error=str(exc))
@@ -0,0 +1,66 @@
+"""Dispatcher middleware recording per-handler latency."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from app.metrics import REGISTRY
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "bot_handler_seconds",
+    "Time spent in an update handler, by handler and outcome.",
+    ("handler", "outcome"),
+)
+
+# Event observers whose handlers are timed; "update" and "error" are dispatcher plumbing.
+INSTRUMENTED_EVENTS = ("message", "callback_query", "my_chat_member", "chat_member")
+
+
+def handler_name(handler: HandlerObject | None) -> str:
+    """``<handlers module>.<function>``, e.g. ``start.start_command``."""
+
+    if handler is None:
+        return "unknown"
+    callback = handler.callback
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', type(callback).__name__)}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware timing the matched handler into ``bot_handler_seconds``."""
+
+    def __init__(self) -> None:
+        self._names: dict[int, str] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_object: HandlerObject | None = data.get("handler")
+        name = self._names.get(id(handler_object))
+        if name is None:
+            name = self._names[id(handler_object)] = handler_name(handler_object)
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await handler(event, data)
+            outcome = "ok"
+            return result
+        finally:
+            HANDLER_LATENCY.labels(name, outcome).observe(time.perf_counter() - started)
+
+
+def install_handler_metrics(dispatcher: Dispatcher) -> None:
+    """Register the middleware on the root observers so every nested router is covered."""
+
+    middleware = HandlerMetricsMiddleware()
+    for event_name in INSTRUMENTED_EVENTS:
+        dispatcher.observers[event_name].middleware(middleware)
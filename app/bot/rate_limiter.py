@@ -0,0 +1,248 @@
+"""Priority-aware outbound rate limiting for Bot API calls."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Iterator
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from structlog.stdlib import BoundLogger
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class RequestPriority(IntEnum):
+    """Outbound lanes; a lower value is served first."""
+
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+    BULK = 2
+
+
+_current_priority: ContextVar[RequestPriority] = ContextVar("request_priority", default=RequestPriority.INTERACTIVE)
+
+# Methods that deliver a message into a chat and therefore count against Telegram's limits.
+_LIMITED_METHOD_PREFIXES = ("send", "copy", "forward")
+
+
+@contextmanager
+def request_priority(priority: RequestPriority) -> Iterator[None]:
+    """Run the Bot API calls made inside the block in the given lane."""
+
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket whose rate can be lowered after a 429 and recovers over time."""
+
+    def __init__(self, rate: float, capacity: float, *, recovery_seconds: float = 60.0) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.recovery_seconds = recovery_seconds
+        self._updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + elapsed * self.max_rate / self.recovery_seconds)
+
+    def wait_time(self, now: float, *, reserve: float = 0.0) -> float:
+        """Seconds until a token can be taken while leaving ``reserve`` tokens untouched."""
+
+        self.refill(now)
+        missing = 1.0 + reserve - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1.0
+
+    def reserve_slot(self, now: float) -> float:
+        """Take a token now, going into debt if needed; returns how long to wait for it."""
+
+        self.refill(now)
+        self.tokens -= 1.0
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def penalize(self, retry_after: float, *, pause: bool) -> None:
+        """Halve the rate and optionally block the bucket for ``retry_after`` seconds."""
+
+        self.rate = max(self.max_rate / 8, self.rate / 2)
+        if pause:
+            self.tokens = min(self.tokens, -retry_after * self.rate)
+
+
+class OutboundRateLimiter(BaseRequestMiddleware):
+    """Session middleware that schedules message-sending calls under Telegram limits.
+
+    A global token bucket is shared by all lanes. Waiting requests are granted
+    strictly by lane priority (see ``request_priority``), and the
+    notification and bulk lanes must leave part of the bucket untouched so
+    bursts of interactive replies never queue behind a broadcast. Each chat
+    additionally has its own bucket: about one message per second in private
+    chats and twenty per minute in groups. A ``TelegramRetryAfter`` pauses the
+    affected chat and halves the global rate, which then recovers over a
+    minute. The error is re-raised for the caller's retry logic.
+
+    A handler's final reply that goes out in the webhook response is not a
+    session request. ``QueuedRequestHandler`` debits it with ``try_acquire``
+    first and sends it through the session instead when no token is free.
+    """
+
+    def __init__(
+        self,
+        logger: BoundLogger,
+        *,
+        global_rate: float = 30.0,
+        private_chat_rate: float = 1.0,
+        group_chat_rate: float = 20 / 60,
+        chat_burst: float = 3.0,
+        reserved_fraction: dict[RequestPriority, float] | None = None,
+        max_tracked_chats: int = 10_000,
+    ) -> None:
+        self.logger = logger
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.chat_burst = chat_burst
+        self.max_tracked_chats = max_tracked_chats
+
+        self._global = TokenBucket(global_rate, capacity=global_rate)
+        fractions = reserved_fraction or {
+            RequestPriority.INTERACTIVE: 0.0,
+            RequestPriority.NOTIFICATION: 0.2,
+            RequestPriority.BULK: 0.4,
+        }
+        self._reserve = {priority: global_rate * fractions.get(priority, 0.0) for priority in RequestPriority}
+        self._chats: dict[int | str, TokenBucket] = {}
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._pump_task: asyncio.Task[None] | None = None
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not method.__api_method__.startswith(_LIMITED_METHOD_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            delay = self._chat_bucket(chat_id).reserve_slot(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await self._acquire_global(_current_priority.get())
+
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as exc:
+            self._on_retry_after(chat_id, float(exc.retry_after), method.__api_method__)
+            raise
+
+    def try_acquire(self, method: TelegramMethod[Any]) -> bool:
+        """Take the tokens for a call made outside the session, if they are free right now.
+
+        Returns ``False`` without taking anything when the chat or global bucket
+        is empty or other requests are already waiting for the global one.
+        """
+
+        if not method.__api_method__.startswith(_LIMITED_METHOD_PREFIXES):
+            return True
+
+        now = time.monotonic()
+        chat_id = getattr(method, "chat_id", None)
+        chat_bucket = self._chat_bucket(chat_id) if chat_id is not None else None
+        if chat_bucket is not None and chat_bucket.wait_time(now) > 0:
+            return False
+        if self._waiters or self._global.wait_time(now, reserve=self._reserve[_current_priority.get()]) > 0:
+            return False
+
+        if chat_bucket is not None:
+            chat_bucket.take()
+        self._global.take()
+        return True
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_tracked_chats:
+                self._prune_chats()
+            is_private = isinstance(chat_id, int) and chat_id > 0
+            rate = self.private_chat_rate if is_private else self.group_chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, capacity=self.chat_burst)
+        return bucket
+
+    def _prune_chats(self) -> None:
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chats.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity and bucket.rate >= bucket.max_rate:
+                del self._chats[chat_id]
+        if len(self._chats) >= self.max_tracked_chats:
+            self._chats.clear()
+
+    async def _acquire_global(self, priority: RequestPriority) -> None:
+        if not self._waiters and self._global.wait_time(time.monotonic(), reserve=self._reserve[priority]) == 0:
+            self._global.take()
+            return
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump(), name="outbound_rate_limiter")
+        self._wakeup.set()
+        await future
+
+    async def _pump(self) -> None:
+        """Grant tokens to waiters in priority order until the queue is empty."""
+
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self._global.wait_time(time.monotonic(), reserve=self._reserve[RequestPriority(priority)])
+            if wait <= 0:
+                heapq.heappop(self._waiters)
+                self._global.take()
+                future.set_result(None)
+                continue
+
+            # Sleep until a token frees up, or re-evaluate early if a higher-priority request arrives.
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_retry_after(self, chat_id: int | str | None, retry_after: float, api_method: str) -> None:
+        self.logger.warning(
+            "telegram_rate_limited",
+            method=api_method,
+            chat_id=chat_id,
+            retry_after=retry_after,
+            priority=_current_priority.get().name,
+        )
+        self._global.penalize(retry_after, pause=chat_id is None)
+        if chat_id is not None:
+            self._chat_bucket(chat_id).penalize(retry_after, pause=True)
@@ -0,0 +1,134 @@
+"""Tuned and instrumented aiohttp session for the Bot API.
+
+Only ``AiohttpSession``'s public hooks (``create_session``, ``close`` and
+``make_request``) are overridden. They are stable across aiogram 3.x and
+requirements.txt pins aiogram 3.15.0.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ssl
+import time
+from typing import TYPE_CHECKING, Any
+
+import certifi
+from aiogram import __version__ as aiogram_version
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+from app.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+    from app.config import Settings
+
+TELEGRAM_API_LATENCY = REGISTRY.histogram(
+    "telegram_api_request_seconds",
+    "Bot API request latency by method, including failed requests.",
+    ("method",),
+)
+TELEGRAM_API_ERRORS = REGISTRY.counter(
+    "telegram_api_errors_total",
+    "Failed Bot API requests by method and error type.",
+    ("method", "error"),
+)
+
+# File uploads need far more time than regular calls; quick lookups should fail fast.
+DEFAULT_METHOD_TIMEOUTS: dict[str, float] = {
+    "sendPhoto": 120.0,
+    "sendDocument": 120.0,
+    "sendVideo": 120.0,
+    "sendMediaGroup": 120.0,
+    "getChatMember": 10.0,
+    "answerCallbackQuery": 10.0,
+}
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """``AiohttpSession`` with explicit connector settings and per-method timeouts.
+
+    The connector is built from ``connector_options`` in ``create_session``
+    rather than by patching the parent's connector settings. Proxies are not
+    supported. Every request is timed into ``telegram_api_request_seconds`` and
+    failures are counted by error type.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout_seconds: float = 30.0,
+        dns_ttl_seconds: int = 300,
+        timeout_seconds: float = 30.0,
+        method_timeouts: dict[str, float] | None = None,
+        api: TelegramAPIServer = PRODUCTION,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(limit=limit, api=api, timeout=timeout_seconds, **kwargs)
+        self.connector_options: dict[str, Any] = {
+            "ssl": ssl.create_default_context(cafile=certifi.where()),
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout_seconds,
+            "ttl_dns_cache": dns_ttl_seconds,
+        }
+        self.method_timeouts = {**DEFAULT_METHOD_TIMEOUTS, **(method_timeouts or {})}
+        self._client: ClientSession | None = None
+
+    async def create_session(self) -> ClientSession:
+        if self._client is None or self._client.closed:
+            self._client = ClientSession(
+                connector=TCPConnector(**self.connector_options),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"},
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+            # Give the SSL connections time to close, as aiogram's own session does.
+            await asyncio.sleep(0.25)
+
+    async def make_request(
+        self,
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,
+    ) -> TelegramType:
+        api_method = method.__api_method__
+        if timeout is None:
+            timeout = self.method_timeouts.get(api_method)  # type: ignore[assignment]
+
+        started = time.perf_counter()
+        try:
+            return await super().make_request(bot, method, timeout)
+        except TelegramAPIError as exc:
+            TELEGRAM_API_ERRORS.labels(api_method, type(exc).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_API_LATENCY.labels(api_method).observe(time.perf_counter() - started)
+
+
+def create_bot_session(settings: "Settings") -> TunedAiohttpSession:
+    api = PRODUCTION
+    if settings.telegram_api_url:
+        api = TelegramAPIServer.from_base(settings.telegram_api_url, is_local=settings.telegram_api_local)
+
+    return TunedAiohttpSession(
+        limit=settings.telegram_pool_limit,
+        limit_per_host=settings.telegram_pool_limit_per_host,
+        keepalive_timeout_seconds=settings.telegram_keepalive_timeout_seconds,
+        dns_ttl_seconds=settings.telegram_dns_ttl_seconds,
+        timeout_seconds=settings.telegram_request_timeout_seconds,
+        method_timeouts=settings.method_timeouts,
+        api=api,
+    )
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import hashlib
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -14,6 +15,18 @@ class Settings(BaseSettings):
 
     bot_token: str = Field(alias="BOT_TOKEN")
     database_url: str = Field(alias="DATABASE_URL")
+    database_read_url: str | None = Field(default=None, alias="DATABASE_READ_URL")
+
+    # Database pool settings (applied to the primary and the read replica engines)
+    db_pool_size: int = Field(default=10, alias="DB_POOL_SIZE", ge=1)
+    db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW", ge=0)
+    db_pool_timeout_seconds: float = Field(default=30.0, alias="DB_POOL_TIMEOUT_SECONDS")
+    db_pool_recycle_seconds: int = Field(default=300, alias="DB_POOL_RECYCLE_SECONDS")
+    db_pool_pre_ping: bool = Field(default=True, alias="DB_POOL_PRE_PING")
+    db_statement_cache_size: int = Field(default=100, alias="DB_STATEMENT_CACHE_SIZE", ge=0)
+    # PgBouncer in transaction mode: disables asyncpg's prepared statement cache
+    db_pgbouncer: bool = Field(default=False, alias="DB_PGBOUNCER")
+    db_slow_query_seconds: float = Field(default=0.5, alias="DB_SLOW_QUERY_SECONDS")
     channel_id: int = Field(alias="CHANNEL_ID")
     webhook_url: str | None = Field(default=None, alias="WEBHOOK_URL")
     admin_ids: tuple[int, ...] = Field(alias="ADMIN_IDS")
@@ -21,16 +34,115 @@ class Settings(BaseSettings):
     webhook_secret: str | None = Field(default=None, alias="WEBHOOK_SECRET")
     skip_webhook_setup: bool = Field(default=False, alias="SKIP_WEBHOOK_SETUP")
     bot_username: str | None = Field(default=None, alias="BOT_USERNAME")
+    # Last resolved bot username and channel link, served on the next start while getMe/getChat refresh them
+    bot_identity_cache_file: str | None = Field(default=None, alias="BOT_IDENTITY_CACHE_FILE")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    # Render and write logs on a background thread instead of the event loop
+    log_background: bool = Field(default=True, alias="LOG_BACKGROUND")
+    log_json_encoder: Literal["auto", "orjson", "json"] = Field(default="auto", alias="LOG_JSON_ENCODER")
+    # Keep 1 in N of high-volume info events, e.g. "subscription_check_result=100,contact_received_from_user=10"
+    log_sampling: str = Field(default="", alias="LOG_SAMPLING")
     app_host: str = Field(default="0.0.0.0", alias="APP_HOST")
     app_port: int = Field(default=8080, alias="APP_PORT")
     channel_url: str | None = Field(default=None, alias="CHANNEL_URL")
+    web_workers: int = Field(default=1, alias="WEB_WORKERS", ge=1)
+    worker_shutdown_timeout_seconds: float = Field(default=30.0, alias="WORKER_SHUTDOWN_TIMEOUT_SECONDS")
 
     # Google Sheets settings
     google_sheets_enabled: bool = Field(default=False, alias="GOOGLE_SHEETS_ENABLED")
     google_sheets_spreadsheet_id: str | None = Field(default=None, alias="GOOGLE_SHEETS_SPREADSHEET_ID")
     google_sheets_worksheet_name: str = Field(default="Контакты", alias="GOOGLE_SHEETS_WORKSHEET_NAME")
     google_sheets_credentials_path: str | None = Field(default=None, alias="GOOGLE_SHEETS_CREDENTIALS_PATH")
+    google_sheets_shard_max_rows: int = Field(default=50000, alias="GOOGLE_SHEETS_SHARD_MAX_ROWS", gt=0)
+    google_sheets_reconcile_interval_seconds: float = Field(
+        default=0,
+        alias="GOOGLE_SHEETS_RECONCILE_INTERVAL_SECONDS",
+    )
+
+    # FSM storage settings
+    fsm_storage: Literal["postgres", "memory"] = Field(default="postgres", alias="FSM_STORAGE")
+    # Per-process read cache; ignored (0) with WEB_WORKERS > 1, see fsm_read_cache_ttl_seconds
+    fsm_cache_ttl_seconds: float = Field(default=2.0, alias="FSM_CACHE_TTL_SECONDS", ge=0)
+    fsm_state_ttl_seconds: float = Field(default=86400.0, alias="FSM_STATE_TTL_SECONDS")
+
+    # Webhook update processing: "queue" processes through an ordered, bounded worker pool,
+    # "inline" acks at once and runs every update in its own task (no ordering, no bound)
+    update_processing_mode: Literal["queue", "inline"] = Field(default="queue", alias="UPDATE_PROCESSING_MODE")
+    update_queue_workers: int = Field(default=16, alias="UPDATE_QUEUE_WORKERS", ge=1)
+    update_queue_max_size: int = Field(default=1000, alias="UPDATE_QUEUE_MAX_SIZE", ge=1)
+    update_queue_put_timeout_seconds: float = Field(default=5.0, alias="UPDATE_QUEUE_PUT_TIMEOUT_SECONDS")
+    # A partition runs one update at a time for all its users; handlers running longer are cancelled (0 = never)
+    update_handler_timeout_seconds: float = Field(default=60.0, alias="UPDATE_HANDLER_TIMEOUT_SECONDS", ge=0)
+    # How long the webhook waits to return the handler's final reply in its response (0 = never)
+    # Such replies are debited from the outbound rate limiter (sent normally when it is exhausted)
+    update_reply_timeout_seconds: float = Field(default=0.3, alias="UPDATE_REPLY_TIMEOUT_SECONDS")
+    # Opt-in: record anonymized webhook updates with arrival times for bench.replay
+    # (gzip JSONL, rotated at UPDATE_CAPTURE_MAX_BYTES; one file per web worker)
+    update_capture_file: str | None = Field(default=None, alias="UPDATE_CAPTURE_FILE")
+    update_capture_max_bytes: int = Field(default=50 * 1024 * 1024, alias="UPDATE_CAPTURE_MAX_BYTES", gt=0)
+    update_capture_backup_count: int = Field(default=5, alias="UPDATE_CAPTURE_BACKUP_COUNT", ge=0)
+
+    # Bot API HTTP session
+    telegram_api_url: str | None = Field(default=None, alias="TELEGRAM_API_URL")
+    telegram_api_local: bool = Field(default=False, alias="TELEGRAM_API_LOCAL")
+    telegram_pool_limit: int = Field(default=100, alias="TELEGRAM_POOL_LIMIT", ge=0)
+    telegram_pool_limit_per_host: int = Field(default=0, alias="TELEGRAM_POOL_LIMIT_PER_HOST", ge=0)
+    telegram_keepalive_timeout_seconds: float = Field(default=30.0, alias="TELEGRAM_KEEPALIVE_TIMEOUT_SECONDS")
+    telegram_dns_ttl_seconds: int = Field(default=300, alias="TELEGRAM_DNS_TTL_SECONDS")
+    telegram_request_timeout_seconds: float = Field(default=30.0, alias="TELEGRAM_REQUEST_TIMEOUT_SECONDS", gt=0)
+    # Per-method overrides, e.g. "sendDocument=120,getChatMember=5"
+    telegram_method_timeouts: str = Field(default="", alias="TELEGRAM_METHOD_TIMEOUTS")
+
+    # Outbound Bot API limits (per bot; the global rate is split between WEB_WORKERS processes)
+    telegram_global_rate: float = Field(default=30.0, alias="TELEGRAM_GLOBAL_RATE", gt=0)
+    telegram_private_chat_rate: float = Field(default=1.0, alias="TELEGRAM_PRIVATE_CHAT_RATE", gt=0)
+    telegram_group_chat_per_minute: float = Field(default=20.0, alias="TELEGRAM_GROUP_CHAT_PER_MINUTE", gt=0)
+
+    # Circuit breaker per Bot API method: opens after N consecutive network/5xx failures
+    telegram_circuit_failure_threshold: int = Field(default=5, alias="TELEGRAM_CIRCUIT_FAILURE_THRESHOLD", ge=1)
+    telegram_circuit_recovery_seconds: float = Field(default=30.0, alias="TELEGRAM_CIRCUIT_RECOVERY_SECONDS")
+
+    # Observability: /metrics endpoint (Prometheus text format) and event loop lag sampling
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+    event_loop_lag_interval_seconds: float = Field(default=0.5, alias="EVENT_LOOP_LAG_INTERVAL_SECONDS", gt=0)
+    # Log the blocking stack when the loop is stalled longer than this (0 = off)
+    event_loop_stall_threshold_seconds: float = Field(
+        default=0.25,
+        alias="EVENT_LOOP_STALL_THRESHOLD_SECONDS",
+        ge=0,
+    )
+
+    # Readiness (/readyz): checks refresh in the background, probes read the last snapshot.
+    # The instance reports not-ready once any check crosses its threshold.
+    readiness_refresh_seconds: float = Field(default=5.0, alias="READINESS_REFRESH_SECONDS", gt=0)
+    readiness_deep_refresh_seconds: float = Field(default=30.0, alias="READINESS_DEEP_REFRESH_SECONDS", gt=0)
+    readiness_check_timeout_seconds: float = Field(default=5.0, alias="READINESS_CHECK_TIMEOUT_SECONDS", gt=0)
+    readiness_db_latency_seconds: float = Field(default=0.5, alias="READINESS_DB_LATENCY_SECONDS")
+    readiness_pool_saturation: float = Field(default=0.9, alias="READINESS_POOL_SATURATION", gt=0, le=1)
+    readiness_update_queue_saturation: float = Field(
+        default=0.9,
+        alias="READINESS_UPDATE_QUEUE_SATURATION",
+        gt=0,
+        le=1,
+    )
+    readiness_bot_api_latency_seconds: float = Field(default=2.0, alias="READINESS_BOT_API_LATENCY_SECONDS")
+    readiness_sheets_backlog: int = Field(default=5000, alias="READINESS_SHEETS_BACKLOG", ge=1)
+
+    # Tracing (opt-in): one trace per update; slow traces are logged as a span summary and exported,
+    # the rest are exported at TRACE_SAMPLE_RATIO (OTLP/JSON to a file and/or a collector)
+    tracing_enabled: bool = Field(default=False, alias="TRACING_ENABLED")
+    trace_slow_threshold_seconds: float = Field(default=1.0, alias="TRACE_SLOW_THRESHOLD_SECONDS")
+    trace_sample_ratio: float = Field(default=0.01, alias="TRACE_SAMPLE_RATIO", ge=0, le=1)
+    trace_export_file: str | None = Field(default=None, alias="TRACE_EXPORT_FILE")
+    trace_otlp_endpoint: str | None = Field(default=None, alias="TRACE_OTLP_ENDPOINT")
+
+    # Bearer token for the admin HTTP endpoints (/admin/profile); unset disables them
+    admin_api_token: str | None = Field(default=None, alias="ADMIN_API_TOKEN")
+
+    # Transactional outbox settings
+    outbox_batch_size: int = Field(default=100, alias="OUTBOX_BATCH_SIZE")
+    outbox_poll_interval_seconds: float = Field(default=1.0, alias="OUTBOX_POLL_INTERVAL_SECONDS")
+    outbox_max_attempts: int = Field(default=8, alias="OUTBOX_MAX_ATTEMPTS")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -61,6 +173,33 @@ class Settings(BaseSettings):
 
         raise ValueError("ADMIN_IDS must be a comma-separated string or a sequence")
 
+    @field_validator("telegram_method_timeouts")
+    @classmethod
+    def validate_method_timeouts(cls, value: str) -> str:
+        """Validate TELEGRAM_METHOD_TIMEOUTS as comma-separated <method>=<seconds> pairs."""
+
+        for item in value.split(","):
+            if not item.strip():
+                continue
+            method, separator, seconds = item.partition("=")
+            if not separator or not method.strip():
+                raise ValueError("TELEGRAM_METHOD_TIMEOUTS must look like sendDocument=120,getChatMember=5")
+            float(seconds)
+        return value
+
+    @field_validator("log_sampling")
+    @classmethod
+    def validate_log_sampling(cls, value: str) -> str:
+        """Validate LOG_SAMPLING as comma-separated <event>=<keep 1 in N> pairs."""
+
+        for item in value.split(","):
+            if not item.strip():
+                continue
+            event, separator, rate = item.partition("=")
+            if not separator or not event.strip() or int(rate) < 1:
+                raise ValueError("LOG_SAMPLING must look like subscription_check_result=100,other_event=10")
+        return value
+
     @field_validator("channel_id")
     @classmethod
     def validate_channel_id(cls, value: int) -> int:
@@ -75,6 +214,45 @@ class Settings(BaseSettings):
             raise ValueError("WEBHOOK_URL is required when SKIP_WEBHOOK_SETUP=false")
         return self
 
+    @model_validator(mode="after")
+    def validate_web_workers(self) -> "Settings":
+        """Validate that multi-process mode runs on webhooks with shared FSM state."""
+        if self.web_workers > 1 and self.skip_webhook_setup:
+            raise ValueError("WEB_WORKERS > 1 requires webhook mode (SKIP_WEBHOOK_SETUP=false)")
+        if self.web_workers > 1 and self.fsm_storage != "postgres":
+            raise ValueError("WEB_WORKERS > 1 requires FSM_STORAGE=postgres")
+        return self
+
+    @property
+    def fsm_read_cache_ttl_seconds(self) -> float:
+        """FSM read cache TTL actually used.
+
+        With several workers a user's consecutive updates can reach different
+        processes, and a cached state could be one step behind; every read then
+        goes to Postgres. Writes are still flushed up to 50 ms after the update,
+        so a second update handled by another worker within that window can
+        read the previous state.
+        """
+        return 0.0 if self.web_workers > 1 else self.fsm_cache_ttl_seconds
+
+    @property
+    def method_timeouts(self) -> dict[str, float]:
+        timeouts: dict[str, float] = {}
+        for item in self.telegram_method_timeouts.split(","):
+            if item.strip():
+                method, _, seconds = item.partition("=")
+                timeouts[method.strip()] = float(seconds)
+        return timeouts
+
+    @property
+    def log_sampling_rates(self) -> dict[str, int]:
+        rates: dict[str, int] = {}
+        for item in self.log_sampling.split(","):
+            if item.strip():
+                event, _, rate = item.partition("=")
+                rates[event.strip()] = int(rate)
+        return rates
+
     @property
     def resolved_webhook_secret(self) -> str:
         if self.webhook_secret:
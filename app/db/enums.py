@@ -6,3 +6,14 @@ from enum import Enum
 class ReferralStatus(str, Enum):
     PENDING = "pending"
     CONFIRMED = "confirmed"
+
+
+class OutboxEventKind(str, Enum):
+    SHEETS_SYNC = "sheets_sync"
+    REFERRER_NOTIFICATION = "referrer_notification"
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
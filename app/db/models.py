@@ -4,15 +4,31 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, CheckConstraint, DateTime, Enum, ForeignKey, Integer, Text, func
+from sqlalchemy import BigInteger, Boolean, CheckConstraint, DateTime, Enum, ForeignKey, Index, Integer, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base, TimestampMixin
-from app.db.enums import ReferralStatus
+from app.db.enums import OutboxEventKind, OutboxStatus, ReferralStatus
 
 
 class User(Base, TimestampMixin):
     __tablename__ = "users"
+    # Partial/covering indexes mirror the hot queries in UsersRepository; see migration 20261019_0003.
+    __table_args__ = (
+        Index("ix_users_subscribed_id", "id", postgresql_where="is_subscribed"),
+        Index("ix_users_participant_id", "id", postgresql_where="is_participant"),
+        Index(
+            "ix_users_export_id",
+            "id",
+            postgresql_include=["tg_user_id", "username", "referrals_confirmed", "is_participant", "created_at"],
+        ),
+        Index(
+            "ix_users_with_contact_id",
+            "id",
+            postgresql_where="contact_name IS NOT NULL AND contact_phone IS NOT NULL",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     tg_user_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
@@ -36,6 +52,7 @@ class Referral(Base):
     __tablename__ = "referrals"
     __table_args__ = (
         CheckConstraint("referrer_id <> referral_id", name="ck_referrals_no_self_referral"),
+        Index("ix_referrals_confirmed_id", "id", postgresql_where="status = 'confirmed'"),
     )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
@@ -68,3 +85,71 @@ class Referral(Base):
         nullable=False,
         server_default=func.now(),
     )
+
+
+class OutboxEvent(Base):
+    """External side effect recorded in the same transaction as the state change."""
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Claims walk pending events in id order and filter on available_at from the index;
+        # pending counts by kind are index-only.
+        Index(
+            "ix_outbox_events_pending_id",
+            "id",
+            postgresql_include=["available_at", "kind"],
+            postgresql_where="status = 'pending'",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    kind: Mapped[OutboxEventKind] = mapped_column(
+        Enum(
+            OutboxEventKind,
+            name="outbox_event_kind",
+            native_enum=True,
+            values_callable=lambda enum_cls: [member.value for member in enum_cls],
+        ),
+        nullable=False,
+    )
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    status: Mapped[OutboxStatus] = mapped_column(
+        Enum(
+            OutboxStatus,
+            name="outbox_status",
+            native_enum=True,
+            values_callable=lambda enum_cls: [member.value for member in enum_cls],
+        ),
+        nullable=False,
+        default=OutboxStatus.PENDING,
+        server_default=OutboxStatus.PENDING.value,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+
+
+class FsmState(Base):
+    """Persisted aiogram FSM state and data for one storage key."""
+
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(Text, primary_key=True)
+    state: Mapped[str | None] = mapped_column(Text, nullable=True)
+    data: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict, server_default="{}")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        index=True,
+    )
@@ -2,21 +2,209 @@
 
 from __future__ import annotations
 
+import hashlib
+import re
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+from app.logging_setup import get_logger
+from app.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from app.config import Settings
+
+F = TypeVar("F", bound=Callable[..., object])
+
+DB_POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, including connecting new ones.",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_IN_USE = REGISTRY.gauge("db_pool_connections_in_use", "Connections checked out of the pool.", ("pool",))
+DB_POOL_SIZE = REGISTRY.gauge("db_pool_connections_open", "Connections currently held by the pool.", ("pool",))
+DB_SLOW_QUERIES = REGISTRY.counter("db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_SECONDS.", ("pool",))
+DB_TRANSACTION_DURATION = REGISTRY.histogram(
+    "db_transaction_seconds",
+    "Time from BEGIN to COMMIT or ROLLBACK, i.e. how long a connection stays busy.",
+    ("pool", "outcome"),
+)
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement: str) -> tuple[str, str]:
+    """Normalize a SQL statement and return ``(fingerprint, normalized)``.
+
+    Literals and bind parameters become ``?`` and IN-lists collapse to
+    ``(?+)``, so every execution of one query shape shares a fingerprint.
+    """
+
+    normalized = _LITERAL_RE.sub("?", statement)
+    normalized = _IN_LIST_RE.sub("IN (?+)", normalized)
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12], normalized
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording checkout wait time under ``metrics_name``."""
+
+    metrics_name = "primary"
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.metrics_name).observe(time.perf_counter() - started)
+
+
+_pool_classes: dict[str, type[InstrumentedAsyncQueuePool]] = {}
+
+
+def _pool_class(name: str) -> type[InstrumentedAsyncQueuePool]:
+    # A subclass per name: ``engine.dispose()`` recreates the pool from its class alone.
+    pool_class = _pool_classes.get(name)
+    if pool_class is None:
+        pool_class = type(f"InstrumentedAsyncQueuePool_{name}", (InstrumentedAsyncQueuePool,), {"metrics_name": name})
+        _pool_classes[name] = pool_class
+    return pool_class
+
+
+def _install_slow_query_logging(engine: AsyncEngine, name: str, threshold_seconds: float) -> None:
+    logger = get_logger("db")
+    slow_queries = DB_SLOW_QUERIES.labels(name)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
 
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        if elapsed < threshold_seconds:
+            return
+        slow_queries.inc()
+        fingerprint, normalized = fingerprint_statement(statement)
+        logger.warning(
+            "slow_query",
+            pool=name,
+            duration_ms=round(elapsed * 1000, 1),
+            fingerprint=fingerprint,
+            statement=normalized[:500],
+            executemany=executemany,
+        )
+
+
+def _install_transaction_timing(engine: AsyncEngine, name: str) -> None:
+    committed = DB_TRANSACTION_DURATION.labels(name, "commit")
+    rolled_back = DB_TRANSACTION_DURATION.labels(name, "rollback")
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin(conn: Any) -> None:
+        conn.info["transaction_started_at"] = time.perf_counter()
+
+    def _finish(conn: Any, histogram: Any) -> None:
+        started = conn.info.pop("transaction_started_at", None)
+        if started is not None:
+            histogram.observe(time.perf_counter() - started)
+
+    event.listen(engine.sync_engine, "commit", lambda conn: _finish(conn, committed))
+    event.listen(engine.sync_engine, "rollback", lambda conn: _finish(conn, rolled_back))
+
+
+def engine_options_from_settings(settings: "Settings") -> dict[str, Any]:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "statement_cache_size": settings.db_statement_cache_size,
+        "pgbouncer": settings.db_pgbouncer,
+        "slow_query_seconds": settings.db_slow_query_seconds,
+    }
+
+
+def create_engine_and_session_factory(
+    database_url: str,
+    *,
+    name: str = "primary",
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30.0,
+    pool_recycle: int = 300,
+    pool_pre_ping: bool = True,
+    statement_cache_size: int = 100,
+    pgbouncer: bool = False,
+    slow_query_seconds: float = 0.0,
+) -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
+    connect_args: dict[str, Any] = {"statement_cache_size": statement_cache_size}
+    if pgbouncer:
+        # Transaction pooling hands each transaction a different server connection,
+        # so named prepared statements must be unique and never reused.
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
 
-def create_engine_and_session_factory(database_url: str) -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
     engine = create_async_engine(
         database_url,
-        pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20,
-        pool_recycle=300,
+        poolclass=_pool_class(name),
+        pool_pre_ping=pool_pre_ping,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        connect_args=connect_args,
         future=True,
     )
+    _install_transaction_timing(engine, name)
+    if slow_query_seconds > 0:
+        _install_slow_query_logging(engine, name, slow_query_seconds)
+
+    DB_POOL_IN_USE.labels(name).set_function(lambda: engine.sync_engine.pool.checkedout())
+    DB_POOL_SIZE.labels(name).set_function(
+        lambda: engine.sync_engine.pool.checkedin() + engine.sync_engine.pool.checkedout()
+    )
+
     session_factory = async_sessionmaker(
         bind=engine,
         expire_on_commit=False,
         class_=AsyncSession,
     )
     return engine, session_factory
+
+
+def create_read_session_factory(
+    database_read_url: str | None,
+    primary_session_factory: async_sessionmaker[AsyncSession],
+    **engine_options: Any,
+) -> tuple[AsyncEngine | None, async_sessionmaker[AsyncSession]]:
+    """Session factory for replica-safe reads; falls back to the primary without a read URL."""
+
+    if not database_read_url:
+        return None, primary_session_factory
+    return create_engine_and_session_factory(database_read_url, name="read", **engine_options)
+
+
+def replica_safe(func: F) -> F:
+    """Mark a repository method as safe to run on a read replica.
+
+    Such methods only read and never lock rows, so callers may pass a session
+    from the read session factory when their result may lag behind the
+    primary. Jobs that write what they read elsewhere (the Sheets sync) must
+    use the primary.
+    """
+
+    func.__replica_safe__ = True  # type: ignore[attr-defined]
+    return func
+
+
+def is_replica_safe(func: Callable[..., object]) -> bool:
+    return getattr(func, "__replica_safe__", False)
@@ -2,30 +2,154 @@
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+from typing import TYPE_CHECKING, Any, Callable, Literal
 
 import structlog
 
+from app.metrics import REGISTRY
 
-def configure_logging(level: str = "INFO") -> None:
-    """Configure stdlib + structlog JSON output."""
+if TYPE_CHECKING:
+    from app.config import Settings
 
-    logging.basicConfig(
-        level=level.upper(),
-        format="%(message)s",
-        stream=sys.stdout,
-    )
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the background log queue was full.",
+)
+LOG_EVENTS_SAMPLED_OUT = REGISTRY.counter(
+    "log_events_sampled_out_total",
+    "Log events skipped by LOG_SAMPLING.",
+    ("event",),
+)
 
-    structlog.configure(
+JsonEncoder = Literal["auto", "orjson", "json"]
+
+_listener: logging.handlers.QueueListener | None = None
+_listener_pid = 0
+
+
+class EventSampler:
+    """structlog processor keeping 1 in N of selected events below WARNING.
+
+    Kept events carry ``sample_rate=N`` so log-derived counts can be scaled back.
+    """
+
+    def __init__(self, rates: dict[str, int]) -> None:
+        self.rates = {event: rate for event, rate in rates.items() if rate > 1}
+        self._seen: dict[str, int] = {}
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict[str, Any]) -> dict[str, Any]:
+        event = event_dict.get("event")
+        rate = self.rates.get(event)  # type: ignore[arg-type]
+        if rate is None or method_name in ("warning", "error", "exception", "critical"):
+            return event_dict
+
+        seen = self._seen.get(event, 0)  # type: ignore[arg-type]
+        self._seen[event] = seen + 1  # type: ignore[index]
+        if seen % rate:
+            LOG_EVENTS_SAMPLED_OUT.labels(event).inc()
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+        return event_dict
+
+
+class _DeferredFormattingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched so rendering happens on the listener thread; drop when full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def json_serializer(encoder: JsonEncoder = "auto") -> Callable[..., str]:
+    """``orjson`` when requested or available (with ``auto``), else the stdlib encoder."""
+
+    if encoder != "json":
+        try:
+            import orjson
+        except ImportError:
+            if encoder == "orjson":
+                raise
+        else:
+
+            def dumps(obj: Any, default: Callable[[Any], Any] | None = None, **_: Any) -> str:
+                return orjson.dumps(obj, default=default or str).decode("utf-8")
+
+            return dumps
+
+    return json.dumps
+
+
+def configure_logging(
+    level: str = "INFO",
+    *,
+    background: bool = True,
+    sampling: dict[str, int] | None = None,
+    json_encoder: JsonEncoder = "auto",
+    queue_size: int = 10_000,
+) -> None:
+    """Configure stdlib + structlog JSON output.
+
+    Events are enriched on the calling thread. With ``background`` they are then
+    queued and rendered and written to stdout by a listener thread, so the
+    event loop never blocks on the terminal or a slow log pipe.
+    """
+
+    global _listener, _listener_pid
+
+    shared_processors: list[Any] = [
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso", utc=True),
+    ]
+    formatter = structlog.stdlib.ProcessorFormatter(
         processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
             structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=json_serializer(json_encoder)),
         ],
+        foreign_pre_chain=shared_processors,
+    )
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    flush_logging()
+
+    handler: logging.Handler = stream_handler
+    if background:
+        log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=queue_size)
+        handler = _DeferredFormattingQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+        _listener.start()
+        _listener_pid = os.getpid()
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+
+    processors: list[Any] = [structlog.stdlib.filter_by_level]
+    if sampling:
+        processors.append(EventSampler(sampling))
+    processors.extend(
+        [
+            *shared_processors,
+            structlog.processors.format_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ]
+    )
+    structlog.configure(
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
@@ -33,5 +157,27 @@ def configure_logging(level: str = "INFO") -> None:
     )
 
 
+def logging_options_from_settings(settings: "Settings") -> dict[str, Any]:
+    return {
+        "background": settings.log_background,
+        "sampling": settings.log_sampling_rates,
+        "json_encoder": settings.log_json_encoder,
+    }
+
+
+def flush_logging() -> None:
+    """Stop the listener thread after writing every queued record."""
+
+    global _listener
+
+    # A forked worker inherits the object but not the thread; the parent owns that queue.
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+    _listener = None
+
+
+atexit.register(flush_logging)
+
+
 def get_logger(name: str) -> structlog.stdlib.BoundLogger:
     return structlog.get_logger(name)
@@ -0,0 +1,134 @@
+"""Event loop lag sampling and blocking-call detection."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from contextlib import suppress
+
+from structlog.stdlib import BoundLogger
+
+from app.metrics import REGISTRY
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a callback scheduled with a fixed sleep.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_LAG_LAST = REGISTRY.gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample.")
+EVENT_LOOP_STALLS = REGISTRY.counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked longer than the stall threshold.",
+)
+
+
+def format_frame_stack(frame: object, *, limit: int = 30) -> list[str]:
+    """Innermost ``limit`` frames as ``"path:line in function"`` strings, outermost first."""
+
+    return [
+        f"{item.filename}:{item.lineno} in {item.name}"
+        for item in traceback.extract_stack(frame, limit=limit)  # type: ignore[arg-type]
+    ]
+
+
+class EventLoopLagMonitor:
+    """Sleeps ``interval_seconds`` in a loop and records how much later it woke up.
+
+    Any lag means some callback held the loop: blocking I/O, heavy CPU work or
+    too many ready tasks. Sampling costs one timer per interval.
+
+    With ``stall_threshold_seconds`` a watchdog thread also notices when that
+    timer is overdue by more than the threshold and logs ``event_loop_blocked``
+    with the loop thread's stack taken while it is still blocked, i.e. the
+    stack of the offending callback or coroutine.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.5,
+        *,
+        stall_threshold_seconds: float = 0.0,
+        logger: BoundLogger | None = None,
+        stack_limit: int = 30,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.stall_threshold_seconds = stall_threshold_seconds
+        self.logger = logger
+        self.stack_limit = stack_limit
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._watchdog_stop = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._heartbeat = 0.0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._heartbeat = time.perf_counter()
+            self._task = asyncio.create_task(self._run(), name="event_loop_lag_monitor")
+
+        if self.stall_threshold_seconds > 0 and self.logger is not None and self._watchdog is None:
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="event_loop_watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._watchdog is not None:
+            self._watchdog_stop.set()
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            scheduled = time.perf_counter() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            now = time.perf_counter()
+            self._heartbeat = now
+            self.record(max(0.0, now - scheduled))
+
+    def record(self, lag_seconds: float) -> None:
+        EVENT_LOOP_LAG.observe(lag_seconds)
+        EVENT_LOOP_LAG_LAST.set(lag_seconds)
+
+    def _watch(self) -> None:
+        check_interval = min(self.interval_seconds, self.stall_threshold_seconds) / 2
+        reported_heartbeat = 0.0
+        while not self._watchdog_stop.wait(check_interval):
+            heartbeat = self._heartbeat
+            blocked_for = time.perf_counter() - heartbeat - self.interval_seconds
+            # One report per stall: the heartbeat only moves once the loop runs again.
+            if blocked_for < self.stall_threshold_seconds or heartbeat == reported_heartbeat:
+                continue
+
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = format_frame_stack(frame, limit=self.stack_limit)
+            del frame
+            self.report_stall(blocked_for, stack)
+
+    def report_stall(self, blocked_for_seconds: float, stack: list[str]) -> None:
+        EVENT_LOOP_STALLS.inc()
+        if self.logger is None:
+            return
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        self.logger.warning(
+            "event_loop_blocked",
+            blocked_for_ms=round(blocked_for_seconds * 1000, 1),
+            task=task.get_name() if task is not None else None,
+            stack=stack,
+        )
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 from contextlib import suppress
 
 from aiohttp import web
@@ -10,81 +11,221 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramAPIError
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from sqlalchemy.ext.asyncio import AsyncEngine
 
+from app.bot.admin_jobs import ADMIN_JOBS
+from app.bot.fsm_storage import PostgresStorage
+from app.bot.identity import (
+    fetch_bot_identity,
+    load_cached_identity,
+    refresh_cached_identity,
+    save_cached_identity,
+)
+from app.bot.instrumentation import install_handler_metrics
+from app.bot.rate_limiter import OutboundRateLimiter
+from app.bot.session import create_bot_session
 from app.bot.router import build_router
 from app.config import Settings, get_settings
-from app.db.session import create_engine_and_session_factory
-from app.logging_setup import configure_logging, get_logger
+from app.db.session import (
+    create_engine_and_session_factory,
+    create_read_session_factory,
+    engine_options_from_settings,
+)
+from app.logging_setup import configure_logging, get_logger, logging_options_from_settings
+from app.loop_monitor import EventLoopLagMonitor
+from app.readiness import ReadinessMonitor, readiness_options_from_settings
 from app.services.google_sheets_service import GoogleSheetsService
+from app.services.outbox_dispatcher import OutboxDispatcher
+from app.services.sheets_sync import run_periodic_reconciliation
+from app.services.telegram_retry import CircuitBreakerMiddleware
+from app.tracing import (
+    TRACER,
+    BotApiTracingMiddleware,
+    FileTraceExporter,
+    OtlpHttpTraceExporter,
+    TraceExporter,
+    UpdateTracingMiddleware,
+)
+from app.web.admin import profile
 from app.web.health import healthz, readyz
+from app.web.metrics import metrics
+from app.web.update_capture import UpdateAnonymizer, UpdateRecorder, update_capture_middleware
+from app.web.update_queue import QueuedRequestHandler
+from app.web.workers import PRIMARY_WORKER_INDEX, WorkerSupervisor
 
 
-def derive_channel_url(channel_id: int) -> str:
-    channel = str(channel_id)
-    normalized = channel[4:] if channel.startswith("-100") else channel.lstrip("-")
-    return f"https://t.me/c/{normalized}"
-
-
-async def resolve_channel_url(bot: Bot, settings: Settings, logger) -> str:
-    if settings.channel_url:
-        return settings.channel_url
-
-    try:
-        chat = await bot.get_chat(settings.channel_id)
-        if getattr(chat, "username", None):
-            return f"https://t.me/{chat.username}"
-        if getattr(chat, "invite_link", None):
-            return str(chat.invite_link)
-    except TelegramAPIError:
-        logger.warning("channel_url_auto_discovery_failed")
-    except Exception:
-        logger.warning("channel_url_auto_discovery_unexpected_error")
-
-    return derive_channel_url(settings.channel_id)
-
-
-def create_app(settings: Settings) -> web.Application:
-    configure_logging(settings.log_level)
+def create_app(settings: Settings, *, worker_index: int = PRIMARY_WORKER_INDEX) -> web.Application:
+    configure_logging(settings.log_level, **logging_options_from_settings(settings))
     logger = get_logger("giveaway_bot")
+    if settings.web_workers > 1:
+        logger = logger.bind(worker=worker_index)
+
+    # Only the primary worker performs singleton duties: webhook setup, outbox, periodic jobs.
+    is_primary = worker_index == PRIMARY_WORKER_INDEX
+
+    engine_options = engine_options_from_settings(settings)
+    engine, session_factory = create_engine_and_session_factory(settings.database_url, **engine_options)
+    # Admin analytics, exports and other read-only paths use the replica when configured.
+    read_engine, read_session_factory = create_read_session_factory(
+        settings.database_read_url,
+        session_factory,
+        **engine_options,
+    )
+    bot = Bot(
+        token=settings.bot_token,
+        session=create_bot_session(settings),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    if settings.tracing_enabled:
+        exporters: list[TraceExporter] = []
+        if settings.trace_export_file:
+            exporters.append(FileTraceExporter(settings.trace_export_file, logger))
+        if settings.trace_otlp_endpoint:
+            exporters.append(OtlpHttpTraceExporter(settings.trace_otlp_endpoint, logger))
+        TRACER.configure(
+            logger,
+            slow_threshold_seconds=settings.trace_slow_threshold_seconds,
+            sample_ratio=settings.trace_sample_ratio,
+            exporters=exporters,
+        )
+        # Outermost, so each span includes the rate-limit wait of that one request. run_with_retry
+        # calls go through the session once per attempt; it adds its own telegram.retry parent span.
+        bot.session.middleware(BotApiTracingMiddleware())
+    # The breaker wraps the limiter so an open circuit fails before waiting for a rate-limit slot.
+    bot.session.middleware(
+        CircuitBreakerMiddleware(
+            logger,
+            failure_threshold=settings.telegram_circuit_failure_threshold,
+            recovery_seconds=settings.telegram_circuit_recovery_seconds,
+        )
+    )
+    rate_limiter = OutboundRateLimiter(
+        logger,
+        global_rate=settings.telegram_global_rate / settings.web_workers,
+        private_chat_rate=settings.telegram_private_chat_rate,
+        group_chat_rate=settings.telegram_group_chat_per_minute / 60,
+    )
+    bot.session.middleware(rate_limiter)
+
+    storage: BaseStorage
+    if settings.fsm_storage == "postgres":
+        storage = PostgresStorage(
+            session_factory,
+            logger,
+            cache_ttl_seconds=settings.fsm_read_cache_ttl_seconds,
+            state_ttl_seconds=settings.fsm_state_ttl_seconds,
+        )
+    else:
+        storage = MemoryStorage()
 
-    engine, session_factory = create_engine_and_session_factory(settings.database_url)
-    bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-
-    dispatcher = Dispatcher()
+    dispatcher = Dispatcher(storage=storage)
     dispatcher.include_router(build_router())
+    install_handler_metrics(dispatcher)
+    if settings.tracing_enabled:
+        dispatcher.update.outer_middleware(UpdateTracingMiddleware())
 
     app = web.Application()
+    app["settings"] = settings
+    app["app_logger"] = logger
     app["session_factory"] = session_factory
+    app["read_session_factory"] = read_session_factory
     app["polling_task"] = None
+    app["sheets_reconcile_task"] = None
+    app["identity_refresh_task"] = None
+    app["update_queue"] = None
+    if settings.web_workers > 1:
+        app["metrics_labels"] = {"worker": str(worker_index)}
+
+    update_recorder: UpdateRecorder | None = None
+    if settings.update_capture_file:
+        capture_file = settings.update_capture_file
+        if settings.web_workers > 1:
+            capture_file = f"{capture_file}.worker{worker_index}"
+        update_recorder = UpdateRecorder(
+            capture_file,
+            logger,
+            max_bytes=settings.update_capture_max_bytes,
+            backup_count=settings.update_capture_backup_count,
+            # Keyed by the bot token so every worker and restart maps a user to the same pseudonym.
+            anonymizer=UpdateAnonymizer(hashlib.sha256(f"update-capture:{settings.bot_token}".encode()).digest()),
+        )
+        app.middlewares.append(update_capture_middleware(update_recorder))
+
+    loop_lag_monitor = EventLoopLagMonitor(
+        settings.event_loop_lag_interval_seconds,
+        stall_threshold_seconds=settings.event_loop_stall_threshold_seconds,
+        logger=logger,
+    )
 
     # Initialize Google Sheets service
     google_sheets_service = GoogleSheetsService(settings, logger)
+    outbox_dispatcher = OutboxDispatcher(
+        session_factory,
+        bot,
+        google_sheets_service,
+        logger,
+        batch_size=settings.outbox_batch_size,
+        poll_interval_seconds=settings.outbox_poll_interval_seconds,
+        max_attempts=settings.outbox_max_attempts,
+    )
 
     async def on_startup(application: web.Application) -> None:
-        if settings.skip_webhook_setup:
-            if settings.bot_username:
-                bot_username = settings.bot_username
-            else:
-                me = await bot.get_me()
-                bot_username = me.username or ""
-            channel_url = settings.channel_url or derive_channel_url(settings.channel_id)
+        loop_lag_monitor.start()
+        TRACER.start()
+        application["readiness"].start()
+        if update_recorder is not None:
+            update_recorder.start()
+
+        identity_cache = settings.bot_identity_cache_file
+        identity = None
+        if identity_cache:
+            identity = await asyncio.to_thread(load_cached_identity, identity_cache, settings)
+        if identity is not None:
+            # Serve the last known identity now; getMe/getChat run behind the first updates.
+            application["identity_refresh_task"] = asyncio.create_task(
+                refresh_cached_identity(bot, settings, logger, identity_cache, identity, dispatcher.workflow_data)
+            )
         else:
-            me = await bot.get_me()
-            bot_username = me.username or ""
-            channel_url = await resolve_channel_url(bot, settings, logger)
+            identity = await fetch_bot_identity(bot, settings, logger)
+            if identity_cache:
+                try:
+                    await asyncio.to_thread(save_cached_identity, identity_cache, settings, identity)
+                except OSError as exc:
+                    logger.warning("bot_identity_cache_write_failed", path=identity_cache, error=str(exc))
 
         dispatcher.workflow_data.update(
             {
                 "session_factory": session_factory,
+                "read_session_factory": read_session_factory,
+                "engine": engine,
                 "settings": settings,
                 "app_logger": logger,
-                "bot_username": bot_username,
-                "channel_url": channel_url,
+                "bot_username": identity.bot_username,
+                "channel_url": identity.channel_url,
                 "google_sheets_service": google_sheets_service,
+                "outbox_dispatcher": outbox_dispatcher,
             }
         )
+        if not is_primary:
+            logger.info("secondary_worker_started")
+            return
+
+        outbox_dispatcher.start()
+
+        if settings.google_sheets_reconcile_interval_seconds > 0 and google_sheets_service.is_enabled():
+            application["sheets_reconcile_task"] = asyncio.create_task(
+                # The primary, not the replica: reconcile deletes and rewrites rows, so a lagging
+                # snapshot would revert contacts that are already correct in the sheet.
+                run_periodic_reconciliation(
+                    session_factory,
+                    google_sheets_service,
+                    logger,
+                    interval_seconds=settings.google_sheets_reconcile_interval_seconds,
+                )
+            )
 
         if settings.skip_webhook_setup:
             try:
@@ -111,6 +252,21 @@ def create_app(settings: Settings) -> web.Application:
         logger.info("webhook_configured", webhook_url=settings.webhook_url)
 
     async def on_shutdown(application: web.Application) -> None:
+        await application["readiness"].stop()
+        await ADMIN_JOBS.stop()
+        await outbox_dispatcher.stop()
+        await loop_lag_monitor.stop()
+        await TRACER.stop()
+        if update_recorder is not None:
+            await update_recorder.stop()
+
+        for task_name in ("sheets_reconcile_task", "identity_refresh_task"):
+            task = application.get(task_name)
+            if task is not None and not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
         if settings.skip_webhook_setup:
             polling_task = application.get("polling_task")
             if polling_task is not None and not polling_task.done():
@@ -118,29 +274,65 @@ def create_app(settings: Settings) -> web.Application:
                 with suppress(asyncio.CancelledError):
                     await polling_task
                 logger.info("long_polling_stopped")
-        else:
+        elif is_primary:
             try:
                 await bot.delete_webhook(drop_pending_updates=False)
             except TelegramAPIError:
                 logger.warning("webhook_delete_failed")
 
+        await storage.close()
         await bot.session.close()
 
         async_engine: AsyncEngine = engine
         await async_engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
 
     app.on_startup.append(on_startup)
     app.on_cleanup.append(on_shutdown)
 
     app.router.add_get("/healthz", healthz)
     app.router.add_get("/readyz", readyz)
+    if settings.metrics_enabled:
+        app.router.add_get("/metrics", metrics)
+    if settings.admin_api_token:
+        app.router.add_post("/admin/profile", profile)
+
+    webhook_handler: SimpleRequestHandler
+    if settings.update_processing_mode == "queue":
+        webhook_handler = QueuedRequestHandler(
+            dispatcher,
+            bot,
+            logger,
+            secret_token=settings.resolved_webhook_secret,
+            workers=settings.update_queue_workers,
+            max_size=settings.update_queue_max_size,
+            put_timeout_seconds=settings.update_queue_put_timeout_seconds,
+            handler_timeout_seconds=settings.update_handler_timeout_seconds,
+            reply_timeout_seconds=settings.update_reply_timeout_seconds,
+            rate_limiter=rate_limiter,
+        )
+        app["update_queue"] = webhook_handler.queue
+    else:
+        # Answers Telegram at once, as before the queue existed; the handler's reply is sent
+        # through the session. Holding the response for the handler would risk webhook timeouts.
+        webhook_handler = SimpleRequestHandler(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=settings.resolved_webhook_secret,
+        )
+    webhook_handler.register(app, path="/webhook")
 
-    webhook_handler = SimpleRequestHandler(
-        dispatcher=dispatcher,
-        bot=bot,
-        secret_token=settings.resolved_webhook_secret,
+    app["readiness"] = ReadinessMonitor(
+        session_factory,
+        engine,
+        bot,
+        logger,
+        update_queue=app["update_queue"],
+        sheets_enabled=google_sheets_service.is_enabled(),
+        **readiness_options_from_settings(settings),
     )
-    webhook_handler.register(app, path="/webhook")
     setup_application(app, dispatcher, bot=bot)
 
     return app
@@ -148,6 +340,13 @@ def create_app(settings: Settings) -> web.Application:
 
 def main() -> None:
     settings = get_settings()
+    if settings.web_workers > 1:
+        # The supervisor forks, so it must not run the log listener thread: a fork taken while
+        # that thread holds a logging or queue lock would leave the lock held forever in the child.
+        configure_logging(settings.log_level, **{**logging_options_from_settings(settings), "background": False})
+        WorkerSupervisor(create_app, settings, get_logger("worker_supervisor")).run()
+        return
+
     app = create_app(settings)
     web.run_app(app, host=settings.app_host, port=settings.app_port)
 
@@ -0,0 +1,205 @@
+"""On-demand in-process CPU and memory profiling.
+
+Nothing runs until an admin asks for a profile, so the idle cost is zero.
+The CPU profiler is a sampling thread reading the event loop thread's stack
+via ``sys._current_frames``; it never pauses the loop. The memory profiler
+diffs two ``tracemalloc`` snapshots and stops tracing afterwards. Only one
+profile runs per process at a time.
+
+Memory profiles are not free under live load: while tracing, every
+allocation is slower, and each snapshot copies the table of traced blocks
+with the GIL held. The snapshots are taken on a worker thread, so the loop
+keeps running any Python code in between, but the copy itself still pauses
+it, for roughly tens of milliseconds per million live blocks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from types import FrameType
+from typing import Literal
+
+ProfileKind = Literal["cpu", "memory"]
+ProfileFormat = Literal["collapsed", "top"]
+
+MAX_PROFILE_SECONDS = 120.0
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is already running in this process."""
+
+
+@dataclass(slots=True)
+class ProfileReport:
+    kind: ProfileKind
+    output: ProfileFormat
+    seconds: float
+    samples: int
+    text: str
+
+    @property
+    def filename(self) -> str:
+        suffix = "folded" if self.output == "collapsed" else "txt"
+        return f"profile_{self.kind}_{os.getpid()}_{time.strftime('%Y%m%d_%H%M%S')}.{suffix}"
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}"
+
+
+def _collapse(frame: FrameType | None) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, target_thread_id: int, interval_seconds: float) -> None:
+        super().__init__(name="cpu_profiler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+            del frame
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def format_collapsed(stacks: Counter[str]) -> str:
+    """Brendan Gregg's folded format, readable by flamegraph.pl and speedscope."""
+
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def format_top(stacks: Counter[str], samples: int, *, limit: int = 30) -> str:
+    """Functions ranked by inclusive and self samples."""
+
+    inclusive: Counter[str] = Counter()
+    own: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+
+    total = max(samples, 1)
+    lines = [f"{samples} samples", "", "inclusive%  self%  function"]
+    for label, count in inclusive.most_common(limit):
+        lines.append(f"{count / total * 100:9.1f}  {own[label] / total * 100:5.1f}  {label}")
+    return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """Runs one CPU or memory profile at a time inside the live process."""
+
+    def __init__(self) -> None:
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(
+        self,
+        kind: ProfileKind,
+        seconds: float,
+        *,
+        output: ProfileFormat = "top",
+        interval_seconds: float = 0.005,
+        limit: int = 30,
+    ) -> ProfileReport:
+        if self._running:
+            raise ProfilerBusyError("a profile is already running in this process")
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+
+        self._running = True
+        try:
+            if kind == "cpu":
+                return await self._profile_cpu(seconds, output, interval_seconds, limit)
+            return await self._profile_memory(seconds, limit)
+        finally:
+            self._running = False
+
+    async def _profile_cpu(
+        self,
+        seconds: float,
+        output: ProfileFormat,
+        interval_seconds: float,
+        limit: int,
+    ) -> ProfileReport:
+        # Samples the thread running this coroutine, i.e. the event loop.
+        sampler = _StackSampler(threading.get_ident(), interval_seconds)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            await asyncio.to_thread(sampler.stop)
+
+        text = format_collapsed(sampler.stacks) if output == "collapsed" else format_top(
+            sampler.stacks, sampler.samples, limit=limit
+        )
+        return ProfileReport(kind="cpu", output=output, seconds=seconds, samples=sampler.samples, text=text)
+
+    async def _profile_memory(self, seconds: float, limit: int) -> ProfileReport:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            # One frame per allocation is enough for a per-line diff and keeps the overhead low.
+            tracemalloc.start(1)
+        try:
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+            await asyncio.sleep(seconds)
+            after = await asyncio.to_thread(tracemalloc.take_snapshot)
+        finally:
+            if started_here:
+                tracemalloc.stop()
+
+        # Comparing snapshots walks every traced block; keep it off the loop.
+        stats, current = await asyncio.to_thread(_snapshot_diff, before, after)
+        lines = [
+            f"traced memory after {seconds:.0f}s: {current / 1024 / 1024:.1f} MiB",
+            "",
+            "size_diff_kib  count_diff  location",
+        ]
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:13.1f}  {stat.count_diff:10d}  {frame.filename}:{frame.lineno}")
+        return ProfileReport(
+            kind="memory",
+            output="top",
+            seconds=seconds,
+            samples=len(stats),
+            text="\n".join(lines) + "\n",
+        )
+
+
+def _snapshot_diff(
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+) -> tuple[list[tracemalloc.StatisticDiff], int]:
+    stats = after.compare_to(before, "lineno")
+    return stats, sum(stat.size for stat in stats)
+
+
+PROFILER = Profiler()
@@ -0,0 +1,248 @@
+"""Background-refreshed readiness snapshot for ``/readyz``.
+
+Probes only read the last snapshot, so orchestrator and proxy probes never
+take a pool connection. Checks come in two tiers:
+
+* shallow (``/readyz``): DB round trip, pool saturation and update queue
+  saturation, refreshed every few seconds;
+* deep (``/readyz?deep=1``): the shallow tier plus Bot API reachability and
+  the Google Sheets outbox backlog, refreshed less often.
+
+Each check has a threshold below the point where the instance would fail,
+so it is taken out of rotation while it can still drain.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from aiogram import Bot
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from structlog.stdlib import BoundLogger
+
+from app.db.enums import OutboxEventKind
+from app.metrics import REGISTRY
+from app.repositories.outbox import OutboxRepository
+
+if TYPE_CHECKING:
+    from app.config import Settings
+    from app.web.update_queue import UpdateQueue
+
+READINESS_CHECK_OK = REGISTRY.gauge(
+    "readiness_check_ok",
+    "1 when the readiness check passed on its last refresh, else 0.",
+    ("check",),
+)
+
+
+@dataclass(slots=True)
+class CheckResult:
+    ok: bool
+    value: float | None = None
+    threshold: float | None = None
+    error: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"ok": self.ok}
+        if self.value is not None:
+            result["value"] = round(self.value, 4)
+        if self.threshold is not None:
+            result["threshold"] = self.threshold
+        if self.error is not None:
+            result["error"] = self.error
+        return result
+
+
+def below(value: float, threshold: float) -> CheckResult:
+    return CheckResult(ok=value < threshold, value=value, threshold=threshold)
+
+
+class ReadinessMonitor:
+    """Refreshes the shallow and deep check tiers from two background tasks."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        engine: AsyncEngine,
+        bot: Bot,
+        logger: BoundLogger,
+        *,
+        pool_capacity: int,
+        update_queue: UpdateQueue | None = None,
+        sheets_enabled: bool = False,
+        refresh_seconds: float = 5.0,
+        deep_refresh_seconds: float = 30.0,
+        check_timeout_seconds: float = 5.0,
+        db_latency_threshold_seconds: float = 0.5,
+        pool_saturation_threshold: float = 0.9,
+        update_queue_saturation_threshold: float = 0.9,
+        bot_api_latency_threshold_seconds: float = 2.0,
+        sheets_backlog_threshold: int = 5000,
+    ) -> None:
+        self.session_factory = session_factory
+        self.engine = engine
+        self.bot = bot
+        self.logger = logger
+        self.pool_capacity = pool_capacity
+        self.update_queue = update_queue
+        self.sheets_enabled = sheets_enabled
+        self.refresh_seconds = refresh_seconds
+        self.deep_refresh_seconds = deep_refresh_seconds
+        self.check_timeout_seconds = check_timeout_seconds
+        self.db_latency_threshold_seconds = db_latency_threshold_seconds
+        self.pool_saturation_threshold = pool_saturation_threshold
+        self.update_queue_saturation_threshold = update_queue_saturation_threshold
+        self.bot_api_latency_threshold_seconds = bot_api_latency_threshold_seconds
+        self.sheets_backlog_threshold = sheets_backlog_threshold
+
+        self.shallow: dict[str, CheckResult] = {}
+        self.deep: dict[str, CheckResult] = {}
+        self.shallow_refreshed_at: float | None = None
+        self.deep_refreshed_at: float | None = None
+        self._ready: bool | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._every(self.refresh_seconds, self.refresh_shallow), name="readiness_shallow"),
+            asyncio.create_task(self._every(self.deep_refresh_seconds, self.refresh_deep), name="readiness_deep"),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    async def _every(self, interval_seconds: float, refresh: Callable[[], Awaitable[None]]) -> None:
+        while True:
+            try:
+                await refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.exception("readiness_refresh_failed")
+            await asyncio.sleep(interval_seconds)
+
+    async def refresh_shallow(self) -> None:
+        checks = {"database": await self._timed(self._ping_database(), self.db_latency_threshold_seconds)}
+
+        pool = self.engine.sync_engine.pool
+        checks["db_pool"] = below(pool.checkedout() / self.pool_capacity, self.pool_saturation_threshold)  # type: ignore[attr-defined]
+
+        if self.update_queue is not None:
+            stats = self.update_queue.stats()
+            checks["update_queue"] = below(stats["depth"] / stats["capacity"], self.update_queue_saturation_threshold)
+
+        self.shallow = checks
+        self.shallow_refreshed_at = time.monotonic()
+        self._publish(checks)
+
+    async def refresh_deep(self) -> None:
+        # The HTTP timeout makes a hung Bot API fail as TelegramNetworkError, which the getMe
+        # circuit breaker counts; the outer timeout is only a backstop if that never fires.
+        request_timeout = max(1, math.ceil(self.check_timeout_seconds))
+        checks = {
+            "bot_api": await self._timed(
+                self.bot.get_me(request_timeout=request_timeout),
+                self.bot_api_latency_threshold_seconds,
+                timeout_seconds=request_timeout + 1,
+            )
+        }
+        if self.sheets_enabled:
+            checks["sheets_backlog"] = await self._sheets_backlog()
+
+        self.deep = checks
+        self.deep_refreshed_at = time.monotonic()
+        self._publish(checks)
+
+    async def _ping_database(self) -> None:
+        async with self.session_factory() as session:
+            await session.execute(text("SELECT 1"))
+
+    async def _sheets_backlog(self) -> CheckResult:
+        try:
+            async with asyncio.timeout(self.check_timeout_seconds):
+                async with self.session_factory() as session:
+                    pending = await OutboxRepository.count_pending(session, OutboxEventKind.SHEETS_SYNC)
+        except Exception as exc:
+            return CheckResult(ok=False, error=type(exc).__name__)
+        return below(pending, self.sheets_backlog_threshold)
+
+    async def _timed(
+        self,
+        probe: Awaitable[Any],
+        threshold_seconds: float,
+        *,
+        timeout_seconds: float | None = None,
+    ) -> CheckResult:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout_seconds or self.check_timeout_seconds):
+                await probe
+        except Exception as exc:
+            return CheckResult(ok=False, threshold=threshold_seconds, error=type(exc).__name__)
+        return below(time.perf_counter() - started, threshold_seconds)
+
+    def _publish(self, checks: dict[str, CheckResult]) -> None:
+        for name, result in checks.items():
+            READINESS_CHECK_OK.labels(name).set(1 if result.ok else 0)
+
+        failing = [name for name, result in {**self.shallow, **self.deep}.items() if not result.ok]
+        ready = not failing
+        if ready != self._ready:
+            if ready:
+                self.logger.info("instance_ready")
+            else:
+                self.logger.warning("instance_not_ready", failing_checks=failing)
+            self._ready = ready
+
+    def _is_stale(self, refreshed_at: float | None, interval_seconds: float) -> bool:
+        # A refresh task stuck behind a blocked loop or a hung check must not keep reporting "ready".
+        max_age = max(3 * interval_seconds, interval_seconds + 2 * self.check_timeout_seconds)
+        return refreshed_at is None or time.monotonic() - refreshed_at > max_age
+
+    def snapshot(self, *, deep: bool = False) -> tuple[bool, dict[str, Any]]:
+        """Readiness and the JSON payload for ``/readyz``; never does I/O."""
+
+        checks = dict(self.shallow)
+        stale = self._is_stale(self.shallow_refreshed_at, self.refresh_seconds)
+        if deep:
+            checks.update(self.deep)
+            stale = stale or self._is_stale(self.deep_refreshed_at, self.deep_refresh_seconds)
+
+        ready = not stale and all(result.ok for result in checks.values())
+        payload: dict[str, Any] = {
+            "status": "ready" if ready else "not_ready",
+            "tier": "deep" if deep else "shallow",
+            "checks": {name: result.as_dict() for name, result in checks.items()},
+        }
+        if stale:
+            payload["stale"] = True
+        if self.update_queue is not None:
+            payload["update_queue"] = self.update_queue.stats()
+        return ready, payload
+
+
+def readiness_options_from_settings(settings: "Settings") -> dict[str, Any]:
+    return {
+        "pool_capacity": settings.db_pool_size + settings.db_max_overflow,
+        "refresh_seconds": settings.readiness_refresh_seconds,
+        "deep_refresh_seconds": settings.readiness_deep_refresh_seconds,
+        "check_timeout_seconds": settings.readiness_check_timeout_seconds,
+        "db_latency_threshold_seconds": settings.readiness_db_latency_seconds,
+        "pool_saturation_threshold": settings.readiness_pool_saturation,
+        "update_queue_saturation_threshold": settings.readiness_update_queue_saturation,
+        "bot_api_latency_threshold_seconds": settings.readiness_bot_api_latency_seconds,
+        "sheets_backlog_threshold": settings.readiness_sheets_backlog,
+    }
@@ -0,0 +1,57 @@
+"""FSM state repository helpers."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Sequence
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import FsmState
+from app.tracing import traced_repository
+
+
+@traced_repository
+class FsmStatesRepository:
+    @staticmethod
+    async def get(session: AsyncSession, key: str, *, newer_than: datetime) -> tuple[str | None, dict[str, Any]] | None:
+        stmt = select(FsmState.state, FsmState.data).where(
+            FsmState.key == key,
+            FsmState.updated_at >= newer_than,
+        )
+        row = (await session.execute(stmt)).first()
+        if row is None:
+            return None
+        return row.state, dict(row.data or {})
+
+    @staticmethod
+    async def upsert_many(session: AsyncSession, records: Sequence[dict[str, Any]]) -> None:
+        """Write ``{"key", "state", "data"}`` records in a single statement."""
+
+        if not records:
+            return
+
+        stmt = insert(FsmState).values(list(records))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FsmState.key],
+            set_={
+                "state": stmt.excluded.state,
+                "data": stmt.excluded.data,
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def delete_many(session: AsyncSession, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+
+        await session.execute(delete(FsmState).where(FsmState.key.in_(keys)))
+
+    @staticmethod
+    async def delete_expired(session: AsyncSession, *, older_than: datetime) -> int:
+        result = await session.execute(delete(FsmState).where(FsmState.updated_at < older_than))
+        return int(result.rowcount or 0)
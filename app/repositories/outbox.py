@@ -0,0 +1,147 @@
+"""Transactional outbox repository helpers."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.enums import OutboxEventKind, OutboxStatus
+from app.db.models import OutboxEvent
+from app.tracing import traced_repository
+
+
+@traced_repository
+class OutboxRepository:
+    @staticmethod
+    async def enqueue(
+        session: AsyncSession,
+        kind: OutboxEventKind,
+        payload: dict[str, Any],
+    ) -> None:
+        """Record a side effect; must run inside the transaction that changes state."""
+
+        stmt = insert(OutboxEvent).values(
+            kind=kind,
+            payload=payload,
+            status=OutboxStatus.PENDING,
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def enqueue_many(
+        session: AsyncSession,
+        events: Sequence[tuple[OutboxEventKind, dict[str, Any]]],
+    ) -> None:
+        """Record several side effects with one multi-row INSERT."""
+
+        if not events:
+            return
+
+        stmt = insert(OutboxEvent).values(
+            [{"kind": kind, "payload": payload, "status": OutboxStatus.PENDING} for kind, payload in events]
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def claim_batch(
+        session: AsyncSession,
+        *,
+        limit: int,
+        lease_seconds: float,
+    ) -> list[Any]:
+        """Lease up to ``limit`` due events for this dispatcher.
+
+        Rows are picked with ``FOR UPDATE SKIP LOCKED`` so concurrent dispatchers
+        never claim the same event. The lease pushes ``available_at`` forward, so
+        an event whose dispatcher crashes mid-delivery becomes due again later.
+        """
+
+        now = datetime.now(timezone.utc)
+        due_ids = (
+            select(OutboxEvent.id)
+            .where(
+                OutboxEvent.status == OutboxStatus.PENDING,
+                OutboxEvent.available_at <= now,
+            )
+            .order_by(OutboxEvent.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(due_ids))
+            .values(
+                attempts=OutboxEvent.attempts + 1,
+                available_at=now + timedelta(seconds=lease_seconds),
+            )
+            .returning(OutboxEvent.id, OutboxEvent.kind, OutboxEvent.payload, OutboxEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        rows = await session.execute(stmt)
+        return sorted(rows.all(), key=lambda row: row.id)
+
+    @staticmethod
+    async def mark_done(session: AsyncSession, event_ids: Sequence[int]) -> None:
+        if not event_ids:
+            return
+
+        stmt = (
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids))
+            .values(
+                status=OutboxStatus.DONE,
+                processed_at=datetime.now(timezone.utc),
+                last_error=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def schedule_retry(
+        session: AsyncSession,
+        event_ids: Sequence[int],
+        *,
+        delay_seconds: float,
+        error: str,
+    ) -> None:
+        if not event_ids:
+            return
+
+        stmt = (
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids))
+            .values(
+                available_at=datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+                last_error=error,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def mark_failed(session: AsyncSession, event_ids: Sequence[int], *, error: str) -> None:
+        if not event_ids:
+            return
+
+        stmt = (
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(event_ids))
+            .values(
+                status=OutboxStatus.FAILED,
+                processed_at=datetime.now(timezone.utc),
+                last_error=error,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def count_pending(session: AsyncSession, kind: OutboxEventKind | None = None) -> int:
+        stmt = select(func.count(OutboxEvent.id)).where(OutboxEvent.status == OutboxStatus.PENDING)
+        if kind is not None:
+            stmt = stmt.where(OutboxEvent.kind == kind)
+        return int(await session.scalar(stmt) or 0)
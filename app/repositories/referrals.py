@@ -10,8 +10,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.enums import ReferralStatus
 from app.db.models import Referral
+from app.db.session import replica_safe
+from app.tracing import traced_repository
 
 
+@traced_repository
 class ReferralsRepository:
     @staticmethod
     async def create_pending_referral(
@@ -56,6 +59,7 @@ class ReferralsRepository:
         return await session.scalar(stmt)
 
     @staticmethod
+    @replica_safe
     async def count_confirmed_referrals(session: AsyncSession) -> int:
         stmt = select(func.count(Referral.id)).where(Referral.status == ReferralStatus.CONFIRMED)
         return int(await session.scalar(stmt) or 0)
@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
-from sqlalchemy import func, select
+from typing import Any, AsyncIterator, Sequence
+
+from sqlalchemy import ColumnElement, Row, func, select, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import User
+from app.db.session import replica_safe
+from app.tracing import traced_repository
 
 
+@traced_repository
 class UsersRepository:
     @staticmethod
     async def get_by_tg_user_id(
@@ -22,6 +27,49 @@ class UsersRepository:
             stmt = stmt.with_for_update()
         return await session.scalar(stmt)
 
+    @staticmethod
+    @replica_safe
+    async def get_snapshot_by_tg_user_id(session: AsyncSession, tg_user_id: int) -> User | None:
+        """Read-only lookup that may be served by a replica and lag behind the primary."""
+
+        return await session.scalar(select(User).where(User.tg_user_id == tg_user_id))
+
+    @staticmethod
+    async def fetch_by_tg_user_ids(session: AsyncSession, tg_user_ids: Sequence[int]) -> list[User]:
+        if not tg_user_ids:
+            return []
+
+        stmt = select(User).where(User.tg_user_id.in_(tg_user_ids))
+        rows = await session.scalars(stmt)
+        return list(rows)
+
+    @staticmethod
+    async def increment_referrals_confirmed(
+        session: AsyncSession,
+        tg_user_id: int,
+        *,
+        is_participant: ColumnElement[bool],
+    ) -> Row[Any] | None:
+        """Atomically bump the referral counter and participation flag.
+
+        Returns ``(referrals_confirmed, is_participant)`` after the update, or
+        ``None`` if the user does not exist. The row lock taken by the UPDATE
+        lasts until commit, so callers should run it last in the transaction.
+        """
+
+        stmt = (
+            update(User)
+            .where(User.tg_user_id == tg_user_id)
+            .values(
+                referrals_confirmed=User.referrals_confirmed + 1,
+                is_participant=is_participant,
+            )
+            .returning(User.referrals_confirmed, User.is_participant)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(stmt)
+        return result.one_or_none()
+
     @staticmethod
     async def get_or_create_for_update(
         session: AsyncSession,
@@ -59,6 +107,7 @@ class UsersRepository:
         return (await session.scalar(stmt)) is not None
 
     @staticmethod
+    @replica_safe
     async def fetch_basic_stats(session: AsyncSession) -> dict[str, int]:
         total_users = int(await session.scalar(select(func.count(User.id))) or 0)
         total_subscribed = int(
@@ -75,6 +124,7 @@ class UsersRepository:
         }
 
     @staticmethod
+    @replica_safe
     async def fetch_export_rows(session: AsyncSession) -> list[tuple[int, str | None, int, bool, object]]:
         stmt = select(
             User.tg_user_id,
@@ -87,6 +137,35 @@ class UsersRepository:
         return list(rows.all())
 
     @staticmethod
+    async def stream_contact_rows(
+        session: AsyncSession,
+        *,
+        chunk_size: int = 5000,
+    ) -> AsyncIterator[Sequence[Row[Any]]]:
+        """Yield users with contact info in ``chunk_size`` batches over a server-side cursor."""
+
+        stmt = (
+            select(
+                User.tg_user_id,
+                User.username,
+                User.first_name,
+                User.last_name,
+                User.contact_name,
+                User.contact_phone,
+                User.is_subscribed,
+                User.is_participant,
+                User.referrals_confirmed,
+            )
+            .where(User.contact_name.is_not(None), User.contact_phone.is_not(None))
+            .order_by(User.id.asc())
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await session.stream(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+    @staticmethod
+    @replica_safe
     async def fetch_all_tg_user_ids(session: AsyncSession) -> list[int]:
         stmt = select(User.tg_user_id).order_by(User.id.asc())
         rows = await session.scalars(stmt)
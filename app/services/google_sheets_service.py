@@ -2,16 +2,190 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import json
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Sequence, TypeVar
 
-import gspread
-from google.oauth2.service_account import Credentials
 from structlog.stdlib import BoundLogger
 
 from app.config import Settings
+from app.db.models import User
+
+if TYPE_CHECKING:
+    import gspread
+
+SHEET_HEADER = [
+    "№",
+    "Дата",
+    "Telegram ID",
+    "Username",
+    "Имя (Telegram)",
+    "Имя (контакт)",
+    "Телефон",
+    "Подписан",
+    "Участник",
+    "Рефералов подтверждено",
+]
+
+
+@dataclass(slots=True, frozen=True)
+class SheetContact:
+    """Snapshot of the user fields mirrored into the contacts sheet."""
+
+    tg_user_id: int
+    username: str | None
+    telegram_first_name: str | None
+    telegram_last_name: str | None
+    contact_name: str | None
+    contact_phone: str | None
+    is_subscribed: bool = False
+    is_participant: bool = False
+    referrals_confirmed: int = 0
+
+    @classmethod
+    def from_user(cls, user: User) -> SheetContact:
+        return cls(
+            tg_user_id=user.tg_user_id,
+            username=user.username,
+            telegram_first_name=user.first_name,
+            telegram_last_name=user.last_name,
+            contact_name=user.contact_name,
+            contact_phone=user.contact_phone,
+            is_subscribed=user.is_subscribed,
+            is_participant=user.is_participant,
+            referrals_confirmed=user.referrals_confirmed or 0,
+        )
+
+    @property
+    def has_contact(self) -> bool:
+        return bool(self.contact_name and self.contact_phone)
+
+    @property
+    def telegram_name(self) -> str:
+        if not self.telegram_first_name:
+            return ""
+        if self.telegram_last_name:
+            return f"{self.telegram_first_name} {self.telegram_last_name}"
+        return self.telegram_first_name
+
+    def to_row(self, serial_number: str, date: str) -> list[str]:
+        return [
+            serial_number,
+            date,
+            str(self.tg_user_id),
+            self.username or "",
+            self.telegram_name,
+            self.contact_name or "",
+            self.contact_phone or "",
+            "Да" if self.is_subscribed else "Нет",
+            "Да" if self.is_participant else "Нет",
+            str(self.referrals_confirmed),
+        ]
+
+
+T = TypeVar("T")
+
+
+def _serialized(method: Callable[..., T]) -> Callable[..., T]:
+    """Run sheet writers one at a time: they rely on row indexes read moments earlier."""
+
+    @functools.wraps(method)
+    def wrapper(self: GoogleSheetsService, *args: Any, **kwargs: Any) -> T:
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+@dataclass(slots=True)
+class SheetReconcileResult:
+    updated: int
+    appended: int
+    deleted: int
+
+
+def _normalize_cell(value: object) -> str:
+    # USER_ENTERED turns "+7999..." into a number, so the leading "+" is not compared.
+    return str(value).strip().lstrip("'+")
+
+
+def compute_row_hash(cells: Sequence[object]) -> str:
+    """Content hash of the data columns (Telegram ID..referrals), ignoring № and date."""
+
+    data_cells = list(cells[2 : len(SHEET_HEADER)])
+    data_cells.extend([""] * (len(SHEET_HEADER) - 2 - len(data_cells)))
+    payload = "\x1f".join(_normalize_cell(cell) for cell in data_cells)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _group_descending_ranges(row_indexes: Sequence[int]) -> list[tuple[int, int]]:
+    """Collapse 1-based row indexes into (start, end) inclusive runs, bottom-up for deletion."""
+
+    runs: list[tuple[int, int]] = []
+    for row_index in sorted(set(row_indexes), reverse=True):
+        if runs and runs[-1][0] == row_index + 1:
+            runs[-1] = (row_index, runs[-1][1])
+        else:
+            runs.append((row_index, row_index))
+    return runs
+
+
+class ShardIndex:
+    """Routing index from Telegram ID to the worksheet shard holding its row.
+
+    Contacts fill shard 0 (the configured worksheet) up to ``max_rows_per_shard``
+    data rows, then spill into "<name> 2", "<name> 3", ... Only the last shard
+    ever receives new rows, so serial numbers keep growing across shards.
+    """
+
+    def __init__(self, max_rows_per_shard: int) -> None:
+        self.max_rows_per_shard = max_rows_per_shard
+        self.row_counts: list[int] = [0]
+        self._shard_by_user: dict[str, int] = {}
+
+    @classmethod
+    def from_columns(cls, max_rows_per_shard: int, shard_ids: Sequence[Sequence[str]]) -> ShardIndex:
+        """Build the index from the Telegram ID column (without header) of every shard."""
+
+        index = cls(max_rows_per_shard)
+        index.row_counts = [len(ids) for ids in shard_ids] or [0]
+        for shard, ids in enumerate(shard_ids):
+            for tg_id in ids:
+                if tg_id:
+                    index._shard_by_user.setdefault(tg_id, shard)
+        return index
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.row_counts)
+
+    def shard_for(self, tg_user_id: str) -> int | None:
+        return self._shard_by_user.get(tg_user_id)
+
+    def assign(self, tg_user_id: str, shard: int) -> None:
+        self._shard_by_user[tg_user_id] = shard
+
+    def allocate(self, count: int) -> list[tuple[int, int]]:
+        """Reserve room for ``count`` new rows; returns ``(shard, rows)`` pairs in order."""
+
+        allocations: list[tuple[int, int]] = []
+        remaining = count
+        while remaining > 0:
+            last = self.shard_count - 1
+            free = self.max_rows_per_shard - self.row_counts[last]
+            if free <= 0:
+                self.row_counts.append(0)
+                continue
+            take = min(free, remaining)
+            self.row_counts[last] += take
+            allocations.append((last, take))
+            remaining -= take
+        return allocations
 
 
 class GoogleSheetsService:
@@ -21,6 +195,10 @@ class GoogleSheetsService:
         self.settings = settings
         self.logger = logger
         self.client: gspread.Client | None = None
+        self._write_lock = threading.Lock()
+        self._spreadsheet: gspread.Spreadsheet | None = None
+        self._shards: list[gspread.Worksheet] | None = None
+        self._index: ShardIndex | None = None
         self._initialize_client()
 
     def _initialize_client(self) -> None:
@@ -38,6 +216,10 @@ class GoogleSheetsService:
             return
 
         try:
+            # Imported only when enabled: gspread and google-auth add noticeably to cold start.
+            import gspread
+            from google.oauth2.service_account import Credentials
+
             credentials_path = Path(self.settings.google_sheets_credentials_path)
             if not credentials_path.exists():
                 self.logger.error(
@@ -72,44 +254,104 @@ class GoogleSheetsService:
             and self.settings.google_sheets_spreadsheet_id is not None
         )
 
-    def _get_worksheet(self) -> gspread.Worksheet | None:
-        """Get worksheet by name or create if not exists."""
+    def _shard_title(self, shard: int) -> str:
+        base = self.settings.google_sheets_worksheet_name
+        return base if shard == 0 else f"{base} {shard + 1}"
+
+    def _get_spreadsheet(self) -> gspread.Spreadsheet | None:
         if not self.is_enabled() or self.client is None:
             return None
 
-        try:
-            spreadsheet = self.client.open_by_key(self.settings.google_sheets_spreadsheet_id)
-            try:
-                worksheet = spreadsheet.worksheet(self.settings.google_sheets_worksheet_name)
-            except gspread.exceptions.WorksheetNotFound:
-                # Создаем новый лист если не существует
-                worksheet = spreadsheet.add_worksheet(
-                    title=self.settings.google_sheets_worksheet_name,
-                    rows=1000,
-                    cols=10,
-                )
-                # Добавляем заголовки
-                worksheet.append_row(
-                    [
-                        "№",
-                        "Дата",
-                        "Telegram ID",
-                        "Username",
-                        "Имя (Telegram)",
-                        "Имя (контакт)",
-                        "Телефон",
-                        "Подписан",
-                        "Участник",
-                        "Рефералов подтверждено",
-                    ]
-                )
-                self.logger.info("google_sheets_worksheet_created", name=self.settings.google_sheets_worksheet_name)
+        if self._spreadsheet is None:
+            self._spreadsheet = self.client.open_by_key(self.settings.google_sheets_spreadsheet_id)
+        return self._spreadsheet
+
+    def _reset_cache(self) -> None:
+        """Forget cached worksheets and routes; they are reloaded on the next call."""
+        self._spreadsheet = None
+        self._shards = None
+        self._index = None
+
+    def _load_shards(self) -> list[gspread.Worksheet] | None:
+        """Load (and cache) the shard worksheets in order, creating shard 0 if needed."""
+        if self._shards is not None:
+            return self._shards
+
+        spreadsheet = self._get_spreadsheet()
+        if spreadsheet is None:
+            return None
+
+        by_title = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+        shards: list[gspread.Worksheet] = []
+        while self._shard_title(len(shards)) in by_title:
+            shards.append(by_title[self._shard_title(len(shards))])
+
+        if not shards:
+            shards.append(self._create_shard(spreadsheet, 0))
+
+        self._shards = shards
+        return shards
+
+    def _create_shard(self, spreadsheet: gspread.Spreadsheet, shard: int, rows: int = 1000) -> gspread.Worksheet:
+        # Создаем новый лист (шард) с заголовками
+        title = self._shard_title(shard)
+        worksheet = spreadsheet.add_worksheet(title=title, rows=max(rows, 2), cols=len(SHEET_HEADER))
+        worksheet.append_row(SHEET_HEADER)
+        self.logger.info("google_sheets_worksheet_created", name=title, shard=shard)
+        return worksheet
+
+    def _get_shard(self, shard: int) -> gspread.Worksheet:
+        shards = self._load_shards()
+        assert shards is not None
+        spreadsheet = self._get_spreadsheet()
+        assert spreadsheet is not None
+        while len(shards) <= shard:
+            shards.append(self._create_shard(spreadsheet, len(shards)))
+        return shards[shard]
+
+    def _get_index(self) -> ShardIndex | None:
+        """Return the routing index, building it with one batched read of the ID columns."""
+        if self._index is not None:
+            return self._index
+
+        shards = self._load_shards()
+        spreadsheet = self._get_spreadsheet()
+        if shards is None or spreadsheet is None:
+            return None
+
+        response = spreadsheet.values_batch_get([f"'{worksheet.title}'!C2:C" for worksheet in shards])
+        shard_ids = [
+            [row[0].strip() if row else "" for row in value_range.get("values", [])]
+            for value_range in response.get("valueRanges", [])
+        ]
+        self._index = ShardIndex.from_columns(self.settings.google_sheets_shard_max_rows, shard_ids)
+        self.logger.info(
+            "google_sheets_shard_index_loaded",
+            shards=self._index.shard_count,
+            rows=sum(self._index.row_counts),
+        )
+        return self._index
 
-            return worksheet
+    def _get_worksheet(self) -> gspread.Worksheet | None:
+        """Get the first contacts shard, creating it if it does not exist."""
+        try:
+            shards = self._load_shards()
+            return shards[0] if shards else None
         except Exception as e:
             self.logger.exception("google_sheets_get_worksheet_error", error=str(e))
+            self._reset_cache()
             return None
 
+    def _append_rows(self, index: ShardIndex, rows: list[list[str]]) -> None:
+        """Append rows to the last shard, opening new shards when it fills up."""
+        offset = 0
+        for shard, count in index.allocate(len(rows)):
+            chunk = rows[offset : offset + count]
+            self._get_shard(shard).append_rows(chunk, value_input_option="USER_ENTERED")
+            for row in chunk:
+                index.assign(row[2], shard)
+            offset += count
+
     def add_contact(
         self,
         tg_user_id: int,
@@ -123,120 +365,347 @@ class GoogleSheetsService:
         referrals_confirmed: int = 0,
     ) -> bool:
         """Add or update contact information in Google Sheets."""
+        return self.upsert_contacts(
+            [
+                SheetContact(
+                    tg_user_id=tg_user_id,
+                    username=username,
+                    telegram_first_name=telegram_first_name,
+                    telegram_last_name=telegram_last_name,
+                    contact_name=contact_name,
+                    contact_phone=contact_phone,
+                    is_subscribed=is_subscribed,
+                    is_participant=is_participant,
+                    referrals_confirmed=referrals_confirmed,
+                )
+            ]
+        )
+
+    @_serialized
+    def upsert_contacts(self, contacts: Sequence[SheetContact]) -> bool:
+        """Add or update many contacts with one read and at most two writes.
+
+        The routing index says which shard holds each contact, so only those
+        shards (plus the last one, for new rows) are read, in one batched call.
+        Existing rows keep their serial number and are rewritten with a single
+        ``values_batch_update``; new rows are appended to the last shard. Rows
+        are located by their Telegram ID cell, not trusted from the index; if
+        the read shows the index is stale it is reloaded and the read repeated.
+        """
         if not self.is_enabled():
             return False
 
         # Не создаем запись в Google Sheets без контактной информации
-        if not contact_name or not contact_phone:
-            self.logger.debug(
-                "skipping_sheets_update_no_contact",
-                tg_user_id=tg_user_id,
-                has_name=bool(contact_name),
-                has_phone=bool(contact_phone),
-            )
+        pending: dict[str, SheetContact] = {}
+        for contact in contacts:
+            if not contact.has_contact:
+                self.logger.debug(
+                    "skipping_sheets_update_no_contact",
+                    tg_user_id=contact.tg_user_id,
+                    has_name=bool(contact.contact_name),
+                    has_phone=bool(contact.contact_phone),
+                )
+                continue
+            pending[str(contact.tg_user_id)] = contact
+
+        if not pending:
             return False
 
-        worksheet = self._get_worksheet()
-        if worksheet is None:
+        try:
+            for attempt in range(2):
+                index = self._get_index()
+                spreadsheet = self._get_spreadsheet()
+                if index is None or spreadsheet is None:
+                    return False
+
+                last_shard = index.shard_count - 1
+                routed = {tg_id: index.shard_for(tg_id) for tg_id in pending}
+                touched = {shard for shard in routed.values() if shard is not None}
+                if None in routed.values():
+                    touched.add(last_shard)
+                touched_shards = sorted(touched)
+                titles = [self._get_shard(shard).title for shard in touched_shards]
+
+                # Один запрос на чтение: номер и Telegram ID строк только нужных шардов
+                response = spreadsheet.values_batch_get([f"'{title}'!A:C" for title in titles])
+                row_by_user: dict[str, tuple[str, int, str]] = {}
+                max_serial = 0
+                stale = False
+                for shard, title, value_range in zip(touched_shards, titles, response.get("valueRanges", [])):
+                    data_rows = value_range.get("values", [])[1:]
+                    if shard == last_shard and len(data_rows) != index.row_counts[last_shard]:
+                        stale = True
+                    for idx, row in enumerate(data_rows, start=2):
+                        serial = row[0] if len(row) > 0 else ""
+                        if shard == last_shard and serial.isdigit():
+                            max_serial = max(max_serial, int(serial))
+                        tg_id = row[2].strip() if len(row) > 2 else ""
+                        if tg_id in pending and routed[tg_id] == shard:
+                            row_by_user.setdefault(tg_id, (title, idx, serial))
+
+                # The Telegram ID cells are the check: a routed contact missing from its shard, or a
+                # last shard of another length, means the sheet changed behind the index (a rebuild
+                # by the sync script, a reconcile or a manual edit). Reload it once before writing.
+                stale = stale or any(routed[tg_id] is not None and tg_id not in row_by_user for tg_id in pending)
+                if not stale or attempt:
+                    break
+                self.logger.warning("google_sheets_shard_index_stale", rows=sum(index.row_counts))
+                self._shards = None
+                self._index = None
+
+            if last_shard not in touched and len(row_by_user) < len(pending):
+                # Строка пропала из листа вручную: номер берем из последнего шарда
+                last_serials = spreadsheet.values_get(f"'{self._get_shard(last_shard).title}'!A2:A")
+                max_serial = max(
+                    (int(row[0]) for row in last_serials.get("values", []) if row and row[0].isdigit()),
+                    default=0,
+                )
+
+            current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            updates: list[dict[str, Any]] = []
+            appends: list[list[str]] = []
+
+            for tg_id, contact in pending.items():
+                existing = row_by_user.get(tg_id)
+                if existing is not None:
+                    title, row_index, serial = existing
+                    serial_number = serial if serial.isdigit() else str(row_index - 1)
+                    updates.append(
+                        {
+                            "range": f"'{title}'!A{row_index}:J{row_index}",
+                            "values": [contact.to_row(serial_number, current_date)],
+                        }
+                    )
+                else:
+                    max_serial += 1
+                    appends.append(contact.to_row(str(max_serial), current_date))
+
+            if updates:
+                spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": updates})
+            if appends:
+                self._append_rows(index, appends)
+
+            self.logger.info(
+                "contacts_upserted_to_sheets",
+                updated=len(updates),
+                added=len(appends),
+                shards_read=len(touched_shards),
+            )
+            return True
+        except Exception as e:
+            self._reset_cache()
+            self.logger.exception(
+                "google_sheets_add_contact_error",
+                tg_user_ids=list(pending),
+                error=str(e),
+            )
             return False
 
+    @_serialized
+    def rebuild_contacts(self, contacts: Sequence[SheetContact], chunk_rows: int = 20000) -> int:
+        """Replace all shards with ``contacts`` using a handful of large writes.
+
+        Contacts are split into shards of ``GOOGLE_SHEETS_SHARD_MAX_ROWS`` rows.
+        Each shard grid is resized once to the exact size (dropping stale rows),
+        then header and rows are written in ``values_update`` calls of
+        ``chunk_rows`` rows each; surplus shards are deleted. Returns the number
+        of contact rows written, or -1 on failure.
+        """
+        if not self.is_enabled():
+            return -1
+
+        current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            contact.to_row(str(serial), current_date)
+            for serial, contact in enumerate((c for c in contacts if c.has_contact), start=1)
+        ]
+        max_rows = self.settings.google_sheets_shard_max_rows
+        shard_rows = [rows[start : start + max_rows] for start in range(0, len(rows), max_rows)] or [[]]
+
         try:
-            # Оптимизированный поиск: используем find для поиска по колонке C (Telegram ID)
-            try:
-                # Ищем Telegram ID в колонке C (индекс 3 в gspread, так как индексация с 1)
-                cell = worksheet.find(str(tg_user_id), in_column=3)
-                row_index = cell.row if cell else None
-            except gspread.exceptions.CellNotFound:
-                row_index = None
-            
-            # Если не нашли через find, используем get_all_values (медленнее, но надежнее)
-            if row_index is None:
-                all_values = worksheet.get_all_values()
-                if len(all_values) > 1:
-                    for idx, row in enumerate(all_values[1:], start=2):
-                        if len(row) > 2 and row[2] == str(tg_user_id):
-                            row_index = idx
-                            break
-
-            # Формируем имя из Telegram
-            telegram_name = ""
-            if telegram_first_name:
-                telegram_name = telegram_first_name
-                if telegram_last_name:
-                    telegram_name = f"{telegram_first_name} {telegram_last_name}"
-
-            # Форматируем дату
+            spreadsheet = self._get_spreadsheet()
+            shards = self._load_shards()
+            if spreadsheet is None or shards is None:
+                return -1
+
+            for shard, data_rows in enumerate(shard_rows):
+                worksheet = self._get_shard(shard)
+                sheet_rows = [SHEET_HEADER, *data_rows]
+                # Одна строка данных должна остаться: Google Sheets не позволяет удалить все незакрепленные строки
+                worksheet.resize(rows=max(len(sheet_rows), 2), cols=len(SHEET_HEADER))
+                if not data_rows:
+                    worksheet.batch_clear(["A2:J2"])
+
+                for start in range(0, len(sheet_rows), chunk_rows):
+                    chunk = sheet_rows[start : start + chunk_rows]
+                    first_row = start + 1
+                    spreadsheet.values_update(
+                        f"'{worksheet.title}'!A{first_row}:J{first_row + len(chunk) - 1}",
+                        params={"valueInputOption": "USER_ENTERED"},
+                        body={"values": chunk},
+                    )
+
+            for surplus in shards[len(shard_rows) :]:
+                spreadsheet.del_worksheet(surplus)
+            del shards[len(shard_rows) :]
+
+            # Every row moved: the next upsert reloads the routes from the sheet.
+            self._index = None
+            self.logger.info("google_sheets_rebuilt", rows=len(rows), shards=len(shard_rows))
+            return len(rows)
+        except Exception as e:
+            self._reset_cache()
+            self.logger.exception("google_sheets_rebuild_error", error=str(e))
+            return -1
+
+    @_serialized
+    def reconcile_contacts(
+        self,
+        contacts: Sequence[SheetContact],
+        recheck: Callable[[Sequence[int]], Sequence[SheetContact]] | None = None,
+    ) -> SheetReconcileResult | None:
+        """Bring all shards in line with ``contacts`` while touching only rows that differ.
+
+        Every shard is read in one ``values_batch_get`` and hashed row by row
+        against the DB snapshot. Changed rows go out in one ``values_batch_update``,
+        stale and duplicate rows are removed with one ``deleteDimension`` batch,
+        and missing contacts are appended to the last shard.
+
+        The snapshot is taken before the sheet is read, so a contact upserted in
+        between is in the sheet but not (or not yet in that state) in the
+        snapshot. ``recheck`` is called with the Telegram IDs of the rows about
+        to be rewritten or deleted and returns their current DB state; only rows
+        it confirms stale are touched. It runs under the write lock, after the
+        sheet read, so no upsert can land between the check and the writes.
+        """
+        if not self.is_enabled():
+            return None
+
+        try:
+            spreadsheet = self._get_spreadsheet()
+            shards = self._load_shards()
+            if spreadsheet is None or shards is None:
+                return None
+
+            response = spreadsheet.values_batch_get([f"'{worksheet.title}'!A:J" for worksheet in shards])
+            shard_values = [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+            sheet_index: dict[str, tuple[int, int, str, str]] = {}
+            stale_rows: dict[int, list[int]] = {}
+            max_serial = 0
+            for shard, values in enumerate(shard_values):
+                for idx, row in enumerate(values[1:], start=2):
+                    serial = row[0] if len(row) > 0 else ""
+                    if serial.isdigit():
+                        max_serial = max(max_serial, int(serial))
+                    tg_id = row[2].strip() if len(row) > 2 else ""
+                    if not tg_id:
+                        continue
+                    if tg_id in sheet_index:
+                        stale_rows.setdefault(shard, []).append(idx)
+                        continue
+                    sheet_index[tg_id] = (shard, idx, serial, compute_row_hash(row))
+
             current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            wanted = {str(contact.tg_user_id): contact for contact in contacts if contact.has_contact}
 
-            # Определяем порядковый номер
-            if row_index is not None:
-                # При обновлении существующей записи сохраняем номер из первой колонки
-                existing_row = worksheet.row_values(row_index)
-                serial_number = existing_row[0] if len(existing_row) > 0 and existing_row[0].isdigit() else str(row_index - 1)
-            else:
-                # Для новой записи берем следующий номер (используем быстрый способ)
-                try:
-                    # Получаем только первую колонку для подсчета
-                    col_a_values = worksheet.col_values(1)
-                    if len(col_a_values) <= 1:  # Только заголовок
-                        serial_number = "1"
-                    else:
-                        max_num = 0
-                        for val in col_a_values[1:]:  # Пропускаем заголовок
-                            if val.isdigit():
-                                max_num = max(max_num, int(val))
-                        serial_number = str(max_num + 1)
-                except Exception:
-                    # Fallback на старый способ
-                    all_values = worksheet.get_all_values()
-                    if len(all_values) <= 1:
-                        serial_number = "1"
-                    else:
-                        max_num = 0
-                        for row in all_values[1:]:
-                            if len(row) > 0 and row[0].isdigit():
-                                try:
-                                    max_num = max(max_num, int(row[0]))
-                                except ValueError:
-                                    pass
-                        serial_number = str(max_num + 1)
-
-            row = [
-                serial_number,
-                current_date,
-                str(tg_user_id),
-                username or "",
-                telegram_name,
-                contact_name or "",
-                contact_phone or "",
-                "Да" if is_subscribed else "Нет",
-                "Да" if is_participant else "Нет",
-                str(referrals_confirmed),
+            suspects = [
+                tg_id
+                for tg_id, (_, _, _, sheet_hash) in sheet_index.items()
+                if tg_id not in wanted or compute_row_hash(wanted[tg_id].to_row("", "")) != sheet_hash
             ]
+            if recheck is not None and suspects:
+                current = recheck([int(tg_id) for tg_id in suspects if tg_id.isdigit()])
+                fresh = {str(contact.tg_user_id): contact for contact in current}
+                for tg_id in suspects:
+                    contact = fresh.get(tg_id)
+                    if contact is not None and contact.has_contact:
+                        wanted[tg_id] = contact
+                    else:
+                        wanted.pop(tg_id, None)
+
+            updates: list[dict[str, Any]] = []
+            appends: list[list[str]] = []
+
+            for tg_id, contact in wanted.items():
+                existing = sheet_index.get(tg_id)
+                if existing is None:
+                    max_serial += 1
+                    appends.append(contact.to_row(str(max_serial), current_date))
+                    continue
+
+                shard, row_index, serial, sheet_hash = existing
+                db_row = contact.to_row(serial if serial.isdigit() else str(row_index - 1), current_date)
+                if compute_row_hash(db_row) != sheet_hash:
+                    updates.append(
+                        {
+                            "range": f"'{shards[shard].title}'!A{row_index}:J{row_index}",
+                            "values": [db_row],
+                        }
+                    )
+
+            for tg_id, (shard, row_index, _, _) in sheet_index.items():
+                if tg_id not in wanted:
+                    stale_rows.setdefault(shard, []).append(row_index)
+
+            # Обновления выполняются до удаления строк, пока номера строк еще актуальны
+            if updates:
+                spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": updates})
+            if stale_rows:
+                spreadsheet.batch_update(
+                    {
+                        "requests": [
+                            {
+                                "deleteDimension": {
+                                    "range": {
+                                        "sheetId": shards[shard].id,
+                                        "dimension": "ROWS",
+                                        "startIndex": start - 1,
+                                        "endIndex": end,
+                                    }
+                                }
+                            }
+                            for shard, row_indexes in stale_rows.items()
+                            for start, end in _group_descending_ranges(row_indexes)
+                        ]
+                    }
+                )
 
-            if row_index is not None:
-                # Обновляем существующую строку используя batch update (быстрее)
-                range_name = f"{row_index}:{row_index}"
-                worksheet.update(range_name, [row], value_input_option="USER_ENTERED")
-                self.logger.info(
-                    "contact_updated_in_sheets",
-                    tg_user_id=tg_user_id,
-                    row=row_index,
+            remaining_ids: list[list[str]] = []
+            for shard, values in enumerate(shard_values):
+                removed = set(stale_rows.get(shard, []))
+                remaining_ids.append(
+                    [
+                        row[2].strip() if len(row) > 2 else ""
+                        for idx, row in enumerate(values[1:], start=2)
+                        if idx not in removed
+                    ]
                 )
-            else:
-                # Добавляем новую строку
-                worksheet.append_row(row, value_input_option="USER_ENTERED")
-                self.logger.info(
-                    "contact_added_to_sheets",
-                    tg_user_id=tg_user_id,
-                    has_contact_name=bool(contact_name),
-                    has_contact_phone=bool(contact_phone),
+            if appends:
+                self._append_rows(
+                    ShardIndex.from_columns(self.settings.google_sheets_shard_max_rows, remaining_ids),
+                    appends,
                 )
-            return True
+            # Rows were deleted and shifted: the next upsert reloads the routes from the sheet.
+            self._index = None
+
+            deleted = sum(len(set(row_indexes)) for row_indexes in stale_rows.values())
+            result = SheetReconcileResult(updated=len(updates), appended=len(appends), deleted=deleted)
+            self.logger.info(
+                "google_sheets_reconciled",
+                updated=result.updated,
+                appended=result.appended,
+                deleted=result.deleted,
+                rechecked=len(suspects) if recheck is not None else 0,
+                shards=len(shards),
+            )
+            return result
         except Exception as e:
-            self.logger.exception("google_sheets_add_contact_error", tg_user_id=tg_user_id, error=str(e))
-            return False
+            self._reset_cache()
+            self.logger.exception("google_sheets_reconcile_error", error=str(e))
+            return None
 
+    @_serialized
     def update_contact(
         self,
         tg_user_id: int,
@@ -250,11 +719,12 @@ class GoogleSheetsService:
         if not self.is_enabled():
             return False
 
-        worksheet = self._get_worksheet()
-        if worksheet is None:
-            return False
-
         try:
+            index = self._get_index()
+            if index is None:
+                return False
+            worksheet = self._get_shard(index.shard_for(str(tg_user_id)) or 0)
+
             # Находим строку с данным пользователем
             all_values = worksheet.get_all_values()
             if not all_values:
@@ -279,9 +749,11 @@ class GoogleSheetsService:
                     self.logger.info("contact_updated_in_sheets", tg_user_id=tg_user_id)
                     return True
 
-            # Если не нашли - добавляем новую запись
+            # Если не нашли - индекс устарел, перечитаем его при следующем вызове
             self.logger.warning("contact_not_found_in_sheets_for_update", tg_user_id=tg_user_id)
+            self._index = None
             return False
         except Exception as e:
+            self._reset_cache()
             self.logger.exception("google_sheets_update_contact_error", tg_user_id=tg_user_id, error=str(e))
             return False
@@ -0,0 +1,270 @@
+"""Background delivery of transactional outbox events."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog.stdlib import BoundLogger
+
+from app.bot.rate_limiter import RequestPriority, request_priority
+from app.db.enums import OutboxEventKind
+from app.metrics import REGISTRY
+from app.repositories.outbox import OutboxRepository
+from app.repositories.users import UsersRepository
+from app.services.google_sheets_service import GoogleSheetsService, SheetContact
+from app.services.subscription_service import build_referrer_notification_text
+from app.services.telegram_retry import run_with_retry
+from app.tracing import TRACER, span
+
+OUTBOX_PENDING = REGISTRY.gauge(
+    "outbox_pending_events",
+    "Pending outbox events by kind (the Sheets sync and notification queue depth).",
+    ("kind",),
+)
+OUTBOX_DELIVERIES = REGISTRY.counter(
+    "outbox_deliveries_total",
+    "Outbox delivery attempts by kind and outcome (done, retry, failed).",
+    ("kind", "outcome"),
+)
+
+
+def compute_outbox_retry_delay(
+    attempts: int,
+    base_delay_seconds: float = 5.0,
+    max_delay_seconds: float = 600.0,
+) -> float:
+    """Exponential backoff between delivery attempts, capped at ``max_delay_seconds``."""
+
+    return min(max_delay_seconds, base_delay_seconds * (2 ** max(0, attempts - 1)))
+
+
+@dataclass(slots=True)
+class _DeliveryOutcome:
+    done: list[int] = field(default_factory=list)
+    retry: dict[int, str] = field(default_factory=dict)
+
+
+class OutboxDispatcher:
+    """Claims due outbox events in batches and delivers them."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        bot: Bot,
+        google_sheets_service: GoogleSheetsService,
+        logger: BoundLogger,
+        *,
+        batch_size: int = 100,
+        poll_interval_seconds: float = 1.0,
+        max_attempts: int = 8,
+        lease_seconds: float = 120.0,
+        notification_concurrency: int = 5,
+        pending_gauge_refresh_seconds: float = 30.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.bot = bot
+        self.google_sheets_service = google_sheets_service
+        self.logger = logger
+        self.batch_size = batch_size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.pending_gauge_refresh_seconds = pending_gauge_refresh_seconds
+        self._pending_gauge_refreshed_at = float("-inf")
+        self._notification_semaphore = asyncio.Semaphore(notification_concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="outbox_dispatcher")
+            self.logger.info("outbox_dispatcher_started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self.logger.info("outbox_dispatcher_stopped")
+
+    def wake(self) -> None:
+        """Skip the remaining poll interval after a transaction enqueued events."""
+
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.exception("outbox_dispatch_error")
+                claimed = 0
+
+            if time.monotonic() - self._pending_gauge_refreshed_at >= self.pending_gauge_refresh_seconds:
+                await self._refresh_pending_gauge()
+
+            # A full batch means there is likely more work queued up.
+            if claimed >= self.batch_size:
+                continue
+
+            self._wakeup.clear()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_seconds)
+
+    async def _refresh_pending_gauge(self) -> None:
+        self._pending_gauge_refreshed_at = time.monotonic()
+        try:
+            async with self.session_factory() as session:
+                for kind in OutboxEventKind:
+                    OUTBOX_PENDING.labels(kind.value).set(await OutboxRepository.count_pending(session, kind))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.logger.warning("outbox_pending_gauge_refresh_failed")
+
+    async def dispatch_once(self) -> int:
+        """Claim one batch, deliver it and record the outcome. Returns the batch size."""
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                events = await OutboxRepository.claim_batch(
+                    session,
+                    limit=self.batch_size,
+                    lease_seconds=self.lease_seconds,
+                )
+
+        if not events:
+            return 0
+
+        with TRACER.trace("outbox.dispatch", events=len(events)):
+            outcome = _DeliveryOutcome()
+            sheets_events = [event for event in events if event.kind == OutboxEventKind.SHEETS_SYNC]
+            notification_events = [
+                event for event in events if event.kind == OutboxEventKind.REFERRER_NOTIFICATION
+            ]
+
+            await self._deliver_sheets_sync(sheets_events, outcome)
+            texts = await self._resolve_notification_texts(notification_events)
+            await asyncio.gather(
+                *(self._deliver_notification(event, texts[event.id], outcome) for event in notification_events)
+            )
+
+            await self._record_outcome(events, outcome)
+        return len(events)
+
+    async def _deliver_sheets_sync(self, events: list[Any], outcome: _DeliveryOutcome) -> None:
+        if not events:
+            return
+
+        event_ids = [event.id for event in events]
+        if not self.google_sheets_service.is_enabled():
+            outcome.done.extend(event_ids)
+            return
+
+        tg_user_ids = sorted({int(event.payload["tg_user_id"]) for event in events})
+        async with self.session_factory() as session:
+            users = await UsersRepository.fetch_by_tg_user_ids(session, tg_user_ids)
+
+        # The row is rebuilt from the latest DB state, so duplicate events collapse into one write.
+        contacts = [SheetContact.from_user(user) for user in users if user.contact_name and user.contact_phone]
+        if not contacts:
+            outcome.done.extend(event_ids)
+            return
+
+        loop = asyncio.get_running_loop()
+        with span("sheets.upsert_contacts", contacts=len(contacts)):
+            synced = await loop.run_in_executor(None, self.google_sheets_service.upsert_contacts, contacts)
+        if synced:
+            outcome.done.extend(event_ids)
+            self.logger.info("contacts_synced_to_sheets", events=len(events), contacts=len(contacts))
+        else:
+            for event_id in event_ids:
+                outcome.retry[event_id] = "google_sheets_upsert_failed"
+
+    async def _resolve_notification_texts(self, events: list[Any]) -> dict[int, str]:
+        """Texts of referrer notifications; events without one use the referrer's current participation."""
+
+        texts = {event.id: event.payload["text"] for event in events if "text" in event.payload}
+        pending = [event for event in events if event.id not in texts]
+        if not pending:
+            return texts
+
+        async with self.session_factory() as session:
+            users = await UsersRepository.fetch_by_tg_user_ids(
+                session,
+                sorted({int(event.payload["chat_id"]) for event in pending}),
+            )
+        participation = {user.tg_user_id: user.is_participant for user in users}
+        for event in pending:
+            is_participant = participation.get(int(event.payload["chat_id"]), False)
+            texts[event.id] = build_referrer_notification_text(is_participant)
+        return texts
+
+    async def _deliver_notification(self, event: Any, text: str, outcome: _DeliveryOutcome) -> None:
+        chat_id = int(event.payload["chat_id"])
+        async with self._notification_semaphore:
+            try:
+                with request_priority(RequestPriority.NOTIFICATION):
+                    await run_with_retry(
+                        self.bot.send_message,
+                        chat_id=chat_id,
+                        text=text,
+                        logger=self.logger,
+                    )
+            except (TelegramForbiddenError, TelegramBadRequest):
+                # Blocked bot or deleted chat: retrying will not help.
+                self.logger.warning("referrer_notification_failed", referrer_id=chat_id)
+                outcome.done.append(event.id)
+                return
+            except Exception as exc:
+                self.logger.warning(
+                    "referrer_notification_retry_scheduled",
+                    referrer_id=chat_id,
+                    error=str(exc),
+                )
+                outcome.retry[event.id] = f"{type(exc).__name__}: {exc}"
+                return
+
+        outcome.done.append(event.id)
+
+    async def _record_outcome(self, events: list[Any], outcome: _DeliveryOutcome) -> None:
+        attempts_by_id = {event.id: event.attempts for event in events}
+        kind_by_id = {event.id: event.kind.value for event in events}
+        for event_id in outcome.done:
+            OUTBOX_DELIVERIES.labels(kind_by_id[event_id], "done").inc()
+
+        async with self.session_factory() as session:
+            async with session.begin():
+                await OutboxRepository.mark_done(session, outcome.done)
+
+                for event_id, error in outcome.retry.items():
+                    attempts = attempts_by_id[event_id]
+                    if attempts >= self.max_attempts:
+                        OUTBOX_DELIVERIES.labels(kind_by_id[event_id], "failed").inc()
+                        await OutboxRepository.mark_failed(session, [event_id], error=error)
+                        self.logger.error(
+                            "outbox_event_failed",
+                            event_id=event_id,
+                            attempts=attempts,
+                            error=error,
+                        )
+                    else:
+                        OUTBOX_DELIVERIES.labels(kind_by_id[event_id], "retry").inc()
+                        await OutboxRepository.schedule_retry(
+                            session,
+                            [event_id],
+                            delay_seconds=compute_outbox_retry_delay(attempts),
+                            error=error,
+                        )
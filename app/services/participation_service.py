@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from sqlalchemy import ColumnElement, and_, or_
+
 from app.constants import REFERRALS_REQUIRED_FOR_PARTICIPATION
 from app.db.models import User
 
@@ -20,3 +22,19 @@ def mark_participant_if_eligible(user: User) -> bool:
         return True
 
     return False
+
+
+def participant_after_referral_expression() -> ColumnElement[bool]:
+    """SQL form of ``mark_participant_if_eligible`` for a row whose counter is being incremented.
+
+    Used in ``UPDATE users SET ...`` where column references still hold the
+    pre-update values, hence the ``+ 1``.
+    """
+
+    return or_(
+        User.is_participant,
+        and_(
+            User.is_subscribed,
+            User.referrals_confirmed + 1 >= REFERRALS_REQUIRED_FOR_PARTICIPATION,
+        ),
+    )
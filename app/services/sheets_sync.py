@@ -0,0 +1,169 @@
+"""Bulk DB -> Google Sheets synchronization jobs."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Sequence
+
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog.stdlib import BoundLogger
+
+from app.metrics import REGISTRY
+from app.repositories.users import UsersRepository
+from app.services.google_sheets_service import GoogleSheetsService, SheetContact, SheetReconcileResult
+from app.tracing import TRACER, span
+
+SHEETS_RECONCILE_RUNS = REGISTRY.counter(
+    "sheets_reconcile_runs_total",
+    "Periodic contacts sheet reconciliations by outcome.",
+    ("outcome",),
+)
+
+
+def _row_to_contact(row: Row[Any]) -> SheetContact:
+    return SheetContact(
+        tg_user_id=row.tg_user_id,
+        username=row.username,
+        telegram_first_name=row.first_name,
+        telegram_last_name=row.last_name,
+        contact_name=row.contact_name,
+        contact_phone=row.contact_phone,
+        is_subscribed=row.is_subscribed,
+        is_participant=row.is_participant,
+        referrals_confirmed=row.referrals_confirmed or 0,
+    )
+
+
+async def load_sheet_contacts(
+    session_factory: async_sessionmaker[AsyncSession],
+    *,
+    chunk_size: int = 5000,
+) -> list[SheetContact]:
+    """Stream every user with contact info into compact sheet snapshots (no ORM objects)."""
+
+    contacts: list[SheetContact] = []
+    async with session_factory() as session:
+        async for rows in UsersRepository.stream_contact_rows(session, chunk_size=chunk_size):
+            contacts.extend(_row_to_contact(row) for row in rows)
+    return contacts
+
+
+async def load_contacts_by_ids(
+    session_factory: async_sessionmaker[AsyncSession],
+    tg_user_ids: Sequence[int],
+    *,
+    chunk_size: int = 5000,
+) -> list[SheetContact]:
+    """Current DB state of the given users; IDs with no user are simply absent."""
+
+    contacts: list[SheetContact] = []
+    async with session_factory() as session:
+        for start in range(0, len(tg_user_ids), chunk_size):
+            users = await UsersRepository.fetch_by_tg_user_ids(session, tg_user_ids[start : start + chunk_size])
+            contacts.extend(SheetContact.from_user(user) for user in users)
+    return contacts
+
+
+async def rebuild_contacts_sheet(
+    session_factory: async_sessionmaker[AsyncSession],
+    google_sheets_service: GoogleSheetsService,
+    logger: BoundLogger,
+    *,
+    chunk_size: int = 5000,
+    write_chunk_rows: int = 20000,
+) -> int:
+    """Rewrite the contacts sheet from the DB. Returns rows written, or -1 on failure."""
+
+    contacts = await load_sheet_contacts(session_factory, chunk_size=chunk_size)
+    logger.info("sheets_rebuild_loaded_contacts", contacts=len(contacts))
+
+    loop = asyncio.get_running_loop()
+    with span("sheets.rebuild_contacts", contacts=len(contacts)):
+        return await loop.run_in_executor(
+            None,
+            lambda: google_sheets_service.rebuild_contacts(contacts, chunk_rows=write_chunk_rows),
+        )
+
+
+async def upsert_contacts_sheet(
+    session_factory: async_sessionmaker[AsyncSession],
+    google_sheets_service: GoogleSheetsService,
+    logger: BoundLogger,
+    *,
+    chunk_size: int = 5000,
+) -> tuple[int, int]:
+    """Upsert every contact chunk by chunk, keeping rows that only exist in the sheet.
+
+    Returns ``(synced, failed)`` contact counts.
+    """
+
+    synced = 0
+    failed = 0
+    loop = asyncio.get_running_loop()
+
+    async with session_factory() as session:
+        async for rows in UsersRepository.stream_contact_rows(session, chunk_size=chunk_size):
+            contacts = [_row_to_contact(row) for row in rows]
+            with span("sheets.upsert_contacts", contacts=len(contacts)):
+                ok = await loop.run_in_executor(None, google_sheets_service.upsert_contacts, contacts)
+            if ok:
+                synced += len(contacts)
+            else:
+                failed += len(contacts)
+            logger.info("sheets_upsert_chunk_done", contacts=len(contacts), ok=ok)
+
+    return synced, failed
+
+
+async def reconcile_contacts_sheet(
+    session_factory: async_sessionmaker[AsyncSession],
+    google_sheets_service: GoogleSheetsService,
+    logger: BoundLogger,
+    *,
+    chunk_size: int = 5000,
+) -> SheetReconcileResult | None:
+    """Push only the differences between the DB and the contacts sheet.
+
+    Rows the snapshot would rewrite or delete are re-read from the DB after the
+    sheet read, so contacts the outbox upserted meanwhile are left alone.
+    """
+
+    contacts = await load_sheet_contacts(session_factory, chunk_size=chunk_size)
+    logger.info("sheets_reconcile_loaded_contacts", contacts=len(contacts))
+
+    loop = asyncio.get_running_loop()
+
+    def recheck(tg_user_ids: Sequence[int]) -> list[SheetContact]:
+        # Called from the executor thread while the service holds its write lock.
+        future = asyncio.run_coroutine_threadsafe(
+            load_contacts_by_ids(session_factory, tg_user_ids, chunk_size=chunk_size),
+            loop,
+        )
+        return future.result()
+
+    with span("sheets.reconcile_contacts", contacts=len(contacts)):
+        return await loop.run_in_executor(None, google_sheets_service.reconcile_contacts, contacts, recheck)
+
+
+async def run_periodic_reconciliation(
+    session_factory: async_sessionmaker[AsyncSession],
+    google_sheets_service: GoogleSheetsService,
+    logger: BoundLogger,
+    *,
+    interval_seconds: float,
+) -> None:
+    """Reconcile the contacts sheet every ``interval_seconds`` until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            with TRACER.trace("sheets.periodic_reconcile"):
+                result = await reconcile_contacts_sheet(session_factory, google_sheets_service, logger)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            SHEETS_RECONCILE_RUNS.labels("error").inc()
+            logger.exception("sheets_periodic_reconcile_error")
+        else:
+            SHEETS_RECONCILE_RUNS.labels("ok" if result is not None else "failed").inc()
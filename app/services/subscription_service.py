@@ -11,9 +11,15 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from structlog.stdlib import BoundLogger
 
 from app.constants import SUBSCRIPTION_RATE_LIMIT_SECONDS
+from app.db.enums import OutboxEventKind
+from app.repositories.outbox import OutboxRepository
 from app.repositories.referrals import ReferralsRepository
 from app.repositories.users import UsersRepository
-from app.services.participation_service import mark_participant_if_eligible
+from app.services.participation_service import (
+    mark_participant_if_eligible,
+    participant_after_referral_expression,
+)
+from app.tracing import traced
 
 
 @dataclass(slots=True)
@@ -34,6 +40,18 @@ def normalize_member_status(raw_status: object) -> str:
     return str(raw_status)
 
 
+def build_referrer_notification_text(referrer_is_participant: bool) -> str:
+    if referrer_is_participant:
+        return (
+            "Ваш друг подписался по вашей ссылке.\n"
+            "Поздравляем, вы участвуете в розыгрыше!"
+        )
+    return (
+        "Ваш друг подписался по вашей ссылке.\n"
+        "Чтобы участвовать в розыгрыше, подтвердите и свою подписку на канал."
+    )
+
+
 def compute_retry_after_seconds(
     last_checked_at: datetime | None,
     now: datetime,
@@ -50,6 +68,7 @@ def compute_retry_after_seconds(
     return max(1, math.ceil(remaining.total_seconds()))
 
 
+@traced("subscription.register_check_attempt")
 async def register_subscription_check_attempt(
     session_factory: async_sessionmaker[AsyncSession],
     telegram_user: TelegramUser,
@@ -79,6 +98,7 @@ async def register_subscription_check_attempt(
     return 0
 
 
+@traced("subscription.confirm")
 async def confirm_subscription_and_referral(
     session_factory: async_sessionmaker[AsyncSession],
     tg_user_id: int,
@@ -105,16 +125,31 @@ async def confirm_subscription_and_referral(
                 if referrer_id == tg_user_id:
                     logger.warning("self_referral_detected_during_confirmation", tg_user_id=tg_user_id)
                 else:
-                    referrer = await UsersRepository.get_by_tg_user_id(session, referrer_id, for_update=True)
-                    if referrer is not None:
-                        referrer.referrals_confirmed += 1
-                        mark_participant_if_eligible(referrer)
+                    # A viral referrer's row is hot: increment it atomically, near the end of
+                    # the transaction, so its row lock is held only briefly.
+                    referrer_row = await UsersRepository.increment_referrals_confirmed(
+                        session,
+                        referrer_id,
+                        is_participant=participant_after_referral_expression(),
+                    )
+                    if referrer_row is not None:
+                        # Only a counted referral has side effects. They commit atomically with
+                        # the counter in one INSERT; the outbox dispatcher delivers them after
+                        # commit and picks the text from the referrer's participation then.
+                        await OutboxRepository.enqueue_many(
+                            session,
+                            [
+                                (OutboxEventKind.REFERRER_NOTIFICATION, {"chat_id": referrer_id}),
+                                (OutboxEventKind.SHEETS_SYNC, {"tg_user_id": referrer_id}),
+                            ],
+                        )
                         notify_referrer_id = referrer_id
-                        referrer_is_participant = referrer.is_participant
+                        referrer_is_participant = referrer_row.is_participant
                         logger.info(
                             "referral_confirmed",
                             referrer_id=referrer_id,
                             referral_id=tg_user_id,
+                            referrals_confirmed=referrer_row.referrals_confirmed,
                         )
 
             mark_participant_if_eligible(user)
@@ -3,50 +3,304 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Awaitable, Callable, TypeVar
+import random
+import time
+from enum import IntEnum
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, TypeVar
 
-from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
 from structlog.stdlib import BoundLogger
 
+from app.metrics import REGISTRY
+from app.tracing import span
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
 T = TypeVar("T")
 
+TELEGRAM_RETRIES = REGISTRY.counter(
+    "telegram_retries_total",
+    "Telegram API call retries by reason.",
+    ("reason",),
+)
+TELEGRAM_RETRIES_DENIED = REGISTRY.counter(
+    "telegram_retries_denied_total",
+    "Retries skipped because the retry budget was exhausted or the wait was too long.",
+    ("reason",),
+)
+TELEGRAM_CIRCUIT_STATE = REGISTRY.gauge(
+    "telegram_circuit_state",
+    "Circuit breaker state per Bot API method (0 closed, 1 half-open, 2 open).",
+    ("method",),
+)
+TELEGRAM_CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "telegram_circuit_rejections_total",
+    "Bot API calls failed fast by an open circuit breaker.",
+    ("method",),
+)
+
+
+class TelegramCircuitOpenError(TelegramNetworkError):
+    """Raised instead of calling a Bot API method whose circuit breaker is open."""
+
+
+def decorrelated_jitter_delay(
+    previous_delay_seconds: float,
+    base_delay_seconds: float,
+    max_delay_seconds: float,
+) -> float:
+    """Next backoff delay: random between the base and three times the previous delay."""
+
+    upper = max(base_delay_seconds, previous_delay_seconds * 3)
+    return min(max_delay_seconds, random.uniform(base_delay_seconds, upper))
+
+
+class RetryBudget:
+    """Process-wide cap on retries relative to first attempts.
+
+    Every call deposits ``ratio`` tokens and every retry spends one, plus a
+    floor of ``min_retries_per_second`` so a quiet process can still retry.
+    During an outage retries stop once the budget is spent instead of
+    multiplying the load.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries_per_second: float = 2.0, max_tokens: float = 50.0) -> None:
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated_at) * self.min_retries_per_second)
+        self._updated_at = now
+
+    def record_call(self) -> None:
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+RETRY_BUDGET = RetryBudget()
+
 
 async def run_with_retry(
     operation: Callable[..., Awaitable[T]],
     *args: Any,
     attempts: int = 3,
     base_delay_seconds: float = 1.0,
+    max_delay_seconds: float = 10.0,
+    max_retry_after_seconds: float = 30.0,
+    budget: RetryBudget | None = None,
     logger: BoundLogger | None = None,
     **kwargs: Any,
 ) -> T:
-    """Run Telegram operation with retry for transient failures."""
+    """Run Telegram operation with retry for transient failures.
+
+    Backoff uses decorrelated jitter so callers do not retry in lockstep.
+    Retries draw on the shared ``RetryBudget``. Open circuits and
+    ``RetryAfter`` waits longer than ``max_retry_after_seconds`` fail at once.
+    """
+
+    # One span for the whole call: each attempt is its own telegram.* child span and
+    # the backoff waits are the gaps between them.
+    with span("telegram.retry", operation=getattr(operation, "__name__", type(operation).__name__)):
+        return await _run_attempts(
+            operation,
+            args,
+            kwargs,
+            attempts=attempts,
+            base_delay_seconds=base_delay_seconds,
+            max_delay_seconds=max_delay_seconds,
+            max_retry_after_seconds=max_retry_after_seconds,
+            budget=budget or RETRY_BUDGET,
+            logger=logger,
+        )
+
+
+async def _run_attempts(
+    operation: Callable[..., Awaitable[T]],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    *,
+    attempts: int,
+    base_delay_seconds: float,
+    max_delay_seconds: float,
+    max_retry_after_seconds: float,
+    budget: RetryBudget,
+    logger: BoundLogger | None,
+) -> T:
+    budget.record_call()
+    backoff = base_delay_seconds
 
     for attempt in range(1, attempts + 1):
         try:
             return await operation(*args, **kwargs)
+        except TelegramCircuitOpenError:
+            raise
         except TelegramRetryAfter as exc:
             if attempt >= attempts:
                 raise
             delay = float(exc.retry_after or base_delay_seconds)
-            if logger is not None:
-                logger.warning(
-                    "telegram_retry_after",
-                    attempt=attempt,
-                    attempts=attempts,
-                    delay_seconds=delay,
-                )
-            await asyncio.sleep(delay)
-        except (TelegramNetworkError, TelegramServerError):
+            if delay > max_retry_after_seconds:
+                TELEGRAM_RETRIES_DENIED.labels("retry_after_too_long").inc()
+                raise
+            reason = "retry_after"
+            error: Exception = exc
+        except (TelegramNetworkError, TelegramServerError) as exc:
             if attempt >= attempts:
                 raise
-            delay = base_delay_seconds * (2 ** (attempt - 1))
+            backoff = decorrelated_jitter_delay(backoff, base_delay_seconds, max_delay_seconds)
+            delay = backoff
+            reason = "transient_error"
+            error = exc
+
+        if not budget.try_spend():
+            TELEGRAM_RETRIES_DENIED.labels("budget_exhausted").inc()
             if logger is not None:
-                logger.warning(
-                    "telegram_transient_error_retry",
-                    attempt=attempt,
-                    attempts=attempts,
-                    delay_seconds=delay,
-                )
-            await asyncio.sleep(delay)
+                logger.warning("telegram_retry_budget_exhausted", attempt=attempt, reason=reason)
+            raise error
+
+        TELEGRAM_RETRIES.labels(reason).inc()
+        if logger is not None:
+            logger.warning(
+                "telegram_retry_after" if reason == "retry_after" else "telegram_transient_error_retry",
+                attempt=attempt,
+                attempts=attempts,
+                delay_seconds=round(delay, 3),
+            )
+        await asyncio.sleep(delay)
 
     raise RuntimeError("unreachable retry state")
+
+
+class CircuitState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive transport/server failures.
+
+    While open every call is rejected; after ``recovery_seconds`` a single
+    probe call is let through and its outcome closes or re-opens the circuit.
+    The probe holds a lease of ``recovery_seconds``: if it never reports back,
+    the next call after the lease expires probes instead.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+
+    def allow(self, now: float) -> bool:
+        if self.state is CircuitState.CLOSED:
+            return True
+        if self.state is CircuitState.OPEN and now - self._opened_at >= self.recovery_seconds:
+            self.state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state is CircuitState.HALF_OPEN and (
+            not self._probe_in_flight or now - self._probe_started_at >= self.recovery_seconds
+        ):
+            self._probe_in_flight = True
+            self._probe_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state is CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self._opened_at = now
+
+    def record_abandoned(self, now: float) -> None:
+        """A call ended without a Telegram answer (cancelled or an unexpected error).
+
+        It proves nothing about the API, so a closed circuit ignores it; an
+        abandoned probe counts as a failed one and re-opens the circuit.
+        """
+
+        if self.state is CircuitState.HALF_OPEN:
+            self.record_failure(now)
+
+
+class CircuitBreakerMiddleware(BaseRequestMiddleware):
+    """Session middleware keeping one ``CircuitBreaker`` per Bot API method.
+
+    Only network errors and 5xx responses count as failures; any other Telegram
+    answer (including 4xx and 429) proves the API is reachable.
+    """
+
+    def __init__(self, logger: BoundLogger, *, failure_threshold: int = 5, recovery_seconds: float = 30.0) -> None:
+        self.logger = logger
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, api_method: str) -> CircuitBreaker:
+        breaker = self._breakers.get(api_method)
+        if breaker is None:
+            breaker = self._breakers[api_method] = CircuitBreaker(self.failure_threshold, self.recovery_seconds)
+        return breaker
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        breaker = self.breaker(api_method)
+        if not breaker.allow(time.monotonic()):
+            TELEGRAM_CIRCUIT_REJECTIONS.labels(api_method).inc()
+            raise TelegramCircuitOpenError(method=method, message=f"circuit open for {api_method}")
+
+        previous_state = breaker.state
+        try:
+            response = await make_request(bot, method)
+        except (TelegramNetworkError, TelegramServerError):
+            breaker.record_failure(time.monotonic())
+            self._report_transition(api_method, previous_state, breaker.state)
+            raise
+        except TelegramAPIError:
+            breaker.record_success()
+            self._report_transition(api_method, previous_state, breaker.state)
+            raise
+        except BaseException:
+            # Cancellation included: a probe must never be left in flight for good.
+            breaker.record_abandoned(time.monotonic())
+            self._report_transition(api_method, previous_state, breaker.state)
+            raise
+
+        breaker.record_success()
+        self._report_transition(api_method, previous_state, breaker.state)
+        return response
+
+    def _report_transition(self, api_method: str, previous: CircuitState, current: CircuitState) -> None:
+        if previous is current:
+            return
+        TELEGRAM_CIRCUIT_STATE.labels(api_method).set(int(current))
+        log = self.logger.warning if current is CircuitState.OPEN else self.logger.info
+        log("telegram_circuit_state_changed", method=api_method, state=current.name.lower())
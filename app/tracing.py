@@ -0,0 +1,385 @@
+"""Lightweight per-update tracing with OTLP/JSON export.
+
+A trace is opened per update (or background batch) with ``TRACER.trace``.
+Code below it adds child spans with ``span(...)`` or the ``traced`` and
+``traced_repository`` decorators; outside a trace they cost one context
+variable lookup. Finished traces slower than the threshold are logged as a
+compact span summary and exported; the rest are exported at the sample ratio.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import random
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterator, TypeVar
+
+import aiohttp
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from structlog.stdlib import BoundLogger
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+F = TypeVar("F", bound=Callable[..., Any])
+C = TypeVar("C", bound=type)
+
+SERVICE_NAME = "giveaway-bot"
+
+
+class SpanKind(IntEnum):
+    """OTLP span kinds."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    kind: SpanKind
+    start_ns: int
+    end_ns: int = 0
+    error: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+@dataclass(slots=True)
+class Trace:
+    trace_id: str
+    spans: list[Span] = field(default_factory=list)
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def _new_id(hex_digits: int) -> str:
+    return f"{random.getrandbits(hex_digits * 4):0{hex_digits}x}"
+
+
+@contextmanager
+def span(name: str, *, kind: SpanKind = SpanKind.INTERNAL, **attributes: Any) -> Iterator[Span | None]:
+    """Time the block as a child of the current span; a no-op outside a trace."""
+
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        span_id=_new_id(16),
+        parent_id=parent.span_id if parent is not None else None,
+        kind=kind,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = type(exc).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Wrap a coroutine function in a span called ``name``."""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current_trace.get() is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def traced_repository(cls: C) -> C:
+    """Give every async static method of a repository class a ``db.<Class>.<method>`` span.
+
+    Async generators (streams) are left alone: their time is spent in the caller's loop.
+    """
+
+    for attribute, value in list(vars(cls).items()):
+        if isinstance(value, staticmethod) and inspect.iscoroutinefunction(value.__func__):
+            setattr(cls, attribute, staticmethod(traced(f"db.{cls.__name__}.{attribute}")(value.__func__)))
+    return cls
+
+
+def otlp_json(traces: list[Trace], *, service_name: str = SERVICE_NAME) -> dict[str, Any]:
+    """Encode traces as an OTLP/JSON ``ExportTraceServiceRequest``."""
+
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            encoded: dict[str, Any] = {
+                "traceId": trace.trace_id,
+                "spanId": item.span_id,
+                "name": item.name,
+                "kind": int(item.kind),
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.end_ns),
+                "attributes": [_otlp_attribute(key, value) for key, value in item.attributes.items()],
+                "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+            }
+            if item.parent_id is not None:
+                encoded["parentSpanId"] = item.parent_id
+            spans.append(encoded)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def summarize(trace: Trace, *, limit: int = 20) -> list[str]:
+    """The slowest spans as ``"name=12.3ms"`` strings, root first."""
+
+    children = sorted(trace.spans[1:], key=lambda item: item.end_ns - item.start_ns, reverse=True)
+    return [f"{item.name}={item.duration_seconds * 1000:.1f}ms" for item in [trace.root, *children[:limit]]]
+
+
+class TraceExporter:
+    """Buffers finished traces and ships them in batches from a background task."""
+
+    def __init__(
+        self,
+        logger: BoundLogger,
+        *,
+        max_queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 5.0,
+    ) -> None:
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: asyncio.Queue[Trace] = asyncio.Queue(maxsize=max_queue_size)
+        self._task: asyncio.Task[None] | None = None
+        self.dropped = 0
+
+    def submit(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="trace_exporter")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self._flush()
+
+    async def _flush(self) -> None:
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait() for _ in range(min(self.batch_size, self._queue.qsize()))]
+            try:
+                await self._send(otlp_json(batch))
+            except Exception as exc:
+                self.logger.warning("trace_export_failed", traces=len(batch), error=str(exc))
+                return
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class FileTraceExporter(TraceExporter):
+    """Appends one OTLP/JSON request per line, e.g. for an OpenTelemetry collector filelog receiver."""
+
+    def __init__(self, path: str | os.PathLike[str], logger: BoundLogger, **kwargs: Any) -> None:
+        super().__init__(logger, **kwargs)
+        self.path = Path(path)
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str) -> None:
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(line)
+
+
+class OtlpHttpTraceExporter(TraceExporter):
+    """POSTs OTLP/JSON to a collector, e.g. ``http://localhost:4318/v1/traces``."""
+
+    def __init__(self, endpoint: str, logger: BoundLogger, *, timeout_seconds: float = 5.0, **kwargs: Any) -> None:
+        super().__init__(logger, **kwargs)
+        self.endpoint = endpoint
+        self.timeout_seconds = timeout_seconds
+        self._session: aiohttp.ClientSession | None = None
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_seconds))
+        async with self._session.post(self.endpoint, json=payload) as response:
+            response.raise_for_status()
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._session is not None:
+            await self._session.close()
+
+
+class Tracer:
+    """Opens traces and decides which finished ones are logged and exported.
+
+    Disabled until ``configure`` is called, so library code and tests pay nothing.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.logger: BoundLogger | None = None
+        self.slow_threshold_seconds = 1.0
+        self.sample_ratio = 0.0
+        self.exporters: list[TraceExporter] = []
+
+    def configure(
+        self,
+        logger: BoundLogger,
+        *,
+        slow_threshold_seconds: float,
+        sample_ratio: float,
+        exporters: list[TraceExporter] | None = None,
+    ) -> None:
+        self.enabled = True
+        self.logger = logger
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self.sample_ratio = sample_ratio
+        self.exporters = list(exporters or [])
+
+    def start(self) -> None:
+        for exporter in self.exporters:
+            exporter.start()
+
+    async def stop(self) -> None:
+        for exporter in self.exporters:
+            await exporter.stop()
+
+    @contextmanager
+    def trace(self, name: str, *, kind: SpanKind = SpanKind.INTERNAL, **attributes: Any) -> Iterator[Trace | None]:
+        if not self.enabled or _current_trace.get() is not None:
+            yield None
+            return
+
+        trace = Trace(trace_id=_new_id(32))
+        token = _current_trace.set(trace)
+        try:
+            with span(name, kind=kind, **attributes):
+                yield trace
+        finally:
+            _current_trace.reset(token)
+            self._finish(trace)
+
+    def _finish(self, trace: Trace) -> None:
+        duration = trace.root.duration_seconds
+        is_slow = duration >= self.slow_threshold_seconds
+        if is_slow and self.logger is not None:
+            self.logger.warning(
+                "slow_trace",
+                trace=trace.root.name,
+                trace_id=trace.trace_id,
+                duration_ms=round(duration * 1000, 1),
+                spans=summarize(trace),
+                **trace.root.attributes,
+            )
+        if self.exporters and (is_slow or random.random() < self.sample_ratio):
+            for exporter in self.exporters:
+                exporter.submit(trace)
+
+
+TRACER = Tracer()
+
+
+class UpdateTracingMiddleware(BaseMiddleware):
+    """Outer ``update`` middleware opening one trace per incoming update."""
+
+    def __init__(self, tracer: Tracer = TRACER) -> None:
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        with self.tracer.trace(f"update.{event.event_type}", kind=SpanKind.SERVER, update_id=event.update_id):
+            return await handler(event, data)
+
+
+class BotApiTracingMiddleware(BaseRequestMiddleware):
+    """Session middleware adding a client span per Bot API call."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if _current_trace.get() is None:
+            return await make_request(bot, method)
+
+        with span(f"telegram.{method.__api_method__}", kind=SpanKind.CLIENT):
+            return await make_request(bot, method)
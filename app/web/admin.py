@@ -0,0 +1,57 @@
+"""Authenticated admin HTTP endpoints."""
+
+from __future__ import annotations
+
+import hmac
+
+from aiohttp import web
+
+from app.config import Settings
+from app.profiling import PROFILER, ProfilerBusyError
+
+PROFILE_KINDS = ("cpu", "memory")
+PROFILE_FORMATS = ("collapsed", "top")
+
+
+def is_authorized(request: web.Request, token: str) -> bool:
+    header = request.headers.get("Authorization", "")
+    scheme, _, credentials = header.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+async def profile(request: web.Request) -> web.Response:
+    """``POST /admin/profile?kind=cpu|memory&seconds=N&format=top|collapsed``.
+
+    Profiles the worker that receives the request; with several web workers,
+    repeat the call to cover the others.
+    """
+
+    settings: Settings = request.app["settings"]
+    if not settings.admin_api_token or not is_authorized(request, settings.admin_api_token):
+        raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+
+    kind = request.query.get("kind", "cpu")
+    output = request.query.get("format", "top")
+    try:
+        seconds = float(request.query.get("seconds", "10"))
+    except ValueError:
+        raise web.HTTPBadRequest(text="seconds must be a number")
+    if kind not in PROFILE_KINDS or output not in PROFILE_FORMATS:
+        raise web.HTTPBadRequest(text=f"kind must be one of {PROFILE_KINDS}, format one of {PROFILE_FORMATS}")
+
+    try:
+        report = await PROFILER.profile(kind, seconds, output=output)  # type: ignore[arg-type]
+    except ProfilerBusyError as exc:
+        raise web.HTTPConflict(text=str(exc))
+
+    request.app["app_logger"].info(
+        "admin_profile_collected",
+        kind=kind,
+        seconds=report.seconds,
+        samples=report.samples,
+    )
+    return web.Response(
+        text=report.text,
+        content_type="text/plain",
+        headers={"Content-Disposition": f'inline; filename="{report.filename}"'},
+    )
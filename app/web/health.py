@@ -3,8 +3,8 @@
 from __future__ import annotations
 
 from aiohttp import web
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.readiness import ReadinessMonitor
 
 
 async def healthz(_: web.Request) -> web.Response:
@@ -12,12 +12,9 @@ async def healthz(_: web.Request) -> web.Response:
 
 
 async def readyz(request: web.Request) -> web.Response:
-    session_factory: async_sessionmaker[AsyncSession] = request.app["session_factory"]
-
-    try:
-        async with session_factory() as session:
-            await session.execute(text("SELECT 1"))
-    except Exception:
-        return web.json_response({"status": "error"}, status=503)
+    """Serve the background readiness snapshot; ``?deep=1`` adds the dependency checks."""
 
-    return web.json_response({"status": "ready"})
+    readiness: ReadinessMonitor = request.app["readiness"]
+    deep = request.query.get("deep", "").lower() in ("1", "true", "yes")
+    ready, payload = readiness.snapshot(deep=deep)
+    return web.json_response(payload, status=200 if ready else 503)
@@ -0,0 +1,14 @@
+"""Prometheus scrape endpoint."""
+
+from __future__ import annotations
+
+from aiohttp import web
+
+from app.metrics import REGISTRY
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def metrics(request: web.Request) -> web.Response:
+    const_labels: dict[str, str] | None = request.app.get("metrics_labels")
+    return web.Response(body=REGISTRY.render(const_labels).encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,183 @@
+"""Opt-in capture of incoming webhook updates for offline replay.
+
+The aiohttp middleware only timestamps the raw request body and queues it;
+parsing, anonymization and writing happen in batches off the event loop.
+Each line of the gzip-compressed JSONL file is ``{"t": <arrival unix time>,
+"u": <update>}``. Files rotate like ``logging.handlers.RotatingFileHandler``:
+``updates.jsonl.gz`` -> ``updates.jsonl.gz.1`` -> ... ``.N``.
+
+Anonymization keeps what shapes load and drops what identifies people:
+positive user/chat ids become stable pseudonyms (the same person keeps the
+same id within a capture, including inside ``/start <referrer_id>``), names,
+usernames and phone numbers are replaced, and free text is replaced by ``x``
+characters of the same length. Commands, callback data and the update
+structure are kept.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from aiohttp import web
+from structlog.stdlib import BoundLogger
+
+from app.metrics import REGISTRY
+
+UPDATES_CAPTURED = REGISTRY.counter("updates_captured_total", "Webhook updates written to the capture file.")
+UPDATES_CAPTURE_DROPPED = REGISTRY.counter(
+    "updates_capture_dropped_total",
+    "Webhook updates not captured because the capture queue was full.",
+)
+
+ID_KEYS = frozenset({"id", "user_id"})
+PERSONAL_KEYS = frozenset({"first_name", "last_name", "username", "title", "phone_number", "vcard", "bio"})
+TEXT_KEYS = frozenset({"text", "caption"})
+
+
+class UpdateAnonymizer:
+    """Maps personal data to placeholders, with ids pseudonymized under a per-capture secret."""
+
+    def __init__(self, secret: bytes | None = None) -> None:
+        self._secret = secret or secrets.token_bytes(32)
+
+    def pseudonym(self, value: int) -> int:
+        digest = hmac.new(self._secret, str(value).encode(), hashlib.sha256).digest()
+        # Ten-digit positive ids, like real user ids.
+        return 1_000_000_000 + int.from_bytes(digest[:8], "big") % 9_000_000_000
+
+    def anonymize(self, value: Any, key: str | None = None) -> Any:
+        if isinstance(value, dict):
+            return {item_key: self.anonymize(item, item_key) for item_key, item in value.items()}
+        if isinstance(value, list):
+            return [self.anonymize(item, key) for item in value]
+        if key in ID_KEYS and isinstance(value, int) and not isinstance(value, bool) and value > 0:
+            return self.pseudonym(value)
+        if key in PERSONAL_KEYS and isinstance(value, str):
+            return f"{key}_{len(value)}"
+        if key in TEXT_KEYS and isinstance(value, str):
+            return self.anonymize_text(value)
+        return value
+
+    def anonymize_text(self, text: str) -> str:
+        if not text.startswith("/"):
+            return "x" * len(text)
+        command, *args = text.split()
+        # A numeric /start payload is a referrer id: map it like the referrer's own id.
+        masked = [str(self.pseudonym(int(arg))) if arg.isdigit() else "x" * len(arg) for arg in args]
+        return " ".join([command, *masked])
+
+
+class UpdateRecorder:
+    """Buffers raw updates and appends them, anonymized, to a rotating gzip JSONL file."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        logger: BoundLogger,
+        *,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 5,
+        max_queue_size: int = 10_000,
+        flush_interval_seconds: float = 1.0,
+        anonymizer: UpdateAnonymizer | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.logger = logger
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval_seconds = flush_interval_seconds
+        self.anonymizer = anonymizer or UpdateAnonymizer()
+        self._queue: asyncio.Queue[tuple[float, bytes]] = asyncio.Queue(maxsize=max_queue_size)
+        self._task: asyncio.Task[None] | None = None
+
+    def record(self, body: bytes, arrived_at: float | None = None) -> None:
+        try:
+            self._queue.put_nowait((time.time() if arrived_at is None else arrived_at, body))
+        except asyncio.QueueFull:
+            UPDATES_CAPTURE_DROPPED.inc()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="update_recorder")
+            self.logger.warning("update_capture_enabled", path=str(self.path))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush()
+
+    async def flush(self) -> None:
+        batch = [self._queue.get_nowait() for _ in range(self._queue.qsize())]
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as exc:
+            self.logger.warning("update_capture_write_failed", updates=len(batch), error=str(exc))
+            return
+        UPDATES_CAPTURED.inc(len(batch))
+
+    def _write(self, batch: list[tuple[float, bytes]]) -> None:
+        lines = []
+        for arrived_at, body in batch:
+            try:
+                update = json.loads(body)
+            except ValueError:
+                continue
+            record = {"t": round(arrived_at, 6), "u": self.anonymizer.anonymize(update)}
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+        if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+            self._rotate()
+        # Each batch is its own gzip member; gzip readers treat the concatenation as one stream.
+        with gzip.open(self.path, "at", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    def _rotate(self) -> None:
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+def update_capture_middleware(recorder: UpdateRecorder, *, path: str = "/webhook") -> Callable[..., Any]:
+    """aiohttp middleware handing authenticated webhook bodies to ``recorder`` with their arrival time."""
+
+    @web.middleware
+    async def middleware(
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        if request.path != path or request.method != "POST":
+            return await handler(request)
+
+        arrived_at = time.time()
+        response = await handler(request)
+        if response.status != 401:
+            # aiohttp cached the body when the webhook handler read it.
+            recorder.record(await request.read(), arrived_at)
+        return response
+
+    return middleware
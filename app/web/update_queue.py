@@ -0,0 +1,311 @@
+"""Bounded, per-user ordered processing of webhook updates."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from contextlib import suppress
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from structlog.stdlib import BoundLogger
+
+from app.bot.rate_limiter import OutboundRateLimiter
+
+UpdateProcessor = Callable[[dict[str, Any]], Awaitable[None]]
+
+# Update fields whose payload carries the acting user in ``from``.
+_USER_UPDATE_FIELDS = (
+    "message",
+    "edited_message",
+    "callback_query",
+    "inline_query",
+    "chosen_inline_result",
+    "shipping_query",
+    "pre_checkout_query",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+    "poll_answer",
+    "message_reaction",
+)
+
+
+class UpdateQueueFull(Exception):
+    """Raised when an update could not be queued before the backpressure timeout."""
+
+
+def extract_update_partition_key(update: dict[str, Any]) -> int:
+    """Return the id that orders an update: the acting user, else the chat, else the update."""
+
+    for field_name in _USER_UPDATE_FIELDS:
+        payload = update.get(field_name)
+        if not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if isinstance(user, dict) and isinstance(user.get("id"), int):
+            return user["id"]
+        chat = payload.get("chat")
+        if isinstance(chat, dict) and isinstance(chat.get("id"), int):
+            return chat["id"]
+    return int(update.get("update_id", 0))
+
+
+class UpdateQueue:
+    """Fixed pool of partition workers fed through bounded queues.
+
+    Each update is routed to a partition by its user id, so updates from one
+    user are processed strictly in arrival order while different users run in
+    parallel. ``submit`` waits up to ``put_timeout_seconds`` for room in a full
+    partition and then raises ``UpdateQueueFull`` so the webhook can answer
+    with an error and Telegram redelivers the update later.
+
+    A partition is shared by every user with the same ``user_id % workers``
+    and runs one update at a time, so a slow handler delays all of them (see
+    ``wait_seconds_max``). Long jobs must not run in a handler (admin commands
+    detach them, see ``app.bot.admin_jobs``), and a handler still running after
+    ``handler_timeout_seconds`` is cancelled and counted as ``timed_out``.
+    """
+
+    def __init__(
+        self,
+        process: UpdateProcessor,
+        logger: BoundLogger,
+        *,
+        workers: int = 16,
+        max_size: int = 1000,
+        put_timeout_seconds: float = 5.0,
+        handler_timeout_seconds: float = 60.0,
+        slow_wait_seconds: float = 5.0,
+    ) -> None:
+        self.process = process
+        self.logger = logger
+        self.workers = workers
+        self.put_timeout_seconds = put_timeout_seconds
+        self.handler_timeout_seconds = handler_timeout_seconds
+        self.slow_wait_seconds = slow_wait_seconds
+
+        partition_size = max(1, math.ceil(max_size / workers))
+        self._queues: list[asyncio.Queue[tuple[dict[str, Any], float]]] = [
+            asyncio.Queue(maxsize=partition_size) for _ in range(workers)
+        ]
+        self._tasks: list[asyncio.Task[None]] = []
+        self._accepting = False
+
+        self.processed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.wait_seconds_avg = 0.0
+        self.wait_seconds_max = 0.0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._accepting = True
+        self._tasks = [
+            asyncio.create_task(self._run_partition(queue), name=f"update_queue_worker_{index}")
+            for index, queue in enumerate(self._queues)
+        ]
+        self.logger.info("update_queue_started", workers=self.workers)
+
+    async def stop(self, timeout_seconds: float = 10.0) -> None:
+        """Stop accepting updates, drain what is queued and stop the workers."""
+
+        self._accepting = False
+        if not self._tasks:
+            return
+
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout_seconds)
+        except asyncio.TimeoutError:
+            self.logger.warning("update_queue_drain_timeout", depth=self.depth)
+
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        self.logger.info("update_queue_stopped", processed=self.processed, rejected=self.rejected)
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "capacity": sum(queue.maxsize for queue in self._queues),
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "wait_seconds_avg": round(self.wait_seconds_avg, 4),
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+        }
+
+    async def submit(self, update: dict[str, Any]) -> None:
+        if not self._accepting:
+            self.rejected += 1
+            raise UpdateQueueFull("update queue is not accepting updates")
+
+        queue = self._queues[extract_update_partition_key(update) % self.workers]
+        item = (update, time.monotonic())
+        try:
+            queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        try:
+            await asyncio.wait_for(queue.put(item), self.put_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            self.logger.warning("update_queue_full", update_id=update.get("update_id"), depth=self.depth)
+            raise UpdateQueueFull("update queue partition is full") from None
+
+    async def _run_partition(self, queue: asyncio.Queue[tuple[dict[str, Any], float]]) -> None:
+        while True:
+            update, enqueued_at = await queue.get()
+            try:
+                self._record_wait(time.monotonic() - enqueued_at, update)
+                if self.handler_timeout_seconds > 0:
+                    await asyncio.wait_for(self.process(update), self.handler_timeout_seconds)
+                else:
+                    await self.process(update)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                self.logger.error(
+                    "update_handler_timeout",
+                    update_id=update.get("update_id"),
+                    timeout_seconds=self.handler_timeout_seconds,
+                )
+            except Exception:
+                self.failed += 1
+                self.logger.exception("update_processing_failed", update_id=update.get("update_id"))
+            finally:
+                queue.task_done()
+
+    def _record_wait(self, wait_seconds: float, update: dict[str, Any]) -> None:
+        self.wait_seconds_avg += (wait_seconds - self.wait_seconds_avg) * 0.05
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        if wait_seconds >= self.slow_wait_seconds:
+            self.logger.warning(
+                "update_queue_wait_slow",
+                update_id=update.get("update_id"),
+                wait_seconds=round(wait_seconds, 3),
+                depth=self.depth,
+            )
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Webhook handler that feeds an ``UpdateQueue`` and answers Telegram quickly.
+
+    The webhook waits up to ``reply_timeout_seconds`` for the update to be
+    processed. If the handler finished by then and returned a method (its
+    single final reply), that method is written into the webhook response, so
+    no separate Bot API request is made. Otherwise Telegram gets an empty
+    acknowledgement and the worker executes the returned method itself.
+    A reply in the response skips the session middlewares, so it is debited
+    from ``rate_limiter`` first; without a free token it is sent through the
+    session, which waits for one.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        logger: BoundLogger,
+        *,
+        secret_token: str | None = None,
+        workers: int = 16,
+        max_size: int = 1000,
+        put_timeout_seconds: float = 5.0,
+        handler_timeout_seconds: float = 60.0,
+        reply_timeout_seconds: float = 0.3,
+        drain_timeout_seconds: float = 10.0,
+        rate_limiter: OutboundRateLimiter | None = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.reply_timeout_seconds = reply_timeout_seconds
+        self.drain_timeout_seconds = drain_timeout_seconds
+        self.rate_limiter = rate_limiter
+        self.queue = UpdateQueue(
+            self._process_update,
+            logger,
+            workers=workers,
+            max_size=max_size,
+            put_timeout_seconds=put_timeout_seconds,
+            handler_timeout_seconds=handler_timeout_seconds,
+        )
+        self._reply_waiters: dict[int, asyncio.Future[TelegramMethod[Any] | None]] = {}
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        super().register(app, path, **kwargs)
+        app.on_startup.append(self._handle_start)
+
+    async def _handle_start(self, _: web.Application) -> None:
+        self.queue.start()
+
+    async def close(self) -> None:
+        await self.queue.stop(self.drain_timeout_seconds)
+        await super().close()
+
+    async def _process_update(self, update: dict[str, Any]) -> None:
+        result: TelegramMethod[Any] | None = None
+        try:
+            feed_result = await self.dispatcher.feed_raw_update(bot=self.bot, update=update, **self.data)
+            if isinstance(feed_result, TelegramMethod):
+                result = feed_result
+        finally:
+            waiter = self._reply_waiters.pop(update.get("update_id", -1), None)
+            if waiter is not None and not waiter.done():
+                if result is not None and self.rate_limiter is not None and not self.rate_limiter.try_acquire(result):
+                    # Over the limit: acknowledge empty and let the session wait for a token.
+                    waiter.set_result(None)
+                else:
+                    # The webhook request is still open: the reply goes out in its response.
+                    waiter.set_result(result)
+                    result = None
+
+        if result is not None:
+            await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        update_id = update.get("update_id", -1)
+
+        waiter: asyncio.Future[TelegramMethod[Any] | None] | None = None
+        if self.reply_timeout_seconds > 0:
+            waiter = asyncio.get_running_loop().create_future()
+            self._reply_waiters[update_id] = waiter
+
+        try:
+            await self.queue.submit(update)
+        except UpdateQueueFull:
+            self._reply_waiters.pop(update_id, None)
+            # Telegram retries non-2xx deliveries, which throttles it down to our pace.
+            return web.json_response({"status": "busy"}, status=503, dumps=bot.session.json_dumps)
+
+        if waiter is None:
+            return web.json_response({}, dumps=bot.session.json_dumps)
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(waiter), self.reply_timeout_seconds)
+        if not waiter.done():
+            # Too slow: acknowledge now, the worker will send the reply itself.
+            self._reply_waiters.pop(update_id, None)
+            waiter.cancel()
+            return web.json_response({}, dumps=bot.session.json_dumps)
+
+        return web.Response(body=self._build_response_writer(bot=bot, result=waiter.result()))
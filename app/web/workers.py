@@ -0,0 +1,170 @@
+"""Multi-process webhook workers sharing one listening port."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from typing import Callable
+
+from aiohttp import web
+from structlog.stdlib import BoundLogger
+
+from app.config import Settings
+from app.logging_setup import flush_logging
+
+AppFactory = Callable[..., web.Application]
+
+PRIMARY_WORKER_INDEX = 0
+
+
+def compute_restart_delay(recent_crashes: int, base_delay_seconds: float = 0.5, max_delay_seconds: float = 30.0) -> float:
+    """Back off restarts of a worker that keeps crashing right after start."""
+
+    if recent_crashes <= 0:
+        return 0.0
+    return min(max_delay_seconds, base_delay_seconds * (2 ** (recent_crashes - 1)))
+
+
+def run_worker(app_factory: AppFactory, settings: Settings, worker_index: int) -> None:
+    """Worker process entrypoint: one aiohttp app bound with SO_REUSEPORT."""
+
+    # Drop the supervisor's handlers inherited through fork; run_app installs its own.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    app = app_factory(settings, worker_index=worker_index)
+    try:
+        web.run_app(
+            app,
+            host=settings.app_host,
+            port=settings.app_port,
+            reuse_port=True,
+            shutdown_timeout=settings.worker_shutdown_timeout_seconds,
+            print=None,
+        )
+    finally:
+        # multiprocessing exits children without running atexit hooks.
+        flush_logging()
+
+
+@dataclass(slots=True)
+class _WorkerSlot:
+    index: int
+    process: BaseProcess | None = None
+    started_at: float = 0.0
+    recent_crashes: int = 0
+    restart_at: float = 0.0
+
+
+class WorkerSupervisor:
+    """Forks ``WEB_WORKERS`` app processes and keeps them running.
+
+    The kernel balances connections between workers through SO_REUSEPORT.
+    Worker 0 is the primary and alone performs singleton duties (webhook
+    registration, outbox delivery, periodic jobs). Crashed workers are
+    restarted with backoff; SIGTERM/SIGINT are forwarded so every worker
+    drains in-flight requests before exiting, and stragglers are killed after
+    ``WORKER_SHUTDOWN_TIMEOUT_SECONDS``.
+
+    The supervisor forks for every (re)start, so it must stay single-threaded:
+    configure its logging with ``background=False``.
+    """
+
+    def __init__(self, app_factory: AppFactory, settings: Settings, logger: BoundLogger) -> None:
+        self.app_factory = app_factory
+        self.settings = settings
+        self.logger = logger
+        self._context = multiprocessing.get_context("fork")
+        self._slots = [_WorkerSlot(index=index) for index in range(settings.web_workers)]
+        self._stopping = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        if threading.active_count() > 1:
+            # A lock held by another thread at fork time stays held forever in the worker.
+            self.logger.warning(
+                "worker_supervisor_threads_before_fork",
+                threads=[thread.name for thread in threading.enumerate()],
+            )
+
+        for slot in self._slots:
+            self._spawn(slot)
+
+        while not self._stopping:
+            sentinels = [slot.process.sentinel for slot in self._slots if slot.process is not None]
+            wait(sentinels, timeout=1.0)
+            if not self._stopping:
+                self._reap_and_restart()
+
+        self._drain()
+
+    def _request_stop(self, signum: int, _frame: object) -> None:
+        if not self._stopping:
+            self.logger.info("worker_supervisor_stopping", signal=signal.Signals(signum).name)
+        self._stopping = True
+
+    def _spawn(self, slot: _WorkerSlot) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(self.app_factory, self.settings, slot.index),
+            name=f"webhook-worker-{slot.index}",
+            daemon=False,
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        self.logger.info(
+            "worker_started",
+            worker=slot.index,
+            pid=process.pid,
+            primary=slot.index == PRIMARY_WORKER_INDEX,
+        )
+
+    def _reap_and_restart(self) -> None:
+        now = time.monotonic()
+        for slot in self._slots:
+            process = slot.process
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                uptime = now - slot.started_at
+                slot.recent_crashes = slot.recent_crashes + 1 if uptime < 60 else 1
+                slot.restart_at = now + compute_restart_delay(slot.recent_crashes)
+                process.join(timeout=0)
+                slot.process = None
+                self.logger.error(
+                    "worker_exited",
+                    worker=slot.index,
+                    pid=process.pid,
+                    exitcode=process.exitcode,
+                    uptime_seconds=round(uptime, 1),
+                    restart_in_seconds=round(slot.restart_at - now, 1),
+                )
+
+            if now >= slot.restart_at:
+                self._spawn(slot)
+
+    def _drain(self) -> None:
+        processes = [slot.process for slot in self._slots if slot.process is not None and slot.process.is_alive()]
+        for process in processes:
+            if process.pid is not None:
+                os.kill(process.pid, signal.SIGTERM)
+
+        # run_app waits shutdown_timeout for in-flight requests, then runs cleanup hooks.
+        deadline = time.monotonic() + self.settings.worker_shutdown_timeout_seconds + 10
+        for process in processes:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                self.logger.warning("worker_killed_after_drain_timeout", pid=process.pid)
+                process.kill()
+                process.join()
+
+        self.logger.info("worker_supervisor_stopped")
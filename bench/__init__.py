@@ -0,0 +1 @@
+"""Benchmarks run against a scratch Postgres database (see bench/README.md)."""
@@ -0,0 +1,184 @@
+"""Run the bot as a separate process against a fake Bot API and drive its webhook.
+
+Shared by the end-to-end benchmarks: ``bot_process`` starts ``python -m app.main``
+on a free local port, and ``WebhookClient`` posts updates and measures how long
+the bot takes to reply to the user, whether the reply comes back in the webhook
+response or as a separate Bot API call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import sys
+import time
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+import aiohttp
+
+from bench.common import FlowResult
+from bench.fake_bot_api import REPLY_METHODS, FakeBotApi
+
+BENCH_BOT_TOKEN = "100000:bench-token"
+BENCH_CHANNEL_ID = -1001000000000
+BENCH_WEBHOOK_SECRET = "bench-secret"
+
+
+@dataclass(slots=True)
+class BotProcess:
+    base_url: str
+    process: asyncio.subprocess.Process
+    # time.perf_counter() when the process was spawned and when /readyz first answered 200
+    spawned_at: float
+    ready_at: float
+
+    @property
+    def webhook_url(self) -> str:
+        return f"{self.base_url}/webhook"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def bot_process(
+    database_url: str,
+    telegram_api_url: str,
+    *,
+    env: dict[str, str] | None = None,
+    log_path: str = os.devnull,
+    startup_timeout_seconds: float = 60.0,
+) -> AsyncIterator[BotProcess]:
+    """Start the bot with its production entrypoint and wait until ``/readyz`` answers 200.
+
+    ``env`` overrides any setting, e.g. ``{"UPDATE_REPLY_TIMEOUT_SECONDS": "0"}``.
+    """
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process_env = {
+        **os.environ,
+        "BOT_TOKEN": BENCH_BOT_TOKEN,
+        "CHANNEL_ID": str(BENCH_CHANNEL_ID),
+        "ADMIN_IDS": "1",
+        "DATABASE_URL": database_url,
+        "WEBHOOK_URL": f"{base_url}/webhook",
+        "WEBHOOK_SECRET": BENCH_WEBHOOK_SECRET,
+        "SKIP_WEBHOOK_SETUP": "false",
+        "APP_HOST": "127.0.0.1",
+        "APP_PORT": str(port),
+        "TELEGRAM_API_URL": telegram_api_url,
+        "GOOGLE_SHEETS_ENABLED": "false",
+        **(env or {}),
+    }
+    process_env.pop("DATABASE_READ_URL", None)
+
+    spawned_at = time.perf_counter()
+    with open(log_path, "ab") as log_file:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "app.main",
+            env=process_env,
+            stdout=log_file,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+    try:
+        await _wait_until_ready(process, base_url, startup_timeout_seconds, log_path)
+        yield BotProcess(base_url=base_url, process=process, spawned_at=spawned_at, ready_at=time.perf_counter())
+    finally:
+        if process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+
+async def _wait_until_ready(
+    process: asyncio.subprocess.Process,
+    base_url: str,
+    timeout_seconds: float,
+    log_path: str,
+) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process.returncode is not None:
+                raise SystemExit(f"The bot exited with code {process.returncode} during startup; see {log_path}.")
+            with suppress(aiohttp.ClientError):
+                async with session.get(f"{base_url}/readyz") as response:
+                    if response.status == 200:
+                        return
+            await asyncio.sleep(0.05)
+    raise SystemExit(f"The bot was not ready after {timeout_seconds:.0f}s; see {log_path}.")
+
+
+class WebhookClient:
+    """Posts updates like Telegram does and times them until the bot replies to the user."""
+
+    def __init__(
+        self,
+        bot: BotProcess,
+        fake_api: FakeBotApi,
+        *,
+        reply_timeout_seconds: float = 30.0,
+        connections: int = 100,
+    ) -> None:
+        self.bot = bot
+        self.fake_api = fake_api
+        self.reply_timeout_seconds = reply_timeout_seconds
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=connections),
+            headers={"X-Telegram-Bot-Api-Secret-Token": BENCH_WEBHOOK_SECRET},
+        )
+
+    async def close(self) -> None:
+        await self._session.close()
+
+    async def send(self, update: dict[str, Any], *, reply_chat_id: int | None = None) -> FlowResult:
+        """Post ``update``; with ``reply_chat_id``, also wait for the bot's reply to that chat."""
+
+        reply = self.fake_api.expect_reply(reply_chat_id) if reply_chat_id is not None else None
+        started = time.perf_counter()
+        try:
+            async with self._session.post(self.bot.webhook_url, json=update) as response:
+                if response.status != 200:
+                    return FlowResult(time.perf_counter() - started, error=f"http_{response.status}")
+                if reply_chat_id is not None:
+                    method, chat_id = await _method_in_response(response)
+                    if method in REPLY_METHODS and chat_id == reply_chat_id:
+                        self.fake_api.resolve_reply(reply_chat_id)
+            if reply is None:
+                return FlowResult(time.perf_counter() - started)
+            replied_at = await asyncio.wait_for(reply, timeout=self.reply_timeout_seconds)
+            return FlowResult(replied_at - started)
+        except asyncio.TimeoutError:
+            return FlowResult(time.perf_counter() - started, error="timeout")
+        except aiohttp.ClientError as exc:
+            return FlowResult(time.perf_counter() - started, error=type(exc).__name__)
+        finally:
+            if reply_chat_id is not None:
+                self.fake_api.discard_reply(reply_chat_id)
+
+
+async def _method_in_response(response: aiohttp.ClientResponse) -> tuple[str | None, int | None]:
+    """The Bot API call the bot returned in the webhook response body, if any."""
+
+    if not response.content_type.startswith("multipart/"):
+        return None, None
+
+    fields: dict[str, str] = {}
+    reader = aiohttp.MultipartReader.from_response(response)
+    while (part := await reader.next()) is not None:
+        if isinstance(part, aiohttp.BodyPartReader) and part.name in ("method", "chat_id"):
+            fields[part.name] = await part.text()
+    chat_id = fields.get("chat_id")
+    return fields.get("method"), int(chat_id) if chat_id else None
@@ -0,0 +1,183 @@
+"""Shared helpers for benchmarks."""
+
+from __future__ import annotations
+
+import os
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Sequence
+
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.db.base import Base
+
+
+def bench_database_url(cli_value: str | None) -> str:
+    url = cli_value or os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        raise SystemExit("Pass --database-url or set BENCH_DATABASE_URL (a scratch Postgres database).")
+    return url
+
+
+@asynccontextmanager
+async def scratch_schema(
+    database_url: str,
+    *,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+) -> AsyncIterator[tuple[AsyncEngine, async_sessionmaker[AsyncSession]]]:
+    """Create every table in a throwaway schema, yield an engine bound to it, then drop it."""
+
+    schema = f"bench_{uuid.uuid4().hex[:12]}"
+    admin_engine = create_async_engine(database_url)
+    async with admin_engine.begin() as connection:
+        await connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+
+    engine = create_async_engine(
+        database_url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        connect_args={"server_settings": {"search_path": schema}},
+    )
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        yield engine, async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    finally:
+        await engine.dispose()
+        async with admin_engine.begin() as connection:
+            await connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        await admin_engine.dispose()
+
+
+@asynccontextmanager
+async def scratch_database(database_url: str) -> AsyncIterator[str]:
+    """Create a throwaway database with every table, yield its URL, then drop it.
+
+    For benchmarks that start the bot as a separate process: it builds its own
+    engine from ``DATABASE_URL``, so a ``search_path`` schema is not enough.
+    """
+
+    url = make_url(database_url)
+    name = f"bench_{uuid.uuid4().hex[:12]}"
+    admin_engine = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    async with admin_engine.connect() as connection:
+        await connection.execute(text(f'CREATE DATABASE "{name}"'))
+
+    scratch_url = url.set(database=name)
+    try:
+        engine = create_async_engine(scratch_url)
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+        yield scratch_url.render_as_string(hide_password=False)
+    finally:
+        async with admin_engine.connect() as connection:
+            await connection.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+        await admin_engine.dispose()
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def format_latency_summary(samples: list[float]) -> str:
+    if not samples:
+        return "no samples"
+    return (
+        f"p50={percentile(samples, 0.5) * 1000:.1f}ms "
+        f"p95={percentile(samples, 0.95) * 1000:.1f}ms "
+        f"p99={percentile(samples, 0.99) * 1000:.1f}ms "
+        f"mean={statistics.fmean(samples) * 1000:.1f}ms"
+    )
+
+
+@dataclass(slots=True)
+class FlowResult:
+    latency_seconds: float
+    error: str | None = None
+
+
+class FlowReport:
+    """Latencies and errors per flow, with throughput over the whole run."""
+
+    def __init__(self, flows: Sequence[str] = ()) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._flows = tuple(flows)
+        self.started = time.perf_counter()
+        self.finished = self.started
+
+    @property
+    def flows(self) -> tuple[str, ...]:
+        return self._flows or tuple(sorted({*self.latencies, *self.errors}))
+
+    def record(self, flow: str, result: FlowResult) -> None:
+        if result.error is None:
+            self.latencies[flow].append(result.latency_seconds)
+        else:
+            self.errors[flow][result.error] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        elapsed = max(self.finished - self.started, 1e-9)
+        flows: dict[str, Any] = {}
+        for flow in self.flows:
+            samples = self.latencies.get(flow, [])
+            flows[flow] = {
+                "completed": len(samples),
+                "errors": dict(self.errors.get(flow, {})),
+                "throughput_per_second": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 0.5) * 1000, 1),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+            }
+        completed = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "updates_per_second": round(completed / elapsed, 2),
+            "flows": flows,
+        }
+
+    def print(self) -> None:
+        report = self.as_dict()
+        print(f"elapsed={report['elapsed_seconds']}s updates/s={report['updates_per_second']}")
+        for flow in self.flows:
+            stats = report["flows"][flow]
+            print(
+                f"{flow:>40}: {stats['completed']:6d} ok {sum(stats['errors'].values()):5d} failed "
+                f"{stats['throughput_per_second']:8.1f}/s  {format_latency_summary(self.latencies.get(flow, []))}"
+            )
+            if stats["errors"]:
+                print(f"{'':>42}errors: {stats['errors']}")
+
+
+def _change(old: float, new: float) -> str:
+    if old == 0:
+        return "n/a" if new == 0 else "+inf"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def print_flow_comparison(baseline: dict[str, Any], current: dict[str, Any]) -> None:
+    """Latency and error deltas per flow between two ``FlowReport.as_dict()`` results."""
+
+    print(f"\nAgainst {baseline.get('label') or 'baseline'}:")
+    for flow in sorted({*baseline["flows"], *current["flows"]}):
+        old = baseline["flows"].get(flow, {})
+        new = current["flows"].get(flow, {})
+        parts = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            before, after = old.get(key, 0), new.get(key, 0)
+            parts.append(f"{key[:3]} {before:.1f}->{after:.1f}ms ({_change(before, after)})")
+        old_errors = sum(old.get("errors", {}).values())
+        new_errors = sum(new.get("errors", {}).values())
+        parts.append(f"errors {old_errors}->{new_errors} ({new_errors - old_errors:+d})")
+        print(f"{flow:>48}: " + "  ".join(parts))
@@ -0,0 +1,170 @@
+"""Local stand-in for the Telegram Bot API.
+
+Answers every method the bot uses with a plausible result after a configurable
+latency, injects ``429 Too Many Requests`` at a configurable ratio and lets a
+load generator wait for the bot's reply to a given chat. Point the bot at it
+with ``TELEGRAM_API_URL``.
+
+    python -m bench.fake_bot_api --port 8081 --latency-ms 40 --rate-limit-ratio 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from typing import Any
+
+from aiohttp import web
+
+BOT_USER = {"id": 100000, "is_bot": True, "first_name": "Bench", "username": "bench_giveaway_bot"}
+
+# Methods that end a user-visible flow: the bot's reply to the user's chat.
+REPLY_METHODS = frozenset({"sendMessage", "sendPhoto"})
+# Never rate limited, so startup is deterministic.
+STARTUP_METHODS = frozenset({"getMe", "getChat", "setWebhook", "deleteWebhook"})
+
+
+class FakeBotApi:
+    def __init__(
+        self,
+        *,
+        latency_seconds: float = 0.03,
+        latency_jitter_seconds: float = 0.02,
+        rate_limit_ratio: float = 0.0,
+        retry_after_seconds: int = 1,
+        chat_member_status: str = "member",
+        seed: int | None = None,
+    ) -> None:
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after_seconds = retry_after_seconds
+        self.chat_member_status = chat_member_status
+        self.calls: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self._reply_waiters: dict[int, asyncio.Future[float]] = {}
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(client_max_size=50 * 1024 * 1024)
+        self.app.router.add_post("/bot{token}/{method}", self._handle)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on ``host:port`` (0 picks a free port) and return the base URL for ``TELEGRAM_API_URL``."""
+
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        return f"http://{host}:{bound_port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def expect_reply(self, chat_id: int) -> asyncio.Future[float]:
+        """A future resolved with the ``perf_counter`` time of the bot's next reply to ``chat_id``."""
+
+        future: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+        self._reply_waiters[chat_id] = future
+        return future
+
+    def resolve_reply(self, chat_id: int, at: float | None = None) -> None:
+        future = self._reply_waiters.pop(chat_id, None)
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter() if at is None else at)
+
+    def discard_reply(self, chat_id: int) -> None:
+        self._reply_waiters.pop(chat_id, None)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        delay = self.latency_seconds + self._random.uniform(0, self.latency_jitter_seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if method not in STARTUP_METHODS and self._random.random() < self.rate_limit_ratio:
+            self.rate_limited[method] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after_seconds}",
+                    "parameters": {"retry_after": self.retry_after_seconds},
+                },
+                status=429,
+            )
+
+        result = self._result(method, params)
+        if method in REPLY_METHODS and "chat_id" in params:
+            self.resolve_reply(int(str(params["chat_id"])))
+        return web.json_response({"ok": True, "result": result})
+
+    def _result(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method == "getChat":
+            return {"id": int(str(params.get("chat_id", 0))), "type": "channel", "title": "Bench channel"}
+        if method == "getChatMember":
+            user_id = int(str(params.get("user_id", 0)))
+            return {
+                "status": self.chat_member_status,
+                "user": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+            }
+        if method.startswith(("send", "edit")):
+            chat_id = int(str(params.get("chat_id", 0)))
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private", "first_name": f"User {chat_id}"},
+                "from": BOT_USER,
+                "text": str(params.get("text", params.get("caption", ""))),
+            }
+        # setWebhook, deleteWebhook, answerCallbackQuery, deleteMessage, ...
+        return True
+
+    def summary(self) -> dict[str, Any]:
+        return {"calls": dict(self.calls), "rate_limited": dict(self.rate_limited)}
+
+
+async def serve(args: argparse.Namespace) -> None:
+    api = FakeBotApi(
+        latency_seconds=args.latency_ms / 1000,
+        latency_jitter_seconds=args.jitter_ms / 1000,
+        rate_limit_ratio=args.rate_limit_ratio,
+    )
+    url = await api.start(args.host, args.port)
+    print(f"Fake Bot API listening on {url} (set TELEGRAM_API_URL={url})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+        print(api.summary())
+
+
+def add_fake_api_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Base Bot API latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Uniform extra latency")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of calls answered with 429")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_fake_api_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(parse_args()))
@@ -0,0 +1,158 @@
+"""Concurrent referral confirmations against a single hot referrer.
+
+Compares the previous ``SELECT ... FOR UPDATE`` + ORM increment path with the
+atomic ``UPDATE ... RETURNING`` path now used by
+``confirm_subscription_and_referral``, and checks both end with the exact
+counter and participation state.
+
+    python -m bench.hot_referrer --confirmations 2000 --concurrency 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+import structlog
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from structlog.stdlib import BoundLogger
+
+from app.db.enums import OutboxEventKind, ReferralStatus
+from app.db.models import OutboxEvent, Referral, User
+from app.repositories.outbox import OutboxRepository
+from app.repositories.referrals import ReferralsRepository
+from app.repositories.users import UsersRepository
+from app.services.participation_service import mark_participant_if_eligible
+from app.services.subscription_service import (
+    build_referrer_notification_text,
+    confirm_subscription_and_referral,
+)
+from bench.common import bench_database_url, format_latency_summary, scratch_schema
+
+REFERRER_ID = 1
+ConfirmFn = Callable[[async_sessionmaker[AsyncSession], int, BoundLogger], Awaitable[object]]
+
+
+async def legacy_confirm(
+    session_factory: async_sessionmaker[AsyncSession],
+    tg_user_id: int,
+    logger: BoundLogger,
+) -> None:
+    """The confirmation path before the atomic increment, kept for comparison."""
+
+    async with session_factory() as session:
+        async with session.begin():
+            user = await UsersRepository.get_by_tg_user_id(session, tg_user_id, for_update=True)
+            user.is_subscribed = True
+            mark_participant_if_eligible(user)
+
+            referrer_id = await ReferralsRepository.confirm_pending_referral(session, tg_user_id)
+            if referrer_id is None:
+                return
+
+            referrer = await UsersRepository.get_by_tg_user_id(session, referrer_id, for_update=True)
+            referrer.referrals_confirmed += 1
+            mark_participant_if_eligible(referrer)
+            await OutboxRepository.enqueue(
+                session,
+                OutboxEventKind.REFERRER_NOTIFICATION,
+                {"chat_id": referrer_id, "text": build_referrer_notification_text(referrer.is_participant)},
+            )
+            if referrer.contact_name and referrer.contact_phone:
+                await OutboxRepository.enqueue(session, OutboxEventKind.SHEETS_SYNC, {"tg_user_id": referrer_id})
+
+
+async def seed(session_factory: async_sessionmaker[AsyncSession], confirmations: int) -> list[int]:
+    referral_ids = list(range(REFERRER_ID + 1, REFERRER_ID + 1 + confirmations))
+    async with session_factory() as session:
+        async with session.begin():
+            await session.execute(delete(OutboxEvent))
+            await session.execute(delete(Referral))
+            await session.execute(delete(User))
+            await session.execute(
+                insert(User),
+                [
+                    {
+                        "tg_user_id": REFERRER_ID,
+                        "is_subscribed": True,
+                        "contact_name": "Hot Referrer",
+                        "contact_phone": "+79990000000",
+                    }
+                ]
+                + [{"tg_user_id": tg_user_id} for tg_user_id in referral_ids],
+            )
+            await session.execute(
+                insert(Referral),
+                [
+                    {"referrer_id": REFERRER_ID, "referral_id": tg_user_id, "status": ReferralStatus.PENDING}
+                    for tg_user_id in referral_ids
+                ],
+            )
+    return referral_ids
+
+
+async def run_mode(
+    name: str,
+    confirm: ConfirmFn,
+    session_factory: async_sessionmaker[AsyncSession],
+    *,
+    confirmations: int,
+    concurrency: int,
+) -> None:
+    referral_ids = await seed(session_factory, confirmations)
+    logger = structlog.get_logger("bench")
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(tg_user_id: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await confirm(session_factory, tg_user_id, logger)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(tg_user_id) for tg_user_id in referral_ids))
+    elapsed = time.perf_counter() - started
+
+    async with session_factory() as session:
+        referrer = await session.scalar(select(User).where(User.tg_user_id == REFERRER_ID))
+    assert referrer.referrals_confirmed == confirmations, "lost increments"
+    assert referrer.is_participant, "participation transition missed"
+
+    print(
+        f"{name:>8}: {confirmations} confirmations in {elapsed:.2f}s "
+        f"= {confirmations / elapsed:.0f}/s; {format_latency_summary(latencies)}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(30))
+    async with scratch_schema(
+        bench_database_url(args.database_url),
+        pool_size=args.pool_size,
+        max_overflow=0,
+    ) as (_, session_factory):
+        for name, confirm in (("locking", legacy_confirm), ("atomic", confirm_subscription_and_referral)):
+            await run_mode(
+                name,
+                confirm,
+                session_factory,
+                confirmations=args.confirmations,
+                concurrency=args.concurrency,
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="scratch Postgres URL (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--confirmations", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,190 @@
+"""Replay a production update capture against a local instance and compare versions.
+
+Feeds the updates recorded with ``UPDATE_CAPTURE_FILE`` into the bot (started
+as in ``bench.webhook_load``: scratch database, fake Bot API) with their
+original spacing at ``--speed`` times real time, or as fast as
+``--concurrency`` allows with ``--speed 0``. The bot runs in queue mode with
+a long ``UPDATE_REPLY_TIMEOUT_SECONDS`` unless overridden, so a webhook
+round trip covers the whole handler. Reports latency and errors per update kind plus
+handler outcomes from the bot's ``/metrics``; ``--json`` saves the report and
+``--compare`` prints the deltas against a report saved from another version.
+
+    git checkout main && python -m bench.replay updates.jsonl.gz* --speed 10 --json main.json
+    git checkout my-branch && python -m bench.replay updates.jsonl.gz* --speed 10 --compare main.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import heapq
+import json
+import re
+import time
+from collections import Counter
+from typing import Any, Iterator
+
+import aiohttp
+
+from bench.bot_harness import BotProcess, WebhookClient, bot_process
+from bench.common import FlowReport, bench_database_url, print_flow_comparison, scratch_database
+from bench.fake_bot_api import FakeBotApi, add_fake_api_arguments
+
+_HANDLER_COUNT_RE = re.compile(r'^bot_handler_seconds_count\{(?P<labels>[^}]*)\} (?P<value>\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def read_capture(path: str) -> Iterator[tuple[float, dict[str, Any]]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["t"], record["u"]
+
+
+def load_captures(paths: list[str]) -> list[tuple[float, dict[str, Any]]]:
+    """Every capture file (rotated backups and per-worker files) merged by arrival time."""
+
+    ordered = (sorted(read_capture(path), key=lambda item: item[0]) for path in paths)
+    return list(heapq.merge(*ordered, key=lambda item: item[0]))
+
+
+def update_kind(update: dict[str, Any]) -> str:
+    """A coarse label such as ``message:/start``, ``callback:check_subscription`` or ``chat_member``."""
+
+    if "message" in update:
+        message = update["message"]
+        text = message.get("text") or ""
+        if text.startswith("/"):
+            return f"message:{text.split()[0].split('@')[0]}"
+        if "contact" in message:
+            return "message:contact"
+        return "message:text" if text else "message:other"
+    if "callback_query" in update:
+        return f"callback:{update['callback_query'].get('data', '')}"
+    kinds = [key for key in update if key != "update_id"]
+    return kinds[0] if kinds else "unknown"
+
+
+async def handler_outcomes(bot: BotProcess) -> Counter[str]:
+    """``handler/outcome`` -> handled count, from the bot's ``/metrics``."""
+
+    outcomes: Counter[str] = Counter()
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{bot.base_url}/metrics") as response:
+            text = await response.text()
+    for line in text.splitlines():
+        match = _HANDLER_COUNT_RE.match(line)
+        if match is None:
+            continue
+        labels = dict(_LABEL_RE.findall(match["labels"]))
+        outcomes[f"{labels.get('handler')}/{labels.get('outcome')}"] += int(float(match["value"]))
+    return outcomes
+
+
+async def replay(
+    bot: BotProcess,
+    fake_api: FakeBotApi,
+    updates: list[tuple[float, dict[str, Any]]],
+    *,
+    speed: float,
+    concurrency: int,
+) -> FlowReport:
+    client = WebhookClient(bot, fake_api, connections=concurrency)
+    report = FlowReport()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(update: dict[str, Any]) -> None:
+        async with slots:
+            report.record(update_kind(update), await client.send(update))
+
+    first_arrival = updates[0][0] if updates else 0.0
+    tasks: list[asyncio.Task[None]] = []
+    try:
+        for arrived_at, update in updates:
+            if speed > 0:
+                delay = report.started + (arrived_at - first_arrival) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(update)))
+        await asyncio.gather(*tasks)
+    finally:
+        report.finished = time.perf_counter()
+        await client.close()
+    return report
+
+
+def print_comparison(baseline: dict[str, Any], current: dict[str, Any]) -> None:
+    print_flow_comparison(baseline, current)
+    old_outcomes = Counter(baseline.get("handler_outcomes", {}))
+    new_outcomes = Counter(current.get("handler_outcomes", {}))
+    for key in sorted({*old_outcomes, *new_outcomes}):
+        if key.endswith("/error") or old_outcomes[key] != new_outcomes[key]:
+            print(f"{key:>50}: {old_outcomes[key]} -> {new_outcomes[key]}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    updates = load_captures(args.capture)
+    if not updates:
+        raise SystemExit("The capture is empty.")
+    span_seconds = updates[-1][0] - updates[0][0]
+    print(f"Replaying {len(updates)} updates spanning {span_seconds:.0f}s at speed {args.speed or 'max'}")
+
+    fake_api = FakeBotApi(
+        latency_seconds=args.latency_ms / 1000,
+        latency_jitter_seconds=args.jitter_ms / 1000,
+        rate_limit_ratio=args.rate_limit_ratio,
+        seed=args.seed,
+    )
+    api_url = await fake_api.start()
+    env = dict(item.split("=", 1) for item in args.env)
+    env.setdefault("UPDATE_PROCESSING_MODE", "queue")
+    env.setdefault("UPDATE_REPLY_TIMEOUT_SECONDS", "30")
+    env.setdefault("TELEGRAM_GLOBAL_RATE", str(args.telegram_global_rate))
+    try:
+        async with scratch_database(bench_database_url(args.database_url)) as database_url:
+            async with bot_process(database_url, api_url, env=env, log_path=args.app_log) as bot:
+                outcomes_before = await handler_outcomes(bot)
+                report = await replay(bot, fake_api, updates, speed=args.speed, concurrency=args.concurrency)
+                outcomes = await handler_outcomes(bot)
+                outcomes.subtract(outcomes_before)
+    finally:
+        await fake_api.stop()
+
+    report.print()
+    result = {
+        **report.as_dict(),
+        "label": args.label,
+        "speed": args.speed,
+        "updates": len(updates),
+        "handler_outcomes": {key: value for key, value in sorted(outcomes.items()) if value},
+        "bot_api": fake_api.summary(),
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print_comparison(json.load(file), result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", nargs="+", help="Capture files, including rotated and per-worker ones")
+    parser.add_argument("--database-url", help="scratch Postgres URL (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, 10 = ten times faster, 0 = max")
+    parser.add_argument("--concurrency", type=int, default=100, help="In-flight webhook requests at most")
+    parser.add_argument("--telegram-global-rate", type=float, default=10_000.0)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra bot setting")
+    parser.add_argument("--app-log", default="bench_replay.log", help="Where the bot's own logs go")
+    parser.add_argument("--label", help="Name of this run in comparisons, e.g. a git commit")
+    parser.add_argument("--json", help="Save the report, e.g. as the baseline for --compare")
+    parser.add_argument("--compare", help="A report saved with --json from another code version")
+    parser.add_argument("--seed", type=int, default=1)
+    add_fake_api_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,395 @@
+"""Latency of every repository call and service transaction against a seeded database.
+
+Seeds a throwaway schema with ``--users`` users (the first ones are the viral
+referrers, as in real giveaways) and their referrals, then times each
+``UsersRepository`` / ``ReferralsRepository`` method and the
+``process_start_command`` -> ``register_subscription_check_attempt`` ->
+``confirm_subscription_and_referral`` transactions at each ``--concurrency``
+level. Repository calls that write run in a rolled-back transaction, so the
+data set stays the same across cases; service transactions commit like in
+production. ``--json`` saves the results under ``--label`` (the git commit by
+default) and ``--compare`` prints the deltas against results saved from
+another commit.
+
+    python -m bench.repositories --users 1000000 --concurrency 1,10,50 --json main.json
+    python -m bench.repositories --users 1000000 --concurrency 1,10,50 --compare main.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
+
+import structlog
+from aiogram.types import User as TelegramUser
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.constants import REFERRALS_REQUIRED_FOR_PARTICIPATION
+from app.repositories.referrals import ReferralsRepository
+from app.repositories.users import UsersRepository
+from app.services.participation_service import participant_after_referral_expression
+from app.services.referral_service import process_start_command
+from app.services.subscription_service import confirm_subscription_and_referral, register_subscription_check_attempt
+from bench.common import (
+    FlowReport,
+    FlowResult,
+    bench_database_url,
+    format_latency_summary,
+    print_flow_comparison,
+    scratch_schema,
+)
+
+Operation = Callable[[int], Awaitable[object]]
+SessionCall = Callable[[AsyncSession], Awaitable[object]]
+
+# Multiplicative hash spreading referred users evenly; mirrored in the seed SQL.
+_REFERRAL_HASH = 7919
+
+SEED_USERS_SQL = """
+INSERT INTO users (tg_user_id, username, first_name, is_subscribed, contact_name, contact_phone)
+SELECT
+    g,
+    'user' || g,
+    'User ' || g,
+    g % 10 < 7,
+    CASE WHEN g % 10 < 4 THEN 'User ' || g END,
+    CASE WHEN g % 10 < 4 THEN '+7900' || lpad((g % 10000000)::text, 7, '0') END
+FROM generate_series(1, CAST(:users AS bigint)) AS g
+"""
+
+# Referrers are drawn with a cubic skew towards the earliest users, so a few hold
+# most of the referrals; confirmed when the referred user is subscribed.
+SEED_REFERRALS_SQL = """
+INSERT INTO referrals (referrer_id, referral_id, status, confirmed_at)
+SELECT
+    1 + floor(power(random(), 3) * (g - 1))::bigint,
+    g,
+    (CASE WHEN g % 10 < 7 THEN 'confirmed' ELSE 'pending' END)::referral_status,
+    CASE WHEN g % 10 < 7 THEN now() END
+FROM generate_series(2, CAST(:users AS bigint)) AS g
+WHERE (g * :referral_hash) % 100 < :referral_percent
+"""
+
+SEED_DENORMALIZED_SQL = (
+    "UPDATE users SET referred_by = referrals.referrer_id "
+    "FROM referrals WHERE referrals.referral_id = users.tg_user_id",
+    "UPDATE users SET referrals_confirmed = counts.confirmed "
+    "FROM (SELECT referrer_id, count(*) AS confirmed FROM referrals WHERE status = 'confirmed' "
+    "GROUP BY referrer_id) AS counts WHERE counts.referrer_id = users.tg_user_id",
+    "UPDATE users SET is_participant = true WHERE is_subscribed AND referrals_confirmed >= :required",
+)
+
+
+@dataclass(slots=True)
+class Population:
+    """Picks user ids from the seeded data set."""
+
+    users: int
+    referral_percent: int
+    rng: random.Random
+    _new_ids: Iterator[int] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._new_ids = itertools.count(self.users + 1)
+
+    def is_referred(self, tg_user_id: int) -> bool:
+        return tg_user_id > 1 and (tg_user_id * _REFERRAL_HASH) % 100 < self.referral_percent
+
+    def existing(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def referred(self) -> int:
+        return self._pick(True)
+
+    def unreferred(self) -> int:
+        return self._pick(False)
+
+    def new(self) -> int:
+        return next(self._new_ids)
+
+    def _pick(self, referred: bool) -> int:
+        for _ in range(10_000):
+            tg_user_id = self.existing()
+            if self.is_referred(tg_user_id) == referred:
+                return tg_user_id
+        raise SystemExit(f"No {'referred' if referred else 'unreferred'} users; adjust --referral-ratio.")
+
+
+async def seed(engine: AsyncEngine, users: int, referral_percent: int) -> None:
+    started = time.perf_counter()
+    async with engine.begin() as connection:
+        await connection.execute(text(SEED_USERS_SQL), {"users": users})
+        await connection.execute(
+            text(SEED_REFERRALS_SQL),
+            {"users": users, "referral_hash": _REFERRAL_HASH, "referral_percent": referral_percent},
+        )
+        for statement in SEED_DENORMALIZED_SQL:
+            await connection.execute(text(statement), {"required": REFERRALS_REQUIRED_FOR_PARTICIPATION})
+    async with engine.connect() as connection:
+        autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        # VACUUM sets the visibility map so index-only scans behave like on a settled table.
+        await autocommit.execute(text("VACUUM ANALYZE users, referrals"))
+    print(f"Seeded {users} users in {time.perf_counter() - started:.1f}s")
+
+
+def _telegram_user(tg_user_id: int) -> TelegramUser:
+    return TelegramUser(id=tg_user_id, is_bot=False, first_name=f"Bench {tg_user_id}", username=f"bench{tg_user_id}")
+
+
+def repository_cases(
+    session_factory: async_sessionmaker[AsyncSession],
+    population: Population,
+) -> dict[str, Operation]:
+    """One operation per repository method; writes are rolled back."""
+
+    def read(prepare: Callable[[], SessionCall]) -> Operation:
+        async def operation(_: int) -> object:
+            call = prepare()
+            async with session_factory() as session:
+                return await call(session)
+
+        return operation
+
+    def rolled_back(prepare: Callable[[], SessionCall]) -> Operation:
+        async def operation(_: int) -> object:
+            call = prepare()
+            async with session_factory() as session:
+                try:
+                    return await call(session)
+                finally:
+                    await session.rollback()
+
+        return operation
+
+    def get(*, for_update: bool = False) -> SessionCall:
+        tg_user_id = population.existing()
+        return lambda session: UsersRepository.get_by_tg_user_id(session, tg_user_id, for_update=for_update)
+
+    def exists() -> SessionCall:
+        tg_user_id = population.existing()
+        return lambda session: UsersRepository.exists_by_tg_user_id(session, tg_user_id)
+
+    def fetch_many() -> SessionCall:
+        tg_user_ids = [population.existing() for _ in range(100)]
+        return lambda session: UsersRepository.fetch_by_tg_user_ids(session, tg_user_ids)
+
+    def upsert(pick: Callable[[], int]) -> Callable[[], SessionCall]:
+        def prepare() -> SessionCall:
+            tg_user_id = pick()
+            return lambda session: UsersRepository.get_or_create_for_update(
+                session, tg_user_id, f"bench{tg_user_id}", "Bench", None
+            )
+
+        return prepare
+
+    def increment() -> SessionCall:
+        tg_user_id = population.existing()
+        return lambda session: UsersRepository.increment_referrals_confirmed(
+            session, tg_user_id, is_participant=participant_after_referral_expression()
+        )
+
+    def create_referral() -> SessionCall:
+        referral_id = population.unreferred()
+        referrer_id = population.existing()
+        while referrer_id == referral_id:
+            referrer_id = population.existing()
+        return lambda session: ReferralsRepository.create_pending_referral(
+            session, referrer_id=referrer_id, referral_id=referral_id
+        )
+
+    def get_referral() -> SessionCall:
+        referral_id = population.referred()
+        return lambda session: ReferralsRepository.get_referral_by_referral_id(session, referral_id)
+
+    def confirm_referral() -> SessionCall:
+        referral_id = population.referred()
+        return lambda session: ReferralsRepository.confirm_pending_referral(session, referral_id)
+
+    return {
+        "users.get_by_tg_user_id": read(get),
+        "users.get_by_tg_user_id(for_update)": rolled_back(lambda: get(for_update=True)),
+        "users.exists_by_tg_user_id": read(exists),
+        "users.fetch_by_tg_user_ids(100)": read(fetch_many),
+        "users.get_or_create_for_update(new)": rolled_back(upsert(population.new)),
+        "users.get_or_create_for_update(existing)": rolled_back(upsert(population.existing)),
+        "users.increment_referrals_confirmed": rolled_back(increment),
+        "referrals.create_pending_referral": rolled_back(create_referral),
+        "referrals.get_referral_by_referral_id": read(get_referral),
+        "referrals.confirm_pending_referral": rolled_back(confirm_referral),
+    }
+
+
+def aggregate_cases(session_factory: async_sessionmaker[AsyncSession]) -> dict[str, Operation]:
+    """Whole-table reads behind the admin commands; far slower, so run fewer times."""
+
+    async def basic_stats(_: int) -> object:
+        async with session_factory() as session:
+            return await UsersRepository.fetch_basic_stats(session)
+
+    async def confirmed_referrals(_: int) -> object:
+        async with session_factory() as session:
+            return await ReferralsRepository.count_confirmed_referrals(session)
+
+    return {
+        "users.fetch_basic_stats": basic_stats,
+        "referrals.count_confirmed_referrals": confirmed_referrals,
+    }
+
+
+def service_cases(
+    session_factory: async_sessionmaker[AsyncSession],
+    population: Population,
+    operations: int,
+) -> dict[str, Operation]:
+    """A new user's journey, committed: each operation index is the same user in all three steps."""
+
+    logger = structlog.get_logger("bench")
+    new_users = [population.new() for _ in range(operations)]
+    referrers = [population.existing() for _ in range(operations)]
+
+    async def start(index: int) -> object:
+        user = _telegram_user(new_users[index])
+        return await process_start_command(session_factory, user, str(referrers[index]), logger)
+
+    async def check_attempt(index: int) -> object:
+        return await register_subscription_check_attempt(session_factory, _telegram_user(new_users[index]), logger)
+
+    async def confirm(index: int) -> object:
+        return await confirm_subscription_and_referral(session_factory, new_users[index], logger)
+
+    return {
+        "process_start_command": start,
+        "register_subscription_check_attempt": check_attempt,
+        "confirm_subscription_and_referral": confirm,
+    }
+
+
+async def measure(report: FlowReport, flow: str, operation: Operation, *, operations: int, concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await operation(index)
+            except Exception as exc:
+                report.record(flow, FlowResult(time.perf_counter() - started, error=type(exc).__name__))
+            else:
+                report.record(flow, FlowResult(time.perf_counter() - started))
+
+    await asyncio.gather(*(one(index) for index in range(operations)))
+
+
+async def run_cases(
+    cases: dict[str, Operation],
+    *,
+    operations: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    flows: dict[str, Any] = {}
+    for name, operation in cases.items():
+        flow = f"{name} c={concurrency}"
+        report = FlowReport([flow])
+        await measure(report, flow, operation, operations=operations, concurrency=concurrency)
+        report.finished = time.perf_counter()
+        stats = report.as_dict()["flows"][flow]
+        errors = f" errors={stats['errors']}" if stats["errors"] else ""
+        print(
+            f"{flow:>48}: {stats['throughput_per_second']:8.1f}/s  "
+            f"{format_latency_summary(report.latencies.get(flow, []))}{errors}"
+        )
+        flows[flow] = stats
+    return flows
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+async def main(args: argparse.Namespace) -> None:
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(30))
+    concurrency_levels = [int(value) for value in args.concurrency.split(",")]
+    referral_percent = round(args.referral_ratio * 100)
+    population = Population(args.users, referral_percent, random.Random(args.seed))
+
+    flows: dict[str, Any] = {}
+    async with scratch_schema(
+        bench_database_url(args.database_url),
+        pool_size=max(concurrency_levels),
+        max_overflow=0,
+    ) as (engine, session_factory):
+        await seed(engine, args.users, referral_percent)
+        # Fill the pool and warm the buffer cache before anything is timed.
+        warmup = repository_cases(session_factory, population)["users.get_by_tg_user_id"]
+        await measure(FlowReport(), "warmup", warmup, operations=args.operations, concurrency=max(concurrency_levels))
+
+        for concurrency in concurrency_levels:
+            flows.update(
+                await run_cases(
+                    repository_cases(session_factory, population),
+                    operations=args.operations,
+                    concurrency=concurrency,
+                )
+            )
+            flows.update(
+                await run_cases(
+                    aggregate_cases(session_factory),
+                    operations=args.aggregate_operations,
+                    concurrency=concurrency,
+                )
+            )
+            flows.update(
+                await run_cases(
+                    service_cases(session_factory, population, args.operations),
+                    operations=args.operations,
+                    concurrency=concurrency,
+                )
+            )
+
+    result = {
+        "label": args.label or git_commit(),
+        "users": args.users,
+        "referral_ratio": args.referral_ratio,
+        "operations": args.operations,
+        "flows": flows,
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("users") != args.users:
+            print(f"\nWarning: the baseline was seeded with {baseline.get('users')} users, this run with {args.users}.")
+        print_flow_comparison(baseline, result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="scratch Postgres URL (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--users", type=int, default=100_000, help="Seeded users, e.g. 1000000")
+    parser.add_argument("--referral-ratio", type=float, default=0.6, help="Share of seeded users who were referred")
+    parser.add_argument("--operations", type=int, default=1000, help="Timed calls per case and concurrency level")
+    parser.add_argument("--aggregate-operations", type=int, default=20, help="Timed calls of the whole-table reads")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated in-flight calls per case")
+    parser.add_argument("--label", help="Name of this run in comparisons (default: the git commit)")
+    parser.add_argument("--json", help="Save the results, e.g. as the baseline for --compare")
+    parser.add_argument("--compare", help="Results saved with --json from another commit")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
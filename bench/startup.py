@@ -0,0 +1,142 @@
+"""Cold start: how long ``import app.main`` takes and how soon a new instance answers its first update.
+
+Import time is measured in fresh interpreters, and the report lists the
+optional heavy packages (gspread, google-auth) that the import pulled in.
+Time-to-first-update starts the bot as in ``bench.webhook_load`` (scratch
+database, fake Bot API with ``--latency-ms`` per call) and measures from
+spawning the process to ``/readyz`` and to the reply to a ``/start``.
+``--identity-cache`` lets every run after the first serve the bot username
+and channel link from ``BOT_IDENTITY_CACHE_FILE``. ``--json``/``--compare``
+track regressions between commits.
+
+    python -m bench.startup --runs 5 --latency-ms 100 --json main.json
+    python -m bench.startup --runs 5 --latency-ms 100 --identity-cache --compare main.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bot_harness import WebhookClient, bot_process
+from bench.common import FlowReport, FlowResult, bench_database_url, print_flow_comparison, scratch_database
+from bench.fake_bot_api import FakeBotApi, add_fake_api_arguments
+from bench.webhook_load import FIRST_USER_ID, start_update
+
+FLOWS = ("import app.main", "spawn -> /readyz", "spawn -> first reply")
+OPTIONAL_HEAVY_MODULES = ("gspread", "google.auth", "google.oauth2")
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {OPTIONAL_HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(report: FlowReport, runs: int) -> list[str]:
+    """Time ``import app.main`` in ``runs`` fresh interpreters; returns the optional heavy modules it loaded."""
+
+    loaded: set[str] = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        report.record(FLOWS[0], FlowResult(probe["seconds"]))
+        loaded.update(probe["loaded"])
+    return sorted(loaded)
+
+
+async def measure_first_update(
+    report: FlowReport,
+    database_url: str,
+    fake_api: FakeBotApi,
+    api_url: str,
+    *,
+    runs: int,
+    env: dict[str, str],
+    log_path: str,
+) -> None:
+    for run in range(runs):
+        user_id = FIRST_USER_ID + run
+        async with bot_process(database_url, api_url, env=env, log_path=log_path) as bot:
+            client = WebhookClient(bot, fake_api)
+            try:
+                sent_at = time.perf_counter()
+                result = await client.send(start_update(user_id), reply_chat_id=user_id)
+            finally:
+                await client.close()
+        report.record(FLOWS[1], FlowResult(bot.ready_at - bot.spawned_at))
+        report.record(FLOWS[2], FlowResult(sent_at + result.latency_seconds - bot.spawned_at, error=result.error))
+
+
+async def main(args: argparse.Namespace) -> None:
+    report = FlowReport(FLOWS)
+    loaded = measure_import(report, args.runs)
+
+    fake_api = FakeBotApi(
+        latency_seconds=args.latency_ms / 1000,
+        latency_jitter_seconds=args.jitter_ms / 1000,
+        rate_limit_ratio=args.rate_limit_ratio,
+        seed=args.seed,
+    )
+    api_url = await fake_api.start()
+    env = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.identity_cache:
+            env.setdefault("BOT_IDENTITY_CACHE_FILE", os.path.join(directory, "bot_identity.json"))
+        try:
+            async with scratch_database(bench_database_url(args.database_url)) as database_url:
+                await measure_first_update(
+                    report,
+                    database_url,
+                    fake_api,
+                    api_url,
+                    runs=args.runs,
+                    env=env,
+                    log_path=args.app_log,
+                )
+        finally:
+            await fake_api.stop()
+    report.finished = time.perf_counter()
+
+    report.print()
+    print(f"Optional heavy modules loaded by the import: {', '.join(loaded) or 'none'}")
+    result = {**report.as_dict(), "label": args.label, "optional_modules_loaded": loaded, "args": vars(args)}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            print_flow_comparison(json.load(file), result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="scratch Postgres URL (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh imports and bot starts to measure")
+    parser.add_argument("--identity-cache", action="store_true", help="Reuse BOT_IDENTITY_CACHE_FILE across runs")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra bot setting")
+    parser.add_argument("--app-log", default="bench_startup.log", help="Where the bot's own logs go")
+    parser.add_argument("--label", help="Name of this run in comparisons, e.g. a git commit")
+    parser.add_argument("--json", help="Save the report, e.g. as the baseline for --compare")
+    parser.add_argument("--compare", help="A report saved with --json from another code version")
+    parser.add_argument("--seed", type=int, default=1)
+    add_fake_api_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
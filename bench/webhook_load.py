@@ -0,0 +1,194 @@
+"""End-to-end webhook load test: how many user journeys per second one instance sustains.
+
+Starts a fake Bot API, creates a scratch database, runs the bot as a separate
+process with its production entrypoint and posts realistic updates to
+``/webhook``. Each simulated user goes through ``/start`` (some with a
+referral code of an earlier user), the "check subscription" button and
+sharing the contact. New users arrive at ``--arrival-rate`` per second (open
+loop) and a flow's latency is measured from posting the update to the bot's
+reply reaching the user. Runs offline; ``--json`` writes the report for CI
+regression tracking.
+
+    python -m bench.webhook_load --users 2000 --arrival-rate 50 --latency-ms 40 --rate-limit-ratio 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Any
+
+from app.constants import CHECK_SUBSCRIPTION_CALLBACK
+from bench.bot_harness import BotProcess, WebhookClient, bot_process
+from bench.common import FlowReport, bench_database_url, scratch_database
+from bench.fake_bot_api import BOT_USER, FakeBotApi, add_fake_api_arguments
+
+FLOWS = ("start", "check_subscription", "contact")
+FIRST_USER_ID = 5_000_000_000
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"Bench {user_id}", "language_code": "ru"}
+
+
+def _message(user_id: int, **fields: Any) -> dict[str, Any]:
+    return {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": f"Bench {user_id}"},
+        "from": _user(user_id),
+        **fields,
+    }
+
+
+def start_update(user_id: int, referrer_id: int | None = None) -> dict[str, Any]:
+    text = f"/start {referrer_id}" if referrer_id is not None else "/start"
+    entities = [{"type": "bot_command", "offset": 0, "length": len("/start")}]
+    return {"update_id": next(_update_ids), "message": _message(user_id, text=text, entities=entities)}
+
+
+def check_subscription_update(user_id: int) -> dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": f"{user_id}{next(_update_ids)}",
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": CHECK_SUBSCRIPTION_CALLBACK,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "Привет! Чтобы участвовать в розыгрыше, выполните условия:",
+            },
+        },
+    }
+
+
+def contact_update(user_id: int) -> dict[str, Any]:
+    contact = {
+        "phone_number": f"+7900{user_id % 10_000_000:07d}",
+        "first_name": f"Bench {user_id}",
+        "user_id": user_id,
+    }
+    return {"update_id": next(_update_ids), "message": _message(user_id, contact=contact)}
+
+
+async def user_journey(
+    client: WebhookClient,
+    report: FlowReport,
+    user_id: int,
+    referrer_id: int | None,
+    think_seconds: float,
+    finished_users: list[int],
+    rng: random.Random,
+) -> None:
+    steps = (
+        ("start", start_update(user_id, referrer_id)),
+        ("check_subscription", check_subscription_update(user_id)),
+        ("contact", contact_update(user_id)),
+    )
+    for index, (flow, update) in enumerate(steps):
+        if index:
+            # People take a moment between taps; it also keeps per-chat send limits realistic.
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think_seconds)
+        result = await client.send(update, reply_chat_id=user_id)
+        report.record(flow, result)
+        if result.error is not None:
+            return
+    # Only finished users hand out referral codes: their referral notifications must not
+    # be mistaken for the reply to a step still in progress.
+    finished_users.append(user_id)
+
+
+async def generate_load(
+    bot: BotProcess,
+    fake_api: FakeBotApi,
+    *,
+    users: int,
+    arrival_rate: float,
+    referral_ratio: float,
+    think_seconds: float,
+    seed: int,
+) -> FlowReport:
+    rng = random.Random(seed)
+    client = WebhookClient(bot, fake_api)
+    report = FlowReport(FLOWS)
+    finished_users: list[int] = []
+    journeys: list[asyncio.Task[None]] = []
+    try:
+        for index in range(users):
+            referrer_id = rng.choice(finished_users) if finished_users and rng.random() < referral_ratio else None
+            journeys.append(
+                asyncio.create_task(
+                    user_journey(client, report, FIRST_USER_ID + index, referrer_id, think_seconds, finished_users, rng)
+                )
+            )
+            # Poisson arrivals, like real traffic.
+            await asyncio.sleep(rng.expovariate(arrival_rate))
+        await asyncio.gather(*journeys)
+    finally:
+        report.finished = time.perf_counter()
+        await client.close()
+    return report
+
+
+async def main(args: argparse.Namespace) -> None:
+    fake_api = FakeBotApi(
+        latency_seconds=args.latency_ms / 1000,
+        latency_jitter_seconds=args.jitter_ms / 1000,
+        rate_limit_ratio=args.rate_limit_ratio,
+        seed=args.seed,
+    )
+    api_url = await fake_api.start()
+    env = dict(item.split("=", 1) for item in args.env)
+    # The production 30 msg/s global limit would cap the measurement at Telegram's rate, not the bot's.
+    env.setdefault("TELEGRAM_GLOBAL_RATE", str(args.telegram_global_rate))
+    try:
+        async with scratch_database(bench_database_url(args.database_url)) as database_url:
+            async with bot_process(database_url, api_url, env=env, log_path=args.app_log) as bot:
+                report = await generate_load(
+                    bot,
+                    fake_api,
+                    users=args.users,
+                    arrival_rate=args.arrival_rate,
+                    referral_ratio=args.referral_ratio,
+                    think_seconds=args.think_seconds,
+                    seed=args.seed,
+                )
+    finally:
+        await fake_api.stop()
+
+    report.print()
+    print(f"Bot API: {fake_api.summary()}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({**report.as_dict(), "bot_api": fake_api.summary(), "args": vars(args)}, file, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="scratch Postgres URL (default: $BENCH_DATABASE_URL)")
+    parser.add_argument("--users", type=int, default=500, help="Simulated users, one journey each")
+    parser.add_argument("--arrival-rate", type=float, default=20.0, help="New users per second")
+    parser.add_argument("--referral-ratio", type=float, default=0.5, help="Share of /start with a referral code")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="Mean pause between a user's taps")
+    parser.add_argument("--telegram-global-rate", type=float, default=10_000.0)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra bot setting")
+    parser.add_argument("--app-log", default="bench_webhook_load.log", help="Where the bot's own logs go")
+    parser.add_argument("--json", help="Write the report as JSON, e.g. for CI regression tracking")
+    parser.add_argument("--seed", type=int, default=1)
+    add_fake_api_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
-"""Скрипт для синхронизации существующих данных из БД в Google Sheets."""
+"""Скрипт для синхронизации существующих данных из БД в Google Sheets.
 
+Режимы:
+    --mode upsert     (по умолчанию) обновить/добавить контакты пачками, не трогая остальные строки
+    --mode rebuild    полностью пересобрать лист из БД несколькими крупными запросами
+    --mode reconcile  сравнить хеши строк БД и листа и отправить только различия
+"""
+
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -9,71 +16,108 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import get_settings
-from app.db.session import create_engine_and_session_factory
-from app.logging_setup import configure_logging, get_logger
-from app.repositories.users import UsersRepository
+from app.db.session import create_engine_and_session_factory, engine_options_from_settings
+from app.logging_setup import configure_logging, get_logger, logging_options_from_settings
 from app.services.google_sheets_service import GoogleSheetsService
-
-
-async def sync_all_users_to_sheets():
+from app.services.sheets_sync import (
+    rebuild_contacts_sheet,
+    reconcile_contacts_sheet,
+    upsert_contacts_sheet,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sync users from the database to Google Sheets.")
+    parser.add_argument(
+        "--mode",
+        choices=("upsert", "rebuild", "reconcile"),
+        default="upsert",
+        help=(
+            "upsert: batch add/update contacts; rebuild: rewrite the whole sheet from the DB; "
+            "reconcile: push only rows whose content hash differs"
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5000,
+        help="number of users fetched from the DB per cursor batch",
+    )
+    parser.add_argument(
+        "--write-chunk-rows",
+        type=int,
+        default=20000,
+        help="rows per Sheets write request in rebuild mode",
+    )
+    return parser.parse_args()
+
+
+async def sync_all_users_to_sheets(args: argparse.Namespace) -> int:
     """Синхронизировать всех пользователей из БД в Google Sheets."""
     settings = get_settings()
-    configure_logging(settings.log_level)
+    configure_logging(settings.log_level, **logging_options_from_settings(settings))
     logger = get_logger("sync_to_sheets")
 
     if not settings.google_sheets_enabled:
-        logger.error("Google Sheets integration is disabled. Set GOOGLE_SHEETS_ENABLED=true")
-        return
+        logger.error("google_sheets_disabled", hint="Set GOOGLE_SHEETS_ENABLED=true")
+        return 1
 
     google_sheets_service = GoogleSheetsService(settings, logger)
 
     if not google_sheets_service.is_enabled():
-        logger.error("Google Sheets service is not properly configured")
-        return
+        logger.error("google_sheets_not_configured")
+        return 1
 
-    engine, session_factory = create_engine_and_session_factory(settings.database_url)
+    # Только основная БД: отстающая реплика откатила бы или удалила в таблице уже верные строки
+    engine, session_factory = create_engine_and_session_factory(
+        settings.database_url,
+        **engine_options_from_settings(settings),
+    )
 
     try:
-        async with session_factory() as session:
-            # Получаем всех пользователей через репозиторий
-            from sqlalchemy import select
-            from app.db.models import User
-            
-            stmt = select(User)
-            result = await session.execute(stmt)
-            users = result.scalars().all()
-
-            logger.info(f"Found {len(users)} users to sync")
-
-            synced = 0
-            failed = 0
-
-            for user in users:
-                success = google_sheets_service.add_contact(
-                    tg_user_id=user.tg_user_id,
-                    username=user.username,
-                    telegram_first_name=user.first_name,
-                    telegram_last_name=user.last_name,
-                    contact_name=user.contact_name,
-                    contact_phone=user.contact_phone,
-                    contact_email=user.contact_email,
-                    is_subscribed=user.is_subscribed,
-                    is_participant=user.is_participant,
-                    referrals_confirmed=user.referrals_confirmed or 0,
-                )
-
-                if success:
-                    synced += 1
-                    logger.info(f"Synced user {user.tg_user_id}")
-                else:
-                    failed += 1
-                    logger.warning(f"Failed to sync user {user.tg_user_id}")
-
-            logger.info(f"Sync complete: {synced} synced, {failed} failed")
-
+        if args.mode == "rebuild":
+            written = await rebuild_contacts_sheet(
+                session_factory,
+                google_sheets_service,
+                logger,
+                chunk_size=args.chunk_size,
+                write_chunk_rows=args.write_chunk_rows,
+            )
+            if written < 0:
+                logger.error("sheets_rebuild_failed")
+                return 1
+            logger.info("sheets_rebuild_complete", rows=written)
+            return 0
+
+        if args.mode == "reconcile":
+            result = await reconcile_contacts_sheet(
+                session_factory,
+                google_sheets_service,
+                logger,
+                chunk_size=args.chunk_size,
+            )
+            if result is None:
+                logger.error("sheets_reconcile_failed")
+                return 1
+            logger.info(
+                "sheets_reconcile_complete",
+                updated=result.updated,
+                appended=result.appended,
+                deleted=result.deleted,
+            )
+            return 0
+
+        synced, failed = await upsert_contacts_sheet(
+            session_factory,
+            google_sheets_service,
+            logger,
+            chunk_size=args.chunk_size,
+        )
+        logger.info("sheets_sync_complete", synced=synced, failed=failed)
+        return 1 if failed else 0
     finally:
         await engine.dispose()
 
 
 if __name__ == "__main__":
-    asyncio.run(sync_all_users_to_sheets())
+    sys.exit(asyncio.run(sync_all_users_to_sheets(parse_args())))
@@ -0,0 +1,57 @@
+"""Smoke run of the repository benchmark on a tiny data set.
+
+Needs a scratch Postgres in ``TEST_DATABASE_URL``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models import Referral, User
+from bench.common import scratch_schema
+from bench.repositories import Population, aggregate_cases, repository_cases, run_cases, seed, service_cases
+
+
+def test_population_mirrors_the_seeded_referral_share() -> None:
+    population = Population(10_000, 60, random.Random(1))
+
+    referred = sum(population.is_referred(tg_user_id) for tg_user_id in range(1, 10_001))
+
+    assert 5_900 <= referred <= 6_100
+    assert not population.is_referred(1)
+    assert population.is_referred(population.referred())
+    assert not population.is_referred(population.unreferred())
+    assert population.new() == 10_001
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set")
+def test_every_case_runs_without_errors() -> None:
+    async def scenario() -> None:
+        async with scratch_schema(os.environ["TEST_DATABASE_URL"]) as (engine, session_factory):
+            await seed(engine, 2_000, 60)
+            population = Population(2_000, 60, random.Random(1))
+
+            async with session_factory() as session:
+                referral_ids = set(await session.scalars(select(Referral.referral_id)))
+                participants = await session.scalar(select(User).where(User.is_participant.is_(True)).limit(1))
+            assert referral_ids == {tg_user_id for tg_user_id in range(1, 2_001) if population.is_referred(tg_user_id)}
+            assert participants is not None
+
+            flows = {}
+            for cases in (
+                repository_cases(session_factory, population),
+                aggregate_cases(session_factory),
+                service_cases(session_factory, population, 5),
+            ):
+                flows.update(await run_cases(cases, operations=5, concurrency=2))
+
+            assert flows
+            assert {flow: stats["errors"] for flow, stats in flows.items() if stats["errors"]} == {}
+            assert all(stats["completed"] == 5 for stats in flows.values())
+
+    asyncio.run(scenario())
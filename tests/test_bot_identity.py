@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from app.bot.identity import (
+    BotIdentity,
+    fetch_bot_identity,
+    load_cached_identity,
+    refresh_cached_identity,
+    save_cached_identity,
+)
+
+
+class _RecordingLogger:
+    def __init__(self) -> None:
+        self.events: list[str] = []
+
+    def info(self, event: str, **_: object) -> None:
+        self.events.append(event)
+
+    def warning(self, event: str, **_: object) -> None:
+        self.events.append(event)
+
+
+class _SlowBot:
+    def __init__(self, username: str = "giveaway_bot", latency_seconds: float = 0.1) -> None:
+        self.username = username
+        self.latency_seconds = latency_seconds
+        self.calls: list[str] = []
+
+    async def get_me(self) -> SimpleNamespace:
+        self.calls.append("getMe")
+        await asyncio.sleep(self.latency_seconds)
+        return SimpleNamespace(username=self.username)
+
+    async def get_chat(self, chat_id: int) -> SimpleNamespace:
+        self.calls.append("getChat")
+        await asyncio.sleep(self.latency_seconds)
+        return SimpleNamespace(username="giveaway_channel", invite_link=None)
+
+
+def _settings(**overrides: object) -> SimpleNamespace:
+    values = {
+        "bot_token": "123456:secret",
+        "channel_id": -1001234567890,
+        "channel_url": None,
+        "bot_username": None,
+        "skip_webhook_setup": False,
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_fetch_runs_get_me_and_get_chat_concurrently() -> None:
+    bot = _SlowBot()
+
+    started = time.perf_counter()
+    identity = asyncio.run(fetch_bot_identity(bot, _settings(), _RecordingLogger()))
+    elapsed = time.perf_counter() - started
+
+    assert identity == BotIdentity("giveaway_bot", "https://t.me/giveaway_channel")
+    assert sorted(bot.calls) == ["getChat", "getMe"]
+    assert elapsed < 0.18
+
+
+def test_long_polling_mode_uses_configured_username_without_api_calls() -> None:
+    bot = _SlowBot()
+
+    identity = asyncio.run(fetch_bot_identity(bot, _settings(skip_webhook_setup=True, bot_username="local_bot"), None))
+
+    assert identity == BotIdentity("local_bot", "https://t.me/c/1234567890")
+    assert bot.calls == []
+
+
+def test_cache_is_keyed_by_bot_and_channel_without_the_token(tmp_path) -> None:
+    path = tmp_path / "identity.json"
+    identity = BotIdentity("giveaway_bot", "https://t.me/giveaway_channel")
+
+    save_cached_identity(path, _settings(), identity)
+
+    assert "secret" not in path.read_text(encoding="utf-8")
+    assert load_cached_identity(path, _settings()) == identity
+    assert load_cached_identity(path, _settings(channel_id=-1009999999999)) is None
+    assert load_cached_identity(path, _settings(bot_token="654321:secret")) is None
+    assert load_cached_identity(tmp_path / "missing.json", _settings()) is None
+    path.write_text("{not json", encoding="utf-8")
+    assert load_cached_identity(path, _settings()) is None
+
+
+def test_refresh_applies_and_persists_a_changed_identity(tmp_path) -> None:
+    path = tmp_path / "identity.json"
+    stale = BotIdentity("old_name_bot", "https://t.me/giveaway_channel")
+    save_cached_identity(path, _settings(), stale)
+    workflow_data = {"bot_username": stale.bot_username, "channel_url": stale.channel_url}
+    logger = _RecordingLogger()
+
+    asyncio.run(refresh_cached_identity(_SlowBot(latency_seconds=0), _settings(), logger, path, stale, workflow_data))
+
+    assert workflow_data["bot_username"] == "giveaway_bot"
+    assert json.loads(path.read_text(encoding="utf-8"))["bot_username"] == "giveaway_bot"
+    assert logger.events == ["bot_identity_changed"]
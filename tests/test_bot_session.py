@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import GetChatMember, GetMe
+
+from app.bot.session import TELEGRAM_API_LATENCY, TunedAiohttpSession, create_bot_session
+
+
+def test_method_timeouts_apply_unless_caller_overrides(monkeypatch) -> None:
+    seen: list[tuple[str, object]] = []
+
+    async def fake_make_request(self, bot, method, timeout=None):
+        seen.append((method.__api_method__, timeout))
+        return True
+
+    monkeypatch.setattr(AiohttpSession, "make_request", fake_make_request)
+    session = TunedAiohttpSession(timeout_seconds=30.0, method_timeouts={"getMe": 3.0})
+    before = TELEGRAM_API_LATENCY.labels("getChatMember").count
+
+    async def scenario() -> None:
+        await session.make_request(None, GetMe())
+        await session.make_request(None, GetChatMember(chat_id=-100, user_id=1))
+        await session.make_request(None, GetMe(), timeout=7)
+
+    asyncio.run(scenario())
+
+    assert seen == [("getMe", 3.0), ("getChatMember", 10.0), ("getMe", 7)]
+    assert TELEGRAM_API_LATENCY.labels("getChatMember").count == before + 1
+
+
+def test_create_bot_session_points_at_custom_api_server() -> None:
+    settings = SimpleNamespace(
+        telegram_api_url="http://bot-api:8081",
+        telegram_api_local=True,
+        telegram_pool_limit=50,
+        telegram_pool_limit_per_host=10,
+        telegram_keepalive_timeout_seconds=15.0,
+        telegram_dns_ttl_seconds=60,
+        telegram_request_timeout_seconds=20.0,
+        method_timeouts={},
+    )
+
+    session = create_bot_session(settings)
+
+    assert session.api.api_url("TOKEN", "getMe") == "http://bot-api:8081/botTOKEN/getMe"
+    assert session.api.is_local is True
+    assert session.connector_options["limit_per_host"] == 10
+    assert session.timeout == 20.0
+
+
+def test_session_builds_its_own_tuned_connector() -> None:
+    session = TunedAiohttpSession(limit=7, limit_per_host=3, keepalive_timeout_seconds=12.0)
+
+    async def scenario() -> None:
+        client = await session.create_session()
+        assert await session.create_session() is client
+        assert client.connector.limit == 7
+        assert client.connector.limit_per_host == 3
+        await session.close()
+        assert client.closed
+        assert await session.create_session() is not client
+        await session.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Update
+
+from app.constants import CHECK_SUBSCRIPTION_CALLBACK
+from bench.fake_bot_api import FakeBotApi
+from bench.webhook_load import check_subscription_update, contact_update, start_update
+
+
+def _bot(api_url: str) -> Bot:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(api_url))
+    return Bot(token="100000:test", session=session)
+
+
+def test_fake_api_answers_bot_calls_and_signals_replies() -> None:
+    async def scenario() -> None:
+        api = FakeBotApi(latency_seconds=0, latency_jitter_seconds=0)
+        bot = _bot(await api.start())
+        try:
+            me = await bot.get_me()
+            member = await bot.get_chat_member(-1001000000000, 42)
+            reply = api.expect_reply(42)
+            message = await bot.send_message(42, "hello")
+
+            assert me.is_bot
+            assert member.status == "member"
+            assert message.chat.id == 42
+            assert reply.done()
+            assert api.calls == {"getMe": 1, "getChatMember": 1, "sendMessage": 1}
+        finally:
+            await bot.session.close()
+            await api.stop()
+
+    asyncio.run(scenario())
+
+
+def test_fake_api_injects_rate_limits_except_at_startup() -> None:
+    async def scenario() -> None:
+        api = FakeBotApi(latency_seconds=0, latency_jitter_seconds=0, rate_limit_ratio=1.0, retry_after_seconds=3)
+        bot = _bot(await api.start())
+        try:
+            await bot.get_me()
+            with pytest.raises(TelegramRetryAfter) as exc_info:
+                await bot.send_message(42, "hello")
+            assert exc_info.value.retry_after == 3
+            assert api.rate_limited == {"sendMessage": 1}
+        finally:
+            await bot.session.close()
+            await api.stop()
+
+    asyncio.run(scenario())
+
+
+def test_generated_updates_are_valid_telegram_updates() -> None:
+    start = Update.model_validate(start_update(7, referrer_id=3))
+    check = Update.model_validate(check_subscription_update(7))
+    contact = Update.model_validate(contact_update(7))
+
+    assert start.message.text == "/start 3"
+    assert check.callback_query.data == CHECK_SUBSCRIPTION_CALLBACK
+    assert contact.message.contact.user_id == 7
+    assert len({start.update_id, check.update_id, contact.update_id}) == 3
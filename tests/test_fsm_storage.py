@@ -0,0 +1,120 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import structlog
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from app.bot.fsm_storage import PostgresStorage
+from app.repositories.fsm_states import FsmStatesRepository
+
+
+class _Form(StatesGroup):
+    name = State()
+
+
+class _FakeSession:
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+@asynccontextmanager
+async def _session_factory():
+    yield _FakeSession()
+
+
+def _install_fake_repository(monkeypatch, rows: dict) -> dict:
+    calls = {"get": 0, "upsert": [], "delete": []}
+
+    async def get(session, key, *, newer_than):
+        calls["get"] += 1
+        return rows.get(key)
+
+    async def upsert_many(session, records):
+        if records:
+            calls["upsert"].append(list(records))
+
+    async def delete_many(session, keys):
+        if keys:
+            calls["delete"].append(list(keys))
+
+    monkeypatch.setattr(FsmStatesRepository, "get", staticmethod(get))
+    monkeypatch.setattr(FsmStatesRepository, "upsert_many", staticmethod(upsert_many))
+    monkeypatch.setattr(FsmStatesRepository, "delete_many", staticmethod(delete_many))
+    return calls
+
+
+def _storage(**kwargs) -> PostgresStorage:
+    return PostgresStorage(_session_factory, structlog.get_logger("test"), **kwargs)
+
+
+def test_writes_are_coalesced_into_one_upsert(monkeypatch) -> None:
+    calls = _install_fake_repository(monkeypatch, {})
+    key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    async def scenario() -> None:
+        storage = _storage(flush_interval_seconds=0.01)
+        await storage.set_state(key, _Form.name)
+        await storage.update_data(key, {"contact_name": "Ivan"})
+        assert await storage.get_state(key) == "_Form:name"
+        await asyncio.sleep(0.05)
+        await storage.close()
+
+    asyncio.run(scenario())
+
+    assert calls["get"] == 1
+    assert calls["upsert"] == [[{"key": "fsm:10:10", "state": "_Form:name", "data": {"contact_name": "Ivan"}}]]
+
+
+def test_cleared_state_is_deleted_and_cache_expires(monkeypatch) -> None:
+    calls = _install_fake_repository(monkeypatch, {"fsm:10:10": ("_Form:name", {"a": 1})})
+    key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    async def scenario() -> None:
+        storage = _storage(cache_ttl_seconds=0)
+        assert await storage.get_data(key) == {"a": 1}
+        await storage.set_state(key, None)
+        await storage.set_data(key, {})
+        await storage.close()
+        await storage.get_state(key)
+
+    asyncio.run(scenario())
+
+    assert calls["delete"] == [["fsm:10:10"]]
+    assert calls["get"] == 3
+
+
+def test_failed_flush_keeps_its_keys_even_under_cache_pressure(monkeypatch) -> None:
+    calls = _install_fake_repository(monkeypatch, {})
+    first = StorageKey(bot_id=1, chat_id=10, user_id=10)
+    second = StorageKey(bot_id=1, chat_id=20, user_id=20)
+    outage = {"on": True}
+
+    async def failing_upsert(session, records):
+        await asyncio.sleep(0.01)
+        if outage["on"]:
+            raise ConnectionError("database down")
+        calls["upsert"].append(list(records))
+
+    monkeypatch.setattr(FsmStatesRepository, "upsert_many", staticmethod(failing_upsert))
+
+    async def scenario() -> None:
+        storage = _storage(cache_ttl_seconds=0, max_cache_entries=1)
+        await storage.set_state(first, _Form.name)
+        flush = asyncio.create_task(storage.flush())
+        await asyncio.sleep(0)
+        # Loading another key overflows the cache while the failing upsert is in flight.
+        assert await storage.get_state(second) is None
+        # The in-flight write is still served from the cache, not the stale database.
+        assert await storage.get_state(first) == "_Form:name"
+        try:
+            await flush
+        except ConnectionError:
+            pass
+        outage["on"] = False
+        await storage.flush()
+
+    asyncio.run(scenario())
+
+    assert calls["upsert"] == [[{"key": "fsm:10:10", "state": "_Form:name", "data": {}}]]
@@ -0,0 +1,275 @@
+import asyncio
+import re
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from types import SimpleNamespace
+
+import structlog
+
+from app.repositories.users import UsersRepository
+from app.services.google_sheets_service import (
+    SHEET_HEADER,
+    GoogleSheetsService,
+    SheetContact,
+    SheetReconcileResult,
+    ShardIndex,
+    compute_row_hash,
+)
+from app.services.sheets_sync import reconcile_contacts_sheet
+
+_RANGE_RE = re.compile(r"^'(?P<title>.+)'!(?P<c1>[A-Z])(?P<r1>\d*):(?P<c2>[A-Z])(?P<r2>\d*)$")
+
+
+class _FakeWorksheet:
+    def __init__(self, sheet_id: int, title: str) -> None:
+        self.id = sheet_id
+        self.title = title
+        self.rows: list[list[str]] = []
+
+    def append_row(self, values):
+        self.rows.append(list(values))
+
+    def append_rows(self, values, value_input_option=None):
+        self.rows.extend(list(row) for row in values)
+
+    def resize(self, rows=None, cols=None):
+        del self.rows[rows:]
+
+    def batch_clear(self, ranges):
+        del self.rows[1:]
+
+
+class _FakeSpreadsheet:
+    def __init__(self) -> None:
+        self.sheets: list[_FakeWorksheet] = []
+        self.calls: list[str] = []
+
+    def worksheets(self):
+        return list(self.sheets)
+
+    def add_worksheet(self, title, rows, cols):
+        worksheet = _FakeWorksheet(len(self.sheets) + 100, title)
+        self.sheets.append(worksheet)
+        return worksheet
+
+    def del_worksheet(self, worksheet):
+        self.sheets.remove(worksheet)
+
+    def _resolve(self, range_name):
+        match = _RANGE_RE.match(range_name)
+        worksheet = next(sheet for sheet in self.sheets if sheet.title == match["title"])
+        first_col = ord(match["c1"]) - ord("A")
+        last_col = ord(match["c2"]) - ord("A")
+        first_row = int(match["r1"] or 1) - 1
+        return worksheet, first_row, first_col, last_col
+
+    def values_batch_get(self, ranges):
+        self.calls.append("values_batch_get")
+        value_ranges = []
+        for range_name in ranges:
+            worksheet, first_row, first_col, last_col = self._resolve(range_name)
+            values = [row[first_col : last_col + 1] for row in worksheet.rows[first_row:]]
+            value_ranges.append({"range": range_name, "values": values})
+        return {"valueRanges": value_ranges}
+
+    def values_get(self, range_name):
+        self.calls.append("values_get")
+        return self.values_batch_get([range_name])["valueRanges"][0]
+
+    def _write(self, range_name, values):
+        worksheet, first_row, _, _ = self._resolve(range_name)
+        for offset, row in enumerate(values):
+            while len(worksheet.rows) <= first_row + offset:
+                worksheet.rows.append([])
+            worksheet.rows[first_row + offset] = list(row)
+
+    def values_update(self, range_name, params=None, body=None):
+        self.calls.append("values_update")
+        self._write(range_name, body["values"])
+
+    def values_batch_update(self, body):
+        self.calls.append("values_batch_update")
+        for item in body["data"]:
+            self._write(item["range"], item["values"])
+
+    def batch_update(self, body):
+        self.calls.append("batch_update")
+        for request in body["requests"]:
+            target = request["deleteDimension"]["range"]
+            worksheet = next(sheet for sheet in self.sheets if sheet.id == target["sheetId"])
+            del worksheet.rows[target["startIndex"] : target["endIndex"]]
+
+
+def _service(spreadsheet: _FakeSpreadsheet, *, max_rows: int = 50000) -> GoogleSheetsService:
+    service = GoogleSheetsService.__new__(GoogleSheetsService)
+    service.settings = SimpleNamespace(
+        google_sheets_enabled=True,
+        google_sheets_spreadsheet_id="sheet",
+        google_sheets_worksheet_name="Контакты",
+        google_sheets_shard_max_rows=max_rows,
+    )
+    service.logger = structlog.get_logger("test")
+    service.client = object()
+    service._write_lock = threading.Lock()
+    service._spreadsheet = spreadsheet
+    service._shards = None
+    service._index = None
+    return service
+
+
+def _contact(tg_user_id: int, *, with_contact: bool = True) -> SheetContact:
+    return SheetContact(
+        tg_user_id=tg_user_id,
+        username=f"user{tg_user_id}",
+        telegram_first_name="Ivan",
+        telegram_last_name="Petrov",
+        contact_name="Ivan Petrov" if with_contact else None,
+        contact_phone="+79990000000" if with_contact else None,
+    )
+
+
+def test_sheet_contact_row_layout() -> None:
+    row = _contact(42).to_row("7", "2026-01-01 00:00:00")
+    assert row[:3] == ["7", "2026-01-01 00:00:00", "42"]
+    assert row[4] == "Ivan Petrov"
+    assert row[7:] == ["Нет", "Нет", "0"]
+
+
+def test_rebuild_writes_in_few_large_chunks_across_shards() -> None:
+    spreadsheet = _FakeSpreadsheet()
+    service = _service(spreadsheet, max_rows=100)
+    contacts = [_contact(i) for i in range(1, 251)] + [_contact(999, with_contact=False)]
+
+    written = service.rebuild_contacts(contacts, chunk_rows=60)
+
+    assert written == 250
+    assert [sheet.title for sheet in spreadsheet.sheets] == ["Контакты", "Контакты 2", "Контакты 3"]
+    assert [len(sheet.rows) for sheet in spreadsheet.sheets] == [101, 101, 51]
+    assert spreadsheet.sheets[0].rows[0] == SHEET_HEADER
+    assert spreadsheet.sheets[1].rows[1][0] == "101"
+    assert spreadsheet.calls.count("values_update") == 5
+    assert service._index is None
+    assert service._get_index().shard_for("250") == 2
+
+
+def test_upsert_reads_only_the_routed_shard_and_spills_into_new_shard() -> None:
+    spreadsheet = _FakeSpreadsheet()
+    service = _service(spreadsheet, max_rows=2)
+    service.rebuild_contacts([_contact(1), _contact(2), _contact(3)])
+    service._get_index()
+    spreadsheet.calls.clear()
+
+    assert service.upsert_contacts([replace(_contact(1), is_participant=True)]) is True
+    assert spreadsheet.calls == ["values_batch_get", "values_batch_update"]
+    assert spreadsheet.sheets[0].rows[1][8] == "Да"
+
+    assert service.upsert_contacts([_contact(4), _contact(5)]) is True
+    assert [row[2] for row in spreadsheet.sheets[1].rows[1:]] == ["3", "4"]
+    assert [row[:3:2] for row in spreadsheet.sheets[2].rows[1:]] == [["5", "5"]]
+    assert service._index.shard_for("5") == 2
+
+
+def test_upsert_reloads_an_index_left_stale_by_another_process() -> None:
+    spreadsheet = _FakeSpreadsheet()
+    service = _service(spreadsheet, max_rows=2)
+    service.rebuild_contacts([_contact(1), _contact(2), _contact(3)])
+    service._get_index()
+
+    # The sync script rebuilds the same spreadsheet in another process: 1 is gone, rows shift.
+    _service(spreadsheet, max_rows=2).rebuild_contacts([_contact(2), _contact(3), _contact(4)])
+
+    assert service.upsert_contacts([replace(_contact(3), is_participant=True), _contact(5)]) is True
+    ids = [[row[2] for row in sheet.rows[1:]] for sheet in spreadsheet.sheets]
+    assert ids == [["2", "3"], ["4", "5"]]
+    assert spreadsheet.sheets[0].rows[2][8] == "Да"
+    assert service._index.shard_for("5") == 1
+
+
+def test_shard_index_allocates_from_last_shard() -> None:
+    index = ShardIndex.from_columns(3, [["1", "2", "3"], ["4"]])
+
+    assert index.shard_for("4") == 1
+    assert index.allocate(4) == [(1, 2), (2, 2)]
+    assert index.row_counts == [3, 3, 2]
+
+
+def test_row_hash_ignores_serial_date_and_phone_plus() -> None:
+    contact = _contact(42)
+    written = contact.to_row("1", "2026-01-01 00:00:00")
+    read_back = ["5", "2026-02-02 10:00:00", *written[2:6], written[6].lstrip("+"), *written[7:]]
+
+    assert compute_row_hash(written) == compute_row_hash(read_back)
+    assert compute_row_hash(written) != compute_row_hash(_contact(43).to_row("1", ""))
+
+
+def test_reconcile_touches_only_changed_rows() -> None:
+    unchanged, changed, removed = _contact(1), _contact(2), _contact(3)
+    spreadsheet = _FakeSpreadsheet()
+    worksheet = spreadsheet.add_worksheet("Контакты", rows=1000, cols=10)
+    worksheet.rows = [
+        SHEET_HEADER,
+        unchanged.to_row("1", "old"),
+        changed.to_row("2", "old"),
+        removed.to_row("3", "old"),
+        unchanged.to_row("4", "old"),
+    ]
+    spreadsheet.calls.clear()
+
+    result = _service(spreadsheet).reconcile_contacts(
+        [unchanged, replace(changed, is_participant=True), _contact(5)]
+    )
+
+    assert result == SheetReconcileResult(updated=1, appended=1, deleted=2)
+    assert spreadsheet.calls == ["values_batch_get", "values_batch_update", "batch_update"]
+    assert [row[2] for row in worksheet.rows[1:]] == ["1", "2", "5"]
+    assert worksheet.rows[2][8] == "Да"
+    assert worksheet.rows[3][0] == "5"
+
+
+def _user(contact: SheetContact) -> SimpleNamespace:
+    return SimpleNamespace(
+        tg_user_id=contact.tg_user_id,
+        username=contact.username,
+        first_name=contact.telegram_first_name,
+        last_name=contact.telegram_last_name,
+        contact_name=contact.contact_name,
+        contact_phone=contact.contact_phone,
+        is_subscribed=contact.is_subscribed,
+        is_participant=contact.is_participant,
+        referrals_confirmed=contact.referrals_confirmed,
+    )
+
+
+def test_reconcile_keeps_contacts_upserted_after_the_snapshot(monkeypatch) -> None:
+    spreadsheet = _FakeSpreadsheet()
+    service = _service(spreadsheet)
+    service.rebuild_contacts([_contact(1), _contact(2), _contact(3)])
+    # The DB after the snapshot: 2 became a participant, 3 is gone, 4 is new.
+    database = {
+        1: _contact(1),
+        2: replace(_contact(2), is_participant=True),
+        4: _contact(4),
+    }
+
+    async def stream_contact_rows(session, *, chunk_size):
+        yield [_user(_contact(1)), _user(_contact(2))]
+        # The outbox syncs 2 and 4 while the snapshot is already taken.
+        service.upsert_contacts([database[2], database[4]])
+
+    async def fetch_by_tg_user_ids(session, tg_user_ids):
+        return [_user(database[tg_id]) for tg_id in tg_user_ids if tg_id in database]
+
+    @asynccontextmanager
+    async def session_factory():
+        yield object()
+
+    monkeypatch.setattr(UsersRepository, "stream_contact_rows", staticmethod(stream_contact_rows))
+    monkeypatch.setattr(UsersRepository, "fetch_by_tg_user_ids", staticmethod(fetch_by_tg_user_ids))
+
+    result = asyncio.run(reconcile_contacts_sheet(session_factory, service, structlog.get_logger("test")))
+
+    worksheet = spreadsheet.sheets[0]
+    assert result == SheetReconcileResult(updated=0, appended=0, deleted=1)
+    assert [row[2] for row in worksheet.rows[1:]] == ["1", "2", "4"]
+    assert worksheet.rows[2][8] == "Да"
@@ -0,0 +1,67 @@
+import json
+import logging
+import queue
+
+import pytest
+import structlog
+
+from app.logging_setup import (
+    LOG_RECORDS_DROPPED,
+    EventSampler,
+    _DeferredFormattingQueueHandler,
+    configure_logging,
+    flush_logging,
+    get_logger,
+)
+
+
+def test_sampler_keeps_one_in_n_and_every_warning() -> None:
+    sampler = EventSampler({"subscription_check_result": 3})
+    kept = 0
+    for _ in range(9):
+        try:
+            event = sampler(None, "info", {"event": "subscription_check_result"})
+        except structlog.DropEvent:
+            continue
+        kept += 1
+        assert event["sample_rate"] == 3
+
+    assert kept == 3
+    assert sampler(None, "warning", {"event": "subscription_check_result"}) == {"event": "subscription_check_result"}
+    assert sampler(None, "info", {"event": "other"}) == {"event": "other"}
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full() -> None:
+    handler = _DeferredFormattingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("t", logging.INFO, __file__, 1, {"event": "x"}, None, None)
+    dropped_before = LOG_RECORDS_DROPPED.labels().value
+
+    handler.emit(record)
+    handler.emit(record)
+
+    assert handler.queue.get_nowait() is record
+    assert record.msg == {"event": "x"}
+    assert LOG_RECORDS_DROPPED.labels().value == dropped_before + 1
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    flush_logging()
+    root.handlers, root.level = handlers, level
+    structlog.reset_defaults()
+
+
+def test_background_pipeline_writes_json_lines(capsys, restore_logging) -> None:
+    configure_logging("INFO", sampling={"noisy": 2}, json_encoder="json")
+    logger = get_logger("test")
+    for index in range(4):
+        logger.info("noisy", index=index)
+    logging.getLogger("aiohttp.access").info("GET /healthz %s", 200)
+    flush_logging()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["index"] for line in lines if line["event"] == "noisy"] == [0, 2]
+    assert {"event": "GET /healthz 200", "logger": "aiohttp.access", "level": "info"}.items() <= lines[-1].items()
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from app.loop_monitor import EVENT_LOOP_STALLS, EventLoopLagMonitor
+from app.services.admin_service import build_export_csv
+
+
+class _RecordingLogger:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    def warning(self, event: str, **kwargs: object) -> None:
+        self.events.append((event, kwargs))
+
+
+def blocking_handler(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_watchdog_logs_stack_of_blocking_callback_once_per_stall() -> None:
+    logger = _RecordingLogger()
+    stalls_before = EVENT_LOOP_STALLS.labels().value
+
+    async def handle_update() -> None:
+        blocking_handler(0.3)
+
+    async def scenario() -> None:
+        monitor = EventLoopLagMonitor(0.01, stall_threshold_seconds=0.05, logger=logger)  # type: ignore[arg-type]
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(handle_update(), name="update_worker")
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert [event for event, _ in logger.events] == ["event_loop_blocked"]
+    fields = logger.events[0][1]
+    assert fields["blocked_for_ms"] >= 50
+    assert fields["task"] == "update_worker"
+    assert any("in blocking_handler" in line for line in fields["stack"])
+    assert any("in handle_update" in line for line in fields["stack"])
+    assert EVENT_LOOP_STALLS.labels().value == stalls_before + 1
+
+
+def test_short_pauses_are_not_reported() -> None:
+    logger = _RecordingLogger()
+
+    async def scenario() -> None:
+        monitor = EventLoopLagMonitor(0.01, stall_threshold_seconds=0.2, logger=logger)  # type: ignore[arg-type]
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_handler(0.02)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert logger.events == []
+
+
+def test_export_csv_is_built_from_rows() -> None:
+    csv_bytes = build_export_csv([(1, None, 2, True, None)])
+
+    assert csv_bytes.decode("utf-8").splitlines() == [
+        "tg_user_id,username,referrals_confirmed,is_participant,created_at",
+        "1,,2,True,",
+    ]
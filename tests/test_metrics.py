@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.bot.instrumentation import HANDLER_LATENCY, HandlerMetricsMiddleware
+from app.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text_format() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("method",))
+    in_flight = registry.gauge("in_flight", "In flight.")
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    requests.labels("sendMessage").inc()
+    requests.labels("sendMessage").inc(2)
+    in_flight.set_function(lambda: 3)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render({"worker": "1"})
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{worker="1",method="sendMessage"} 3.0' in text
+    assert 'in_flight{worker="1"} 3.0' in text
+    assert 'latency_seconds_bucket{worker="1",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{worker="1",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{worker="1",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{worker="1"} 3' in text
+    assert text.endswith("\n")
+
+
+def test_labels_of_any_type_share_one_series() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events.", ("code",))
+
+    counter.labels(429).inc()
+    counter.labels("429").inc()
+
+    assert counter.children() == [(("429",), counter.labels(429))]
+    assert counter.labels("429").value == 2
+
+
+def test_label_values_are_escaped() -> None:
+    registry = MetricsRegistry()
+    registry.counter("errors_total", "Errors.", ("error",)).labels('bad "quote"\n').inc()
+
+    assert 'errors_total{error="bad \\"quote\\"\\n"} 1.0' in registry.render()
+
+
+def test_handler_middleware_times_by_handler_and_outcome() -> None:
+    class _Handler:
+        async def callback(self) -> None:
+            return None
+
+    async def failing(event: object, data: dict) -> None:
+        raise RuntimeError("boom")
+
+    async def ok(event: object, data: dict) -> str:
+        return "done"
+
+    middleware = HandlerMetricsMiddleware()
+    handler_object = type("HandlerObject", (), {"callback": _Handler().callback})()
+
+    assert asyncio.run(middleware(ok, object(), {"handler": handler_object})) == "done"
+    with pytest.raises(RuntimeError):
+        asyncio.run(middleware(failing, object(), {"handler": handler_object}))
+
+    assert HANDLER_LATENCY.labels("test_metrics.callback", "ok").count == 1
+    assert HANDLER_LATENCY.labels("test_metrics.callback", "error").count == 1
@@ -0,0 +1,246 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import structlog
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from app.db.enums import OutboxEventKind
+from app.db.models import OutboxEvent, User
+from app.repositories.outbox import OutboxRepository
+from app.repositories.users import UsersRepository
+from app.services.outbox_dispatcher import OutboxDispatcher, compute_outbox_retry_delay
+from app.services.subscription_service import build_referrer_notification_text
+from app.services.telegram_retry import TelegramCircuitOpenError
+from bench.common import scratch_schema
+
+
+def test_outbox_retry_delay_grows_exponentially() -> None:
+    assert compute_outbox_retry_delay(1, base_delay_seconds=5) == 5
+    assert compute_outbox_retry_delay(2, base_delay_seconds=5) == 10
+    assert compute_outbox_retry_delay(4, base_delay_seconds=5) == 40
+
+
+def test_outbox_retry_delay_is_capped() -> None:
+    assert compute_outbox_retry_delay(30, base_delay_seconds=5, max_delay_seconds=600) == 600
+
+
+def test_referrer_notification_text_depends_on_participation() -> None:
+    assert "участвуете в розыгрыше" in build_referrer_notification_text(True)
+    assert "подтвердите и свою подписку" in build_referrer_notification_text(False)
+
+
+class _FakeSession:
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+@asynccontextmanager
+async def _session_factory():
+    yield _FakeSession()
+
+
+class _FakeSheets:
+    def __init__(self, ok: bool = True) -> None:
+        self.ok = ok
+        self.upserts: list[list[int]] = []
+
+    def is_enabled(self) -> bool:
+        return True
+
+    def upsert_contacts(self, contacts) -> bool:
+        self.upserts.append([contact.tg_user_id for contact in contacts])
+        return self.ok
+
+
+class _FakeBot:
+    def __init__(self, errors: dict[int, Exception]) -> None:
+        self.errors = errors
+        self.sent: list[int] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        if chat_id in self.errors:
+            raise self.errors[chat_id]
+        self.sent.append(chat_id)
+
+
+def _event(event_id: int, kind: OutboxEventKind, attempts: int = 1, **payload) -> SimpleNamespace:
+    return SimpleNamespace(id=event_id, kind=kind, payload=payload, attempts=attempts)
+
+
+def _user(tg_user_id: int) -> User:
+    return User(
+        tg_user_id=tg_user_id,
+        username=None,
+        first_name="Ivan",
+        last_name=None,
+        contact_name="Ivan",
+        contact_phone="+79990000000",
+        is_subscribed=True,
+        is_participant=True,
+        referrals_confirmed=1,
+    )
+
+
+def _install_fake_outbox(monkeypatch, events: list) -> dict:
+    recorded: dict = {"claims": [], "done": [], "retry": [], "failed": []}
+
+    async def claim_batch(session, *, limit, lease_seconds):
+        recorded["claims"].append((limit, lease_seconds))
+        claimed, events[:] = events[:limit], events[limit:]
+        return claimed
+
+    async def mark_done(session, event_ids):
+        recorded["done"].extend(event_ids)
+
+    async def schedule_retry(session, event_ids, *, delay_seconds, error):
+        recorded["retry"].extend((event_id, delay_seconds, error) for event_id in event_ids)
+
+    async def mark_failed(session, event_ids, *, error):
+        recorded["failed"].extend((event_id, error) for event_id in event_ids)
+
+    async def fetch_by_tg_user_ids(session, tg_user_ids):
+        return [_user(tg_user_id) for tg_user_id in tg_user_ids]
+
+    monkeypatch.setattr(OutboxRepository, "claim_batch", staticmethod(claim_batch))
+    monkeypatch.setattr(OutboxRepository, "mark_done", staticmethod(mark_done))
+    monkeypatch.setattr(OutboxRepository, "schedule_retry", staticmethod(schedule_retry))
+    monkeypatch.setattr(OutboxRepository, "mark_failed", staticmethod(mark_failed))
+    monkeypatch.setattr(UsersRepository, "fetch_by_tg_user_ids", staticmethod(fetch_by_tg_user_ids))
+    return recorded
+
+
+def _dispatcher(sheets: _FakeSheets, bot: _FakeBot | None = None, **kwargs) -> OutboxDispatcher:
+    return OutboxDispatcher(
+        _session_factory,
+        bot or _FakeBot({}),
+        sheets,
+        structlog.get_logger("test"),
+        **kwargs,
+    )
+
+
+def test_duplicate_sheets_sync_events_collapse_into_one_upsert(monkeypatch) -> None:
+    events = [
+        _event(1, OutboxEventKind.SHEETS_SYNC, tg_user_id=10),
+        _event(2, OutboxEventKind.SHEETS_SYNC, tg_user_id=11),
+        _event(3, OutboxEventKind.SHEETS_SYNC, tg_user_id=10),
+    ]
+    recorded = _install_fake_outbox(monkeypatch, events)
+    sheets = _FakeSheets()
+
+    claimed = asyncio.run(_dispatcher(sheets, batch_size=50, lease_seconds=30).dispatch_once())
+
+    assert claimed == 3
+    assert recorded["claims"] == [(50, 30)]
+    assert sheets.upserts == [[10, 11]]
+    assert sorted(recorded["done"]) == [1, 2, 3]
+    assert recorded["retry"] == [] and recorded["failed"] == []
+
+
+def test_failed_sheets_sync_retries_with_backoff_then_goes_dead(monkeypatch) -> None:
+    events = [
+        _event(1, OutboxEventKind.SHEETS_SYNC, attempts=2, tg_user_id=10),
+        _event(2, OutboxEventKind.SHEETS_SYNC, attempts=8, tg_user_id=11),
+    ]
+    recorded = _install_fake_outbox(monkeypatch, events)
+
+    asyncio.run(_dispatcher(_FakeSheets(ok=False), max_attempts=8).dispatch_once())
+
+    assert recorded["done"] == []
+    assert recorded["retry"] == [(1, compute_outbox_retry_delay(2), "google_sheets_upsert_failed")]
+    assert recorded["failed"] == [(2, "google_sheets_upsert_failed")]
+
+
+def test_notifications_retry_transient_errors_and_drop_blocked_chats(monkeypatch) -> None:
+    events = [
+        _event(1, OutboxEventKind.REFERRER_NOTIFICATION, chat_id=20, text="hi"),
+        _event(2, OutboxEventKind.REFERRER_NOTIFICATION, chat_id=21),
+        _event(3, OutboxEventKind.REFERRER_NOTIFICATION, chat_id=22, text="hi"),
+    ]
+    recorded = _install_fake_outbox(monkeypatch, events)
+    bot = _FakeBot(
+        {
+            21: TelegramForbiddenError(method=SendMessage(chat_id=21, text=""), message="bot was blocked"),
+            22: TelegramCircuitOpenError(method=SendMessage(chat_id=22, text=""), message="circuit open"),
+        }
+    )
+
+    asyncio.run(_dispatcher(_FakeSheets(), bot).dispatch_once())
+
+    assert bot.sent == [20]
+    assert sorted(recorded["done"]) == [1, 2]
+    assert [(event_id, delay) for event_id, delay, _ in recorded["retry"]] == [(3, compute_outbox_retry_delay(1))]
+
+
+def test_claim_leases_due_pending_rows_with_skip_locked() -> None:
+    class _CapturingSession:
+        statement = None
+
+        async def execute(self, statement):
+            self.statement = statement
+            return SimpleNamespace(all=lambda: [])
+
+    session = _CapturingSession()
+    asyncio.run(OutboxRepository.claim_batch(session, limit=100, lease_seconds=120))
+
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE outbox_events SET attempts=(outbox_events.attempts + ")
+    assert "available_at=" in sql
+    assert "WHERE outbox_events.status = %(status_1)s AND outbox_events.available_at <= " in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "RETURNING outbox_events.id, outbox_events.kind, outbox_events.payload, outbox_events.attempts" in sql
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set")
+def test_claims_are_disjoint_and_expired_leases_are_reclaimed() -> None:
+    async def claim(session_factory, *, limit: int, lease_seconds: float, hold: asyncio.Event | None = None):
+        async with session_factory() as session:
+            async with session.begin():
+                rows = await OutboxRepository.claim_batch(session, limit=limit, lease_seconds=lease_seconds)
+                if hold is not None:
+                    await hold.wait()
+        return rows
+
+    async def scenario() -> None:
+        async with scratch_schema(os.environ["TEST_DATABASE_URL"]) as (engine, session_factory):
+            async with session_factory() as session:
+                async with session.begin():
+                    for tg_user_id in range(6):
+                        await OutboxRepository.enqueue(session, OutboxEventKind.SHEETS_SYNC, {"tg_user_id": tg_user_id})
+
+            # While the first claim's transaction holds its rows, a second one skips them.
+            hold = asyncio.Event()
+            first = asyncio.create_task(claim(session_factory, limit=4, lease_seconds=60, hold=hold))
+            await asyncio.sleep(0.2)
+            second = await claim(session_factory, limit=4, lease_seconds=60)
+            hold.set()
+            first_rows = await first
+            assert {row.id for row in first_rows}.isdisjoint({row.id for row in second})
+            assert len(first_rows) + len(second) == 6
+
+            # Leased rows are not due again until the lease runs out.
+            assert await claim(session_factory, limit=10, lease_seconds=60) == []
+
+            async with session_factory() as session:
+                async with session.begin():
+                    await session.execute(
+                        update(OutboxEvent).values(available_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+                    )
+                    await OutboxRepository.mark_done(session, [first_rows[0].id])
+                    await OutboxRepository.mark_failed(session, [first_rows[1].id], error="dead")
+
+            reclaimed = await claim(session_factory, limit=10, lease_seconds=60)
+            assert len(reclaimed) == 4
+            assert {row.attempts for row in reclaimed} == {2}
+            async with session_factory() as session:
+                assert await OutboxRepository.count_pending(session) == 4
+
+    asyncio.run(scenario())
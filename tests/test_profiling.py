@@ -0,0 +1,107 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import structlog
+
+from app.profiling import Profiler, ProfilerBusyError
+
+
+def busy_handler(deadline: float) -> int:
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def test_cpu_profile_samples_the_event_loop_thread() -> None:
+    async def scenario() -> None:
+        profiler = Profiler()
+
+        async def block_loop() -> None:
+            await asyncio.sleep(0.02)
+            busy_handler(time.perf_counter() + 0.2)
+
+        task = asyncio.create_task(block_loop())
+        report = await profiler.profile("cpu", 0.3, output="collapsed", interval_seconds=0.002)
+        await task
+
+        assert report.samples > 0
+        assert report.filename.endswith(".folded")
+        blocked = [line for line in report.text.splitlines() if "busy_handler" in line]
+        assert blocked
+        stack, count = blocked[0].rsplit(" ", 1)
+        assert stack.endswith("test_profiling:busy_handler")
+        assert int(count) > 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_profile_reports_growth_by_line() -> None:
+    async def scenario() -> None:
+        profiler = Profiler()
+        retained: list[bytes] = []
+
+        async def allocate() -> None:
+            await asyncio.sleep(0.02)
+            retained.extend(bytes(1024) for _ in range(2000))
+
+        task = asyncio.create_task(allocate())
+        report = await profiler.profile("memory", 0.2)
+        await task
+
+        assert "test_profiling.py" in report.text.splitlines()[3]
+        assert not profiler.running
+
+    asyncio.run(scenario())
+
+
+def test_only_one_profile_runs_at_a_time() -> None:
+    async def scenario() -> None:
+        profiler = Profiler()
+        first = asyncio.create_task(profiler.profile("cpu", 0.2))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(ProfilerBusyError):
+            await profiler.profile("memory", 0.1)
+
+        await first
+        assert not profiler.running
+
+    asyncio.run(scenario())
+
+
+def test_profile_command_replies_at_once_and_sends_the_report_later() -> None:
+    from app.bot.admin_jobs import ADMIN_JOBS
+    from app.bot.handlers.admin import handle_profile
+
+    documents: list[str] = []
+
+    async def send_document(chat_id: int, document) -> None:
+        documents.append(document.filename)
+
+    async def scenario() -> None:
+        message = SimpleNamespace(
+            text="/profile cpu 0.2",
+            from_user=SimpleNamespace(id=1),
+            chat=SimpleNamespace(id=1),
+            answer=lambda text: text,
+        )
+        bot = SimpleNamespace(send_document=send_document)
+        settings = SimpleNamespace(admin_ids=(1,))
+
+        started = time.perf_counter()
+        reply = await handle_profile(message, bot, settings, structlog.get_logger("test"))
+        assert time.perf_counter() - started < 0.1
+        assert reply == "Profiling cpu for 0s..."
+        assert await handle_profile(message, bot, settings, structlog.get_logger("test")) == (
+            "Another profile is already running, try again later."
+        )
+
+        while ADMIN_JOBS.running("profile"):
+            await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+
+    assert len(documents) == 1
@@ -0,0 +1,150 @@
+"""EXPLAIN checks for hot repository queries.
+
+Needs a scratch Postgres in ``TEST_DATABASE_URL``; tables are created in a
+throwaway schema, seeded with generate_series and analyzed before planning.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.repositories.outbox import OutboxRepository
+from app.repositories.referrals import ReferralsRepository
+from app.repositories.users import UsersRepository
+
+MIGRATION_PATH = Path(__file__).resolve().parents[1] / "alembic/versions/20261019_0003_add_hot_query_indexes.py"
+SEED_USERS = 50_000
+
+SEED_SQL = (
+    f"""
+    INSERT INTO users (tg_user_id, username, is_subscribed, is_participant, referrals_confirmed,
+                       contact_name, contact_phone)
+    SELECT i, 'user' || i, i % 10 = 0, i % 40 = 0, i % 7,
+           CASE WHEN i % 20 = 0 THEN 'Name ' || i END,
+           CASE WHEN i % 20 = 0 THEN '+7999' || i END
+    FROM generate_series(1, {SEED_USERS}) AS i
+    """,
+    f"""
+    INSERT INTO referrals (referrer_id, referral_id, status)
+    SELECT 1 + i % 100, i,
+           (CASE WHEN i % 10 = 0 THEN 'confirmed' ELSE 'pending' END)::referral_status
+    FROM generate_series(101, {SEED_USERS}) AS i
+    """,
+    """
+    INSERT INTO outbox_events (kind, payload, status)
+    SELECT 'sheets_sync'::outbox_event_kind, '{}'::jsonb,
+           (CASE WHEN i % 100 = 0 THEN 'pending' ELSE 'done' END)::outbox_status
+    FROM generate_series(1, 20000) AS i
+    """,
+)
+
+
+async def _consume_stream(session: AsyncSession) -> None:
+    async for _ in UsersRepository.stream_contact_rows(session):
+        pass
+
+
+HOT_QUERIES: dict[str, Callable[[AsyncSession], Awaitable[Any]]] = {
+    "fetch_basic_stats": UsersRepository.fetch_basic_stats,
+    "fetch_export_rows": UsersRepository.fetch_export_rows,
+    "fetch_all_tg_user_ids": UsersRepository.fetch_all_tg_user_ids,
+    "stream_contact_rows": _consume_stream,
+    "get_snapshot_by_tg_user_id": lambda session: UsersRepository.get_snapshot_by_tg_user_id(session, 4242),
+    "count_confirmed_referrals": ReferralsRepository.count_confirmed_referrals,
+    "count_pending_outbox": OutboxRepository.count_pending,
+}
+
+
+def _load_migration() -> Any:
+    spec = importlib.util.spec_from_file_location("hot_query_indexes", MIGRATION_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def _seq_scanned_relations(plan: dict[str, Any]) -> list[str]:
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scanned_relations(child))
+    return found
+
+
+def _needs_index(statement: str) -> bool:
+    # A bare COUNT over the whole table is legitimately a sequential scan.
+    upper = statement.upper()
+    return " WHERE " in upper or " ORDER BY " in upper
+
+
+def test_migration_matches_model_indexes() -> None:
+    migration = _load_migration()
+    migration_indexes = {name for name, *_ in migration.INDEXES}
+    replaced_indexes = {name for name, *_ in migration.REPLACED_INDEXES}
+    model_indexes = {index.name for table in Base.metadata.tables.values() for index in table.indexes}
+
+    assert migration_indexes <= model_indexes
+    assert not replaced_indexes & model_indexes
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set")
+@pytest.mark.parametrize("query_name", sorted(HOT_QUERIES))
+def test_hot_query_avoids_sequential_scan(query_name: str) -> None:
+    async def scenario() -> list[tuple[str, list[str]]]:
+        database_url = os.environ["TEST_DATABASE_URL"]
+        schema = f"plans_{uuid.uuid4().hex[:12]}"
+        admin_engine = create_async_engine(database_url, isolation_level="AUTOCOMMIT")
+        async with admin_engine.connect() as connection:
+            await connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+
+        engine = create_async_engine(database_url, connect_args={"server_settings": {"search_path": schema}})
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                for statement in SEED_SQL:
+                    await connection.execute(text(statement))
+            async with engine.connect() as connection:
+                autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+                # VACUUM sets the visibility map so index-only scans are costed realistically.
+                await autocommit.execute(text("VACUUM ANALYZE"))
+
+            captured: list[tuple[str, Any]] = []
+
+            def capture(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool) -> None:
+                captured.append((statement, parameters))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+                await HOT_QUERIES[query_name](session)
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            plans = []
+            async with engine.connect() as connection:
+                for statement, parameters in captured:
+                    if not _needs_index(statement):
+                        continue
+                    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                    raw = result.scalar_one()
+                    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                    plans.append((statement, _seq_scanned_relations(plan)))
+            return plans
+        finally:
+            await engine.dispose()
+            async with admin_engine.connect() as connection:
+                await connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+            await admin_engine.dispose()
+
+    plans = asyncio.run(scenario())
+
+    assert plans, f"{query_name} issued no indexable statements"
+    for statement, seq_scans in plans:
+        assert not seq_scans, f"{query_name} sequentially scans {seq_scans}:\n{statement}"
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+import structlog
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from app.bot.rate_limiter import OutboundRateLimiter, RequestPriority, TokenBucket, request_priority
+
+
+def _limiter(**kwargs) -> OutboundRateLimiter:
+    return OutboundRateLimiter(structlog.get_logger("test"), **kwargs)
+
+
+def test_waiting_requests_are_granted_by_priority() -> None:
+    order: list[str] = []
+
+    async def make_request(bot, method):
+        order.append(method.text)
+
+    async def send(limiter, priority: RequestPriority, label: str) -> None:
+        with request_priority(priority):
+            await limiter(make_request, None, SendMessage(chat_id=hash(label) % 1000 + 1, text=label))
+
+    async def scenario() -> None:
+        limiter = _limiter(global_rate=20.0)
+        limiter._global.tokens = 0
+        await asyncio.gather(
+            send(limiter, RequestPriority.BULK, "bulk"),
+            send(limiter, RequestPriority.NOTIFICATION, "notification"),
+            send(limiter, RequestPriority.INTERACTIVE, "interactive"),
+        )
+
+    asyncio.run(scenario())
+    assert order == ["interactive", "notification", "bulk"]
+
+
+def test_non_sending_methods_bypass_the_limiter() -> None:
+    calls: list[str] = []
+
+    async def make_request(bot, method):
+        calls.append(method.__api_method__)
+
+    async def scenario() -> None:
+        limiter = _limiter(global_rate=1.0)
+        limiter._global.tokens = -100
+        await asyncio.wait_for(limiter(make_request, None, GetMe()), timeout=1)
+
+    asyncio.run(scenario())
+    assert calls == ["getMe"]
+
+
+def test_retry_after_pauses_chat_and_slows_global_rate() -> None:
+    async def make_request(bot, method):
+        raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=5)
+
+    async def scenario() -> OutboundRateLimiter:
+        limiter = _limiter(global_rate=30.0)
+        with pytest.raises(TelegramRetryAfter):
+            await limiter(make_request, None, SendMessage(chat_id=42, text="hi"))
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter._global.rate == 15.0
+    assert limiter._chats[42].tokens < 0
+
+
+def test_token_bucket_reserve_slot_spaces_requests() -> None:
+    bucket = TokenBucket(rate=1.0, capacity=1.0)
+    now = bucket._updated_at
+
+    assert bucket.reserve_slot(now) == 0.0
+    assert bucket.reserve_slot(now) == pytest.approx(1.0)
+    assert bucket.reserve_slot(now) == pytest.approx(2.0)
+
+
+def test_try_acquire_debits_both_buckets_and_never_goes_into_debt() -> None:
+    limiter = _limiter(global_rate=30.0, chat_burst=2.0)
+    reply = SendMessage(chat_id=42, text="hi")
+
+    assert limiter.try_acquire(reply) is True
+    assert limiter.try_acquire(reply) is True
+    assert limiter.try_acquire(reply) is False
+    assert limiter._chats[42].tokens == pytest.approx(0.0, abs=0.01)
+    assert limiter._global.tokens == pytest.approx(28.0, abs=0.1)
+    assert limiter.try_acquire(GetMe()) is True
+
+    limiter._global.tokens = 0
+    assert limiter.try_acquire(SendMessage(chat_id=43, text="hi")) is False
+    assert limiter._chats[43].tokens == pytest.approx(2.0)
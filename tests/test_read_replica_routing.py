@@ -0,0 +1,29 @@
+import inspect
+
+from app.db.session import create_read_session_factory, is_replica_safe
+from app.repositories.referrals import ReferralsRepository
+from app.repositories.users import UsersRepository
+
+
+def test_read_factory_falls_back_to_primary_without_read_url() -> None:
+    primary = object()
+    engine, factory = create_read_session_factory(None, primary)
+    assert engine is None
+    assert factory is primary
+
+
+def test_only_lock_free_reads_are_marked_replica_safe() -> None:
+    safe = {
+        f"{repository.__name__}.{name}"
+        for repository in (UsersRepository, ReferralsRepository)
+        for name, member in inspect.getmembers(repository, inspect.isfunction)
+        if is_replica_safe(member)
+    }
+
+    assert safe == {
+        "UsersRepository.get_snapshot_by_tg_user_id",
+        "UsersRepository.fetch_basic_stats",
+        "UsersRepository.fetch_export_rows",
+        "UsersRepository.fetch_all_tg_user_ids",
+        "ReferralsRepository.count_confirmed_referrals",
+    }
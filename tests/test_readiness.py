@@ -0,0 +1,138 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import structlog
+
+from app.readiness import ReadinessMonitor
+from app.repositories.outbox import OutboxRepository
+
+
+class _FakeSession:
+    def __init__(self, calls: dict) -> None:
+        self.calls = calls
+
+    async def execute(self, statement):
+        self.calls["execute"] += 1
+        await asyncio.sleep(self.calls["db_delay"])
+
+
+class _FakeBot:
+    def __init__(self) -> None:
+        self.fail = False
+        self.request_timeouts: list[int | None] = []
+
+    async def get_me(self, request_timeout: int | None = None):
+        self.request_timeouts.append(request_timeout)
+        if self.fail:
+            raise ConnectionError("network down")
+        return SimpleNamespace(username="bot")
+
+
+class _FakeUpdateQueue:
+    def __init__(self) -> None:
+        self.depth = 0
+
+    def stats(self) -> dict:
+        return {"depth": self.depth, "capacity": 100}
+
+
+def _monitor(calls: dict, *, in_use: list[int], bot=None, update_queue=None, **kwargs) -> ReadinessMonitor:
+    @asynccontextmanager
+    async def session_factory():
+        yield _FakeSession(calls)
+
+    engine = SimpleNamespace(sync_engine=SimpleNamespace(pool=SimpleNamespace(checkedout=lambda: in_use[0])))
+    return ReadinessMonitor(
+        session_factory,  # type: ignore[arg-type]
+        engine,  # type: ignore[arg-type]
+        bot or _FakeBot(),  # type: ignore[arg-type]
+        structlog.get_logger("test"),
+        pool_capacity=10,
+        update_queue=update_queue,  # type: ignore[arg-type]
+        **kwargs,
+    )
+
+
+def test_probes_read_the_snapshot_without_touching_the_database() -> None:
+    calls = {"execute": 0, "db_delay": 0.0}
+
+    async def scenario() -> None:
+        monitor = _monitor(calls, in_use=[2])
+        ready, payload = monitor.snapshot()
+        assert not ready
+        assert payload["stale"] is True
+
+        await monitor.refresh_shallow()
+        for _ in range(100):
+            ready, payload = monitor.snapshot()
+
+        assert ready
+        assert calls["execute"] == 1
+        assert payload["tier"] == "shallow"
+        assert payload["checks"]["db_pool"] == {"ok": True, "value": 0.2, "threshold": 0.9}
+
+    asyncio.run(scenario())
+
+
+def test_thresholds_mark_the_instance_not_ready_before_it_fails() -> None:
+    calls = {"execute": 0, "db_delay": 0.0}
+    in_use = [2]
+    update_queue = _FakeUpdateQueue()
+
+    async def scenario() -> None:
+        monitor = _monitor(calls, in_use=in_use, update_queue=update_queue, db_latency_threshold_seconds=0.05)
+        await monitor.refresh_shallow()
+        assert monitor.snapshot()[0]
+
+        in_use[0] = 10
+        await monitor.refresh_shallow()
+        ready, payload = monitor.snapshot()
+        assert not ready
+        assert not payload["checks"]["db_pool"]["ok"]
+
+        in_use[0] = 2
+        update_queue.depth = 95
+        calls["db_delay"] = 0.06
+        await monitor.refresh_shallow()
+        ready, payload = monitor.snapshot()
+        assert not ready
+        assert not payload["checks"]["database"]["ok"]
+        assert not payload["checks"]["update_queue"]["ok"]
+        assert payload["update_queue"]["depth"] == 95
+
+    asyncio.run(scenario())
+
+
+def test_deep_tier_adds_bot_api_and_sheets_backlog(monkeypatch) -> None:
+    calls = {"execute": 0, "db_delay": 0.0}
+    pending = {"value": 10}
+
+    async def count_pending(session, kind=None):
+        return pending["value"]
+
+    monkeypatch.setattr(OutboxRepository, "count_pending", staticmethod(count_pending))
+
+    async def scenario() -> None:
+        bot = _FakeBot()
+        monitor = _monitor(calls, in_use=[0], bot=bot, sheets_enabled=True, sheets_backlog_threshold=100)
+        await monitor.refresh_shallow()
+        await monitor.refresh_deep()
+
+        ready, payload = monitor.snapshot(deep=True)
+        assert ready
+        assert set(payload["checks"]) == {"database", "db_pool", "bot_api", "sheets_backlog"}
+        # Bounded by the HTTP timeout so a hang surfaces as a network error, not a cancellation.
+        assert bot.request_timeouts == [5]
+
+        bot.fail = True
+        pending["value"] = 500
+        await monitor.refresh_deep()
+        ready, payload = monitor.snapshot(deep=True)
+        assert not ready
+        assert payload["checks"]["bot_api"]["error"] == "ConnectionError"
+        assert not payload["checks"]["sheets_backlog"]["ok"]
+        # The shallow tier, used for load balancer rotation, does not depend on Telegram.
+        assert monitor.snapshot()[0]
+
+    asyncio.run(scenario())
@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+import structlog
+from sqlalchemy.dialects import postgresql
+
+from app.db.enums import OutboxEventKind
+from app.db.models import User
+from app.repositories.outbox import OutboxRepository
+from app.repositories.referrals import ReferralsRepository
+from app.repositories.users import UsersRepository
+from app.services.participation_service import participant_after_referral_expression
+from app.services.subscription_service import confirm_subscription_and_referral
+
+
+class _CapturingSession:
+    def __init__(self) -> None:
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        return _EmptyResult()
+
+
+class _EmptyResult:
+    def one_or_none(self):
+        return None
+
+
+def test_referral_increment_is_a_single_atomic_update() -> None:
+    session = _CapturingSession()
+    row = asyncio.run(
+        UsersRepository.increment_referrals_confirmed(
+            session,
+            42,
+            is_participant=participant_after_referral_expression(),
+        )
+    )
+
+    sql = str(session.statement.compile(dialect=postgresql.dialect()))
+    assert row is None
+    assert sql.startswith("UPDATE users SET referrals_confirmed=(users.referrals_confirmed + ")
+    assert "is_participant=(users.is_participant OR users.is_subscribed AND" in sql
+    assert "RETURNING users.referrals_confirmed, users.is_participant" in sql
+    assert "FOR UPDATE" not in sql
+
+
+class _FakeSession:
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+@asynccontextmanager
+async def _session_factory():
+    yield _FakeSession()
+
+
+@pytest.mark.parametrize("referrer_exists", [True, False])
+def test_referral_side_effects_are_enqueued_only_when_counted(monkeypatch, referrer_exists: bool) -> None:
+    enqueued: list = []
+
+    async def get_by_tg_user_id(session, tg_user_id, *, for_update=False):
+        return User(tg_user_id=tg_user_id, is_subscribed=False, is_participant=False, referrals_confirmed=0)
+
+    async def confirm_pending_referral(session, tg_user_id):
+        return 7
+
+    async def increment_referrals_confirmed(session, tg_user_id, *, is_participant):
+        return SimpleNamespace(referrals_confirmed=1, is_participant=False) if referrer_exists else None
+
+    async def enqueue_many(session, events):
+        enqueued.extend(events)
+
+    monkeypatch.setattr(UsersRepository, "get_by_tg_user_id", staticmethod(get_by_tg_user_id))
+    monkeypatch.setattr(ReferralsRepository, "confirm_pending_referral", staticmethod(confirm_pending_referral))
+    monkeypatch.setattr(UsersRepository, "increment_referrals_confirmed", staticmethod(increment_referrals_confirmed))
+    monkeypatch.setattr(OutboxRepository, "enqueue_many", staticmethod(enqueue_many))
+
+    result = asyncio.run(confirm_subscription_and_referral(_session_factory, 42, structlog.get_logger("test")))
+
+    if referrer_exists:
+        assert result.referrer_to_notify == 7
+        assert [kind for kind, _ in enqueued] == [OutboxEventKind.REFERRER_NOTIFICATION, OutboxEventKind.SHEETS_SYNC]
+    else:
+        assert result.referrer_to_notify is None
+        assert enqueued == []
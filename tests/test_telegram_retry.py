@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+import structlog
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import GetMe
+
+from app.services.telegram_retry import (
+    CircuitBreaker,
+    CircuitBreakerMiddleware,
+    CircuitState,
+    RetryBudget,
+    TelegramCircuitOpenError,
+    decorrelated_jitter_delay,
+    run_with_retry,
+)
+
+
+def _network_error() -> TelegramNetworkError:
+    return TelegramNetworkError(method=GetMe(), message="connection reset")
+
+
+def test_decorrelated_jitter_stays_within_bounds() -> None:
+    for previous in (0.1, 1.0, 4.0, 100.0):
+        delay = decorrelated_jitter_delay(previous, 0.5, 10.0)
+        assert 0.5 <= delay <= min(10.0, max(0.5, previous * 3))
+
+
+def test_retry_budget_limits_retries() -> None:
+    budget = RetryBudget(ratio=0.5, min_retries_per_second=0.0, max_tokens=2.0)
+    budget._tokens = 0.0
+    budget.record_call()
+    assert budget.try_spend() is False
+    budget.record_call()
+    assert budget.try_spend() is True
+
+
+def test_exhausted_budget_stops_retrying() -> None:
+    calls = 0
+
+    async def operation() -> None:
+        nonlocal calls
+        calls += 1
+        raise _network_error()
+
+    budget = RetryBudget(ratio=0.0, min_retries_per_second=0.0, max_tokens=0.0)
+    with pytest.raises(TelegramNetworkError):
+        asyncio.run(run_with_retry(operation, attempts=5, base_delay_seconds=0.0, budget=budget))
+    assert calls == 1
+
+
+def test_open_circuit_is_not_retried() -> None:
+    calls = 0
+
+    async def operation() -> None:
+        nonlocal calls
+        calls += 1
+        raise TelegramCircuitOpenError(method=GetMe(), message="circuit open")
+
+    with pytest.raises(TelegramCircuitOpenError):
+        asyncio.run(run_with_retry(operation, attempts=5, base_delay_seconds=0.0))
+    assert calls == 1
+
+
+def test_circuit_breaker_opens_and_probes_after_recovery() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=10.0)
+    breaker.record_failure(now=0.0)
+    assert breaker.allow(now=0.0) is True
+    breaker.record_failure(now=1.0)
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.allow(now=5.0) is False
+    assert breaker.allow(now=11.0) is True
+    assert breaker.allow(now=11.0) is False
+
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+
+
+def test_probe_lease_expires_when_the_probe_never_reports_back() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=10.0)
+    breaker.record_failure(now=0.0)
+
+    assert breaker.allow(now=10.0) is True
+    assert breaker.allow(now=15.0) is False
+    assert breaker.allow(now=20.0) is True
+
+
+def test_cancelled_probe_reopens_the_circuit_instead_of_wedging_it() -> None:
+    middleware = CircuitBreakerMiddleware(structlog.get_logger("test"), failure_threshold=1, recovery_seconds=0.05)
+    breaker = middleware.breaker("getMe")
+    breaker.record_failure(now=time.monotonic())
+
+    async def hanging_request(bot: object, method: object) -> object:
+        await asyncio.sleep(10)
+
+    async def answering_request(bot: object, method: object) -> str:
+        return "ok"
+
+    async def scenario() -> None:
+        await asyncio.sleep(0.06)
+        probe = asyncio.create_task(middleware(hanging_request, None, GetMe()))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert breaker.state is CircuitState.OPEN
+
+        with pytest.raises(TelegramCircuitOpenError):
+            await middleware(answering_request, None, GetMe())
+        await asyncio.sleep(0.06)
+        assert await middleware(answering_request, None, GetMe()) == "ok"
+        assert breaker.state is CircuitState.CLOSED
+
+    asyncio.run(scenario())
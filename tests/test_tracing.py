@@ -0,0 +1,146 @@
+import asyncio
+import json
+from pathlib import Path
+
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import SendMessage
+
+from app.db.session import is_replica_safe
+from app.repositories.users import UsersRepository
+from app.services.telegram_retry import RetryBudget, run_with_retry
+from app.tracing import FileTraceExporter, Trace, TraceExporter, Tracer, otlp_json, span, traced
+
+
+class _RecordingLogger:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    def warning(self, event: str, **kwargs: object) -> None:
+        self.events.append((event, kwargs))
+
+
+class _RecordingExporter(TraceExporter):
+    def __init__(self) -> None:
+        super().__init__(_RecordingLogger())  # type: ignore[arg-type]
+        self.traces: list[Trace] = []
+
+    def submit(self, trace: Trace) -> None:
+        self.traces.append(trace)
+
+
+@traced("service.step")
+async def _service_step() -> None:
+    with span("telegram.getChatMember"):
+        await asyncio.sleep(0)
+
+
+def _run_trace(tracer: Tracer) -> Trace:
+    async def scenario() -> Trace:
+        with tracer.trace("update.callback_query", update_id=7) as trace:
+            await asyncio.gather(_service_step(), _service_step())
+        return trace
+
+    return asyncio.run(scenario())
+
+
+def test_run_with_retry_groups_its_attempts_under_one_span() -> None:
+    tracer = Tracer()
+    tracer.configure(_RecordingLogger(), slow_threshold_seconds=60, sample_ratio=1.0)  # type: ignore[arg-type]
+    failures = [TelegramNetworkError(method=SendMessage(chat_id=1, text="hi"), message="connection reset")]
+
+    async def send_message() -> str:
+        with span("telegram.sendMessage"):
+            await asyncio.sleep(0)
+            if failures:
+                raise failures.pop()
+        return "sent"
+
+    async def scenario() -> Trace:
+        with tracer.trace("update.message") as trace:
+            budget = RetryBudget(ratio=1.0, min_retries_per_second=0.0, max_tokens=1.0)
+            assert await run_with_retry(send_message, base_delay_seconds=0.0, budget=budget) == "sent"
+        return trace
+
+    trace = asyncio.run(scenario())
+
+    root, retry, *attempts = trace.spans
+    assert retry.name == "telegram.retry" and retry.parent_id == root.span_id
+    assert retry.attributes == {"operation": "send_message"}
+    assert [item.name for item in attempts] == ["telegram.sendMessage"] * 2
+    assert {item.parent_id for item in attempts} == {retry.span_id}
+    assert retry.start_ns <= attempts[0].start_ns and attempts[-1].end_ns <= retry.end_ns
+
+
+def test_spans_nest_under_the_update_trace_and_encode_as_otlp() -> None:
+    tracer = Tracer()
+    tracer.configure(_RecordingLogger(), slow_threshold_seconds=60, sample_ratio=1.0)  # type: ignore[arg-type]
+
+    trace = _run_trace(tracer)
+
+    root, *children = trace.spans
+    by_id = {item.span_id: item for item in trace.spans}
+    assert [item.name for item in children].count("service.step") == 2
+    for child in children:
+        parent = by_id[child.parent_id]
+        expected_parent = "service.step" if child.name.startswith("telegram.") else root.name
+        assert parent.name == expected_parent
+        assert root.start_ns <= child.start_ns <= child.end_ns <= root.end_ns
+
+    payload = otlp_json([trace])
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 5
+    assert {item["traceId"] for item in spans} == {trace.trace_id}
+    assert len(trace.trace_id) == 32 and len(root.span_id) == 16
+    assert "parentSpanId" not in spans[0]
+    assert spans[0]["attributes"] == [{"key": "update_id", "value": {"intValue": "7"}}]
+
+
+def test_slow_traces_are_summarized_and_always_exported() -> None:
+    logger = _RecordingLogger()
+    exporter = _RecordingExporter()
+    tracer = Tracer()
+    tracer.configure(logger, slow_threshold_seconds=0.0, sample_ratio=0.0, exporters=[exporter])  # type: ignore[arg-type]
+
+    trace = _run_trace(tracer)
+
+    assert exporter.traces == [trace]
+    event, fields = logger.events[0]
+    assert event == "slow_trace"
+    assert fields["trace"] == "update.callback_query"
+    assert fields["spans"][0].startswith("update.callback_query=")
+
+
+def test_fast_traces_follow_the_sample_ratio() -> None:
+    logger = _RecordingLogger()
+    exporter = _RecordingExporter()
+    tracer = Tracer()
+    tracer.configure(logger, slow_threshold_seconds=60, sample_ratio=0.0, exporters=[exporter])  # type: ignore[arg-type]
+
+    _run_trace(tracer)
+
+    assert exporter.traces == []
+    assert logger.events == []
+
+
+def test_file_exporter_writes_one_otlp_request_per_line(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer()
+    tracer.configure(_RecordingLogger(), slow_threshold_seconds=60, sample_ratio=0.0)  # type: ignore[arg-type]
+    trace = _run_trace(tracer)
+
+    async def scenario() -> None:
+        exporter = FileTraceExporter(path, _RecordingLogger())  # type: ignore[arg-type]
+        exporter.submit(trace)
+        exporter.submit(trace)
+        await exporter.stop()
+
+    asyncio.run(scenario())
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    assert len(json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]) == 10
+
+
+def test_repository_methods_get_spans_and_keep_their_markers() -> None:
+    assert UsersRepository.fetch_basic_stats.__wrapped__ is not None
+    assert is_replica_safe(UsersRepository.fetch_basic_stats)
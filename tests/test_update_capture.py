@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+import structlog
+
+from app.web.update_capture import UpdateAnonymizer, UpdateRecorder, update_capture_middleware
+from bench.replay import load_captures, update_kind
+
+
+def _start_update(update_id: int, user_id: int, text: str) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Иван", "username": "ivan_petrov"}
+    return {
+        "update_id": update_id,
+        "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "from": user, "text": text},
+    }
+
+
+def test_anonymizer_keeps_identity_links_but_not_personal_data() -> None:
+    anonymizer = UpdateAnonymizer(b"secret")
+    referrer = anonymizer.anonymize(_start_update(1, 111, "/start"))
+    referred = anonymizer.anonymize(_start_update(2, 222, "/start 111"))
+    contact = anonymizer.anonymize(
+        {
+            "update_id": 3,
+            "message": {
+                "chat": {"id": -1001234567890, "type": "supergroup", "title": "Секретный чат"},
+                "contact": {"phone_number": "+79991234567", "first_name": "Иван", "user_id": 222},
+                "text": "Иван Петров",
+            },
+        }
+    )
+
+    referrer_id = referrer["message"]["from"]["id"]
+    assert referrer_id != 111
+    assert referrer["message"]["chat"]["id"] == referrer_id
+    assert referred["message"]["text"] == f"/start {referrer_id}"
+    assert referred["message"]["from"]["username"] == "username_11"
+    assert contact["message"]["contact"] == {
+        "phone_number": "phone_number_12",
+        "first_name": "first_name_4",
+        "user_id": referred["message"]["from"]["id"],
+    }
+    assert contact["message"]["chat"]["id"] == -1001234567890
+    assert contact["message"]["chat"]["title"] == "title_13"
+    assert contact["message"]["text"] == "x" * len("Иван Петров")
+    assert "Иван" not in json.dumps([referrer, referred, contact], ensure_ascii=False)
+
+
+def test_recorder_rotates_and_replay_merges_files_by_arrival(tmp_path) -> None:
+    first = tmp_path / "updates.jsonl.gz"
+    second = tmp_path / "updates.jsonl.gz.worker1"
+
+    async def scenario() -> None:
+        recorder = UpdateRecorder(first, structlog.get_logger("test"), max_bytes=1, backup_count=2)
+        other = UpdateRecorder(second, structlog.get_logger("test"))
+        for index in range(3):
+            recorder.record(json.dumps(_start_update(index, 1, "/start")).encode(), arrived_at=10.0 + index * 2)
+            await recorder.flush()
+        other.record(json.dumps(_start_update(9, 2, "hi")).encode(), arrived_at=11.0)
+        other.record(b"not json", arrived_at=12.0)
+        await other.flush()
+
+    asyncio.run(scenario())
+
+    rotated = sorted(path.name for path in tmp_path.iterdir())
+    assert rotated == ["updates.jsonl.gz", "updates.jsonl.gz.1", "updates.jsonl.gz.2", "updates.jsonl.gz.worker1"]
+
+    paths = [str(tmp_path / name) for name in rotated]
+    updates = load_captures(paths)
+    assert [arrived_at for arrived_at, _ in updates] == [10.0, 11.0, 12.0, 14.0]
+    assert [update_kind(update) for _, update in updates] == [
+        "message:/start",
+        "message:text",
+        "message:/start",
+        "message:/start",
+    ]
+
+
+def test_middleware_records_only_authenticated_webhook_posts() -> None:
+    async def scenario() -> None:
+        recorder = UpdateRecorder("unused", structlog.get_logger("test"))
+
+        async def webhook(request: web.Request) -> web.Response:
+            await request.json()
+            if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != "secret":
+                return web.Response(status=401)
+            return web.json_response({})
+
+        async def healthz(_: web.Request) -> web.Response:
+            return web.json_response({})
+
+        app = web.Application(middlewares=[update_capture_middleware(recorder)])
+        app.router.add_post("/webhook", webhook)
+        app.router.add_get("/healthz", healthz)
+
+        async with TestClient(TestServer(app)) as client:
+            await client.post("/webhook", json={"update_id": 1}, headers={"X-Telegram-Bot-Api-Secret-Token": "secret"})
+            await client.post("/webhook", json={"update_id": 2})
+            await client.get("/healthz")
+
+        assert recorder._queue.qsize() == 1
+        _, body = recorder._queue.get_nowait()
+        assert json.loads(body) == {"update_id": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,285 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import structlog
+from aiogram.methods import SendMessage
+
+from app.web.update_queue import (
+    QueuedRequestHandler,
+    UpdateQueue,
+    UpdateQueueFull,
+    extract_update_partition_key,
+)
+
+
+def _message_update(update_id: int, user_id: int) -> dict:
+    return {"update_id": update_id, "message": {"from": {"id": user_id}, "chat": {"id": user_id}}}
+
+
+def test_partition_key_prefers_user_then_chat_then_update() -> None:
+    assert extract_update_partition_key(_message_update(1, 42)) == 42
+    assert extract_update_partition_key({"update_id": 2, "callback_query": {"from": {"id": 7}}}) == 7
+    assert extract_update_partition_key({"update_id": 3, "channel_post": {"chat": {"id": -100}}}) == 3
+
+
+def test_updates_of_one_user_are_processed_in_order() -> None:
+    processed: list[tuple[int, int]] = []
+
+    async def process(update: dict) -> None:
+        user_id = update["message"]["from"]["id"]
+        # Earlier updates sleep longer: only per-user serialization keeps them ordered.
+        await asyncio.sleep(0.01 * (5 - update["update_id"] % 5))
+        processed.append((user_id, update["update_id"]))
+
+    async def scenario() -> None:
+        queue = UpdateQueue(process, structlog.get_logger("test"), workers=4, max_size=100)
+        queue.start()
+        for update_id in range(10):
+            await queue.submit(_message_update(update_id, 100 + update_id % 2))
+        await queue.stop()
+        assert queue.stats()["processed"] == 10
+
+    asyncio.run(scenario())
+
+    for user_id in (100, 101):
+        ids = [update_id for uid, update_id in processed if uid == user_id]
+        assert ids == sorted(ids)
+
+
+def test_full_partition_rejects_after_timeout() -> None:
+    release = asyncio.Event()
+
+    async def process(update: dict) -> None:
+        await release.wait()
+
+    async def scenario() -> None:
+        nonlocal release
+        release = asyncio.Event()
+        queue = UpdateQueue(process, structlog.get_logger("test"), workers=1, max_size=1, put_timeout_seconds=0.05)
+        queue.start()
+        await queue.submit(_message_update(1, 1))
+        await asyncio.sleep(0)
+        await queue.submit(_message_update(2, 1))
+        with pytest.raises(UpdateQueueFull):
+            await queue.submit(_message_update(3, 1))
+        assert queue.stats()["rejected"] == 1
+        release.set()
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+class _FakeDispatcher:
+    def __init__(self, result, delay: float) -> None:
+        self.result = result
+        self.delay = delay
+        self.sent: list = []
+
+    async def feed_raw_update(self, bot, update, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self.result
+
+    async def silent_call_request(self, bot, result):
+        self.sent.append(result)
+
+
+def _handler(dispatcher: _FakeDispatcher, reply_timeout: float) -> QueuedRequestHandler:
+    return QueuedRequestHandler(
+        dispatcher,
+        SimpleNamespace(),
+        structlog.get_logger("test"),
+        reply_timeout_seconds=reply_timeout,
+    )
+
+
+def test_slow_handler_times_out_and_frees_its_partition() -> None:
+    processed: list[int] = []
+
+    async def process(update: dict) -> None:
+        if update["update_id"] == 1:
+            await asyncio.sleep(10)
+        processed.append(update["update_id"])
+
+    async def scenario() -> UpdateQueue:
+        queue = UpdateQueue(
+            process, structlog.get_logger("test"), workers=1, max_size=10, handler_timeout_seconds=0.05
+        )
+        queue.start()
+        await queue.submit(_message_update(1, 1))
+        await queue.submit(_message_update(2, 17))
+        await asyncio.wait_for(queue.stop(), 1.0)
+        return queue
+
+    queue = asyncio.run(scenario())
+
+    assert processed == [2]
+    assert queue.stats()["timed_out"] == 1
+
+
+def test_fast_reply_is_handed_to_the_webhook_response() -> None:
+    reply = SendMessage(chat_id=1, text="hi")
+    dispatcher = _FakeDispatcher(reply, delay=0)
+
+    async def scenario():
+        handler = _handler(dispatcher, reply_timeout=1.0)
+        waiter = asyncio.get_running_loop().create_future()
+        handler._reply_waiters[5] = waiter
+        await handler._process_update({"update_id": 5})
+        return waiter.result()
+
+    assert asyncio.run(scenario()) is reply
+    assert dispatcher.sent == []
+
+
+def test_slow_reply_is_sent_by_the_worker() -> None:
+    reply = SendMessage(chat_id=1, text="hi")
+    dispatcher = _FakeDispatcher(reply, delay=0)
+
+    async def scenario() -> None:
+        handler = _handler(dispatcher, reply_timeout=1.0)
+        waiter = asyncio.get_running_loop().create_future()
+        handler._reply_waiters[5] = waiter
+        waiter.cancel()
+        await handler._process_update({"update_id": 5})
+
+    asyncio.run(scenario())
+    assert dispatcher.sent == [reply]
+
+
+def test_reply_over_the_rate_limit_is_sent_through_the_session() -> None:
+    from app.bot.rate_limiter import OutboundRateLimiter
+
+    reply = SendMessage(chat_id=1, text="hi")
+    dispatcher = _FakeDispatcher(reply, delay=0)
+
+    async def scenario() -> list:
+        limiter = OutboundRateLimiter(structlog.get_logger("test"), chat_burst=1.0)
+        handler = QueuedRequestHandler(
+            dispatcher,
+            SimpleNamespace(),
+            structlog.get_logger("test"),
+            reply_timeout_seconds=1.0,
+            rate_limiter=limiter,
+        )
+        results = []
+        for update_id in (5, 6):
+            waiter = asyncio.get_running_loop().create_future()
+            handler._reply_waiters[update_id] = waiter
+            await handler._process_update({"update_id": update_id})
+            results.append(waiter.result())
+        return results
+
+    # The chat bucket holds one token: the second reply goes through the session and waits there.
+    assert asyncio.run(scenario()) == [reply, None]
+    assert dispatcher.sent == [reply]
+
+
+def test_broadcast_does_not_stall_other_users_in_its_partition(monkeypatch) -> None:
+    from app.bot.admin_jobs import ADMIN_JOBS
+    from app.bot.handlers import admin
+
+    processed: list[int] = []
+    reports: list[str] = []
+
+    async def scenario() -> None:
+        release = asyncio.Event()
+
+        async def slow_broadcast(**kwargs) -> SimpleNamespace:
+            await release.wait()
+            return SimpleNamespace(delivered=2, failed=0)
+
+        async def send_message(chat_id: int, text: str) -> None:
+            reports.append(text)
+
+        monkeypatch.setattr(admin, "broadcast_to_all_users", slow_broadcast)
+        bot = SimpleNamespace(send_message=send_message)
+        settings = SimpleNamespace(admin_ids=(1,))
+
+        async def process(update: dict) -> None:
+            user_id = update["message"]["from"]["id"]
+            if user_id == 1:
+                message = SimpleNamespace(
+                    text="/broadcast hello",
+                    from_user=SimpleNamespace(id=1),
+                    chat=SimpleNamespace(id=1),
+                    answer=lambda text: text,
+                )
+                await admin.handle_broadcast(message, bot, settings, None, structlog.get_logger("test"))
+            processed.append(user_id)
+
+        # One partition: the admin and the other user share a worker.
+        queue = UpdateQueue(process, structlog.get_logger("test"), workers=1, max_size=10)
+        queue.start()
+        await queue.submit(_message_update(1, 1))
+        await queue.submit(_message_update(2, 17))
+        await asyncio.wait_for(queue.stop(), 1.0)
+
+        assert processed == [1, 17]
+        assert ADMIN_JOBS.running("broadcast")
+        release.set()
+        while ADMIN_JOBS.running("broadcast"):
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert reports == ["Broadcast complete.\nDelivered: 2\nFailed: 0"]
+
+
+class _FakeLockConnection:
+    def __init__(self, held: set[int]) -> None:
+        self.held = held
+        self.closed = False
+
+    async def scalar(self, statement, params) -> bool:
+        if params["key"] in self.held:
+            return False
+        self.held.add(params["key"])
+        return True
+
+    async def execute(self, statement, params) -> None:
+        assert "pg_advisory_unlock" in str(statement)
+        self.held.discard(params["key"])
+
+    async def commit(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_admin_job_lock_held_by_another_worker_refuses_the_start() -> None:
+    from app.bot.admin_jobs import AdminJobs
+
+    held: set[int] = set()
+    connections: list[_FakeLockConnection] = []
+
+    async def connect() -> _FakeLockConnection:
+        connections.append(_FakeLockConnection(held))
+        return connections[-1]
+
+    engine = SimpleNamespace(connect=connect)
+    finished: list[str] = []
+
+    async def job(name: str) -> None:
+        await asyncio.sleep(0.01)
+        finished.append(name)
+
+    async def scenario() -> None:
+        # Two processes: separate AdminJobs, one shared Postgres.
+        this_worker, other_worker = AdminJobs(), AdminJobs()
+        logger = structlog.get_logger("test")
+
+        assert await other_worker.start("broadcast", job("first"), logger, engine=engine)
+        assert not await this_worker.start("broadcast", job("second"), logger, engine=engine)
+        await other_worker.stop()
+        assert held == set()
+        assert await this_worker.start("broadcast", job("third"), logger, engine=engine)
+        while this_worker.running("broadcast"):
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+    assert finished == ["third"]
+    assert held == set()
+    assert all(connection.closed for connection in connections)
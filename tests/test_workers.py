@@ -0,0 +1,123 @@
+import json
+import os
+import signal
+import socket
+import threading
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import structlog
+from aiohttp import web
+
+from app.web.workers import WorkerSupervisor, compute_restart_delay
+
+
+def _ping_app(settings, *, worker_index: int) -> web.Application:
+    async def ping(request: web.Request) -> web.Response:
+        return web.json_response({"worker": worker_index, "pid": os.getpid()})
+
+    app = web.Application()
+    app.router.add_get("/ping", ping)
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_pid(port: int, pid: int, timeout: float = 10.0) -> None:
+    """Ping over fresh connections until the worker with ``pid`` answers (SO_REUSEPORT spreads them)."""
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ping", timeout=1) as response:
+                if json.load(response)["pid"] == pid:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise AssertionError(f"worker {pid} never answered")
+
+
+def test_restart_delay_backs_off_and_caps() -> None:
+    assert compute_restart_delay(0) == 0.0
+    assert compute_restart_delay(1) == 0.5
+    assert compute_restart_delay(3) == 2.0
+    assert compute_restart_delay(20) == 30.0
+
+
+def test_several_workers_disable_the_fsm_read_cache() -> None:
+    from app.config import Settings
+
+    base = {
+        "BOT_TOKEN": "1:x",
+        "DATABASE_URL": "postgresql+asyncpg://u:p@localhost/db",
+        "CHANNEL_ID": -1001,
+        "ADMIN_IDS": "1",
+        "WEBHOOK_URL": "https://example.com/webhook",
+        "FSM_CACHE_TTL_SECONDS": 2.0,
+    }
+
+    assert Settings(_env_file=None, **base).fsm_read_cache_ttl_seconds == 2.0
+    assert Settings(_env_file=None, **base, WEB_WORKERS=4).fsm_read_cache_ttl_seconds == 0.0
+
+
+def test_supervisor_forks_workers_and_restarts_a_killed_one() -> None:
+    port = _free_port()
+    settings = SimpleNamespace(web_workers=2, app_host="127.0.0.1", app_port=port, worker_shutdown_timeout_seconds=1)
+    supervisor = WorkerSupervisor(_ping_app, settings, structlog.get_logger("test"))
+    slot = supervisor._slots[1]
+    try:
+        for each in supervisor._slots:
+            supervisor._spawn(each)
+        for each in supervisor._slots:
+            _wait_for_pid(port, each.process.pid)
+
+        killed = slot.process
+        os.kill(killed.pid, signal.SIGKILL)
+        killed.join(5)
+        deadline = time.monotonic() + 10
+        while slot.process is None or slot.process.pid == killed.pid:
+            assert time.monotonic() < deadline
+            supervisor._reap_and_restart()
+            time.sleep(0.05)
+
+        assert slot.recent_crashes == 1
+        assert killed.exitcode == -signal.SIGKILL
+        _wait_for_pid(port, slot.process.pid)
+    finally:
+        supervisor._drain()
+
+    assert [each.process.exitcode for each in supervisor._slots] == [0, 0]
+
+
+def test_supervisor_logs_without_a_listener_thread(monkeypatch) -> None:
+    from app import main as app_main
+    from app.config import Settings
+    from app.logging_setup import flush_logging
+
+    settings = Settings(
+        _env_file=None,
+        BOT_TOKEN="1:x",
+        DATABASE_URL="postgresql+asyncpg://u:p@localhost/db",
+        CHANNEL_ID=-1001,
+        ADMIN_IDS="1",
+        WEBHOOK_URL="https://example.com/webhook",
+        WEB_WORKERS=2,
+        LOG_BACKGROUND=True,
+    )
+    threads_at_fork: list[int] = []
+    monkeypatch.setattr(app_main, "get_settings", lambda: settings)
+    monkeypatch.setattr(WorkerSupervisor, "run", lambda self: threads_at_fork.append(threading.active_count()))
+
+    threads_before = threading.active_count()
+    try:
+        app_main.main()
+    finally:
+        flush_logging()
+
+    assert threads_at_fork == [threads_before]